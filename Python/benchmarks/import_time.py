@@ -0,0 +1,104 @@
+"""
+Cold-start benchmark of the package: the time a fresh interpreter takes to import the simulation modules, and the
+time a pool of spawned worker processes takes until every worker has imported them
+
+Run from the `Python` directory with `python benchmarks/import_time.py`
+"""
+
+import argparse
+import importlib
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+
+MODULES = [
+    "litinski_factories.definitions",
+    "litinski_factories.factory_simulation.onelevel15to1",
+    "litinski_factories.factory_simulation.twolevel20to4",
+    "litinski_factories.factory_searching.two_level_factory_search",
+]
+
+# Dependencies that the evaluation hot path does not need
+HEAVY_MODULES = ["scipy", "pandas", "plotly", "matplotlib", "sklearn"]
+
+
+def _environment() -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([str(SRC), env.get("PYTHONPATH", "")])
+    return env
+
+
+def import_time(module: str, repeat: int) -> List[float]:
+    """
+    Wall-clock times of `python -c "import module"` in fresh interpreters
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", f"import {module}"], env=_environment(), check=True
+        )
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def heavy_imports(module: str) -> List[str]:
+    """
+    Heavy dependencies that importing `module` pulls in
+    """
+    code = (
+        f"import sys, {module}; "
+        f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    res = subprocess.run(
+        [sys.executable, "-c", code],
+        env=_environment(),
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return res.stdout.split()
+
+
+def _ready(_: int) -> int:
+    return os.getpid()
+
+
+def pool_startup_time(module: str, workers: int) -> float:
+    """
+    Time until all `workers` spawned processes have imported `module` and answered a task
+    """
+    sys.path.insert(0, str(SRC))
+    context = multiprocessing.get_context("spawn")
+    start = time.perf_counter()
+    with context.Pool(
+        workers, initializer=importlib.import_module, initargs=(module,)
+    ) as pool:
+        pool.map(_ready, range(workers), chunksize=1)
+        elapsed = time.perf_counter() - start
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{'module':<60} {'import [s]':>10} {'pool [s]':>9}  heavy imports")
+    for module in MODULES:
+        median = statistics.median(import_time(module, args.repeat))
+        pool = pool_startup_time(module, args.workers)
+        heavy = " ".join(heavy_imports(module)) or "-"
+        print(f"{module:<60} {median:>10.3f} {pool:>9.3f}  {heavy}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,652 @@
+import math
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Sequence, Union
+
+import mpmath
+import numpy as np
+from mpmath import mp
+
+from .doubledouble import DDArray
+
+try:
+    import gmpy2
+except ImportError:  # pragma: no cover - optional dependency
+    gmpy2 = None
+
+
+class Backend(ABC):
+    """
+    Numerical backend for the density-matrix primitives in `definitions`
+
+    A backend converts the mpmath constants of `definitions` into its own matrix type and provides the
+    handful of linear-algebra operations the primitives are written against
+    """
+
+    name: str
+
+    # Whether states are evolved as a `definitions.SplitState`, for backends whose precision does not suffice
+    # to take output errors as one minus a near-unity trace
+    split_ideal_branch: bool = False
+
+    # Whether `schedule.run_schedule` composes runs of diagonal channels into one multiplier before applying
+    # it, which pays off where a pass over the state costs more than the same arithmetic on the small tables
+    # of the channels
+    fuse_diagonal: bool = False
+
+    # Precision in bits of backends with a fixed one, or None for those following the working precision of
+    # `definitions.working_precision`
+    fixed_precision: Optional[int] = None
+
+    def activate(self) -> None:
+        """
+        Sets up global state the arithmetic of this backend depends on, called by `get_backend`
+        """
+
+    @abstractmethod
+    def owns(self, m: Any) -> bool:
+        """
+        Whether `m` is a matrix of this backend
+        """
+
+    @abstractmethod
+    def matrix(self, m: Any) -> Any:
+        """
+        Converts an mpmath matrix (or a matrix of this backend) to the matrix type of this backend
+        """
+
+    @abstractmethod
+    def scalar(self, value: Any) -> Any:
+        """
+        Converts an error probability or other real scalar to the scalar type of this backend
+        """
+
+    @property
+    @abstractmethod
+    def pi(self) -> Any:
+        """
+        The constant `pi` as a scalar of this backend
+        """
+
+    @abstractmethod
+    def cos(self, angle: Any) -> Any:
+        """
+        Cosine of a real `angle`
+        """
+
+    @abstractmethod
+    def sin(self, angle: Any) -> Any:
+        """
+        Sine of a real `angle`
+        """
+
+    @abstractmethod
+    def eye(self, n: int) -> Any:
+        """
+        The `n` x `n` identity matrix
+        """
+
+    @abstractmethod
+    def kron(self, *args: Any) -> Any:
+        """
+        Tensor product of 1 or more matrices, the first argument being the most significant factor
+        """
+
+    @abstractmethod
+    def matmul(self, a: Any, b: Any) -> Any:
+        """
+        Matrix product `a * b`
+        """
+
+    @abstractmethod
+    def dagger(self, m: Any) -> Any:
+        """
+        Conjugate transpose of `m`
+        """
+
+    @abstractmethod
+    def trace(self, m: Any) -> Any:
+        """
+        Sum of the diagonal entries of `m`
+        """
+
+    def dimension(self, m: Any) -> int:
+        """
+        Number of rows of the square matrix `m`
+        """
+        return m.shape[-1]
+
+    def trace_product(self, a: Any, b: Any) -> Any:
+        """
+        Trace of the matrix product `a * b`, which backends compute as the sum of `a[i, j] * b[j, i]` without
+        forming the product
+        """
+        return self.trace(self.matmul(a, b))
+
+    @abstractmethod
+    def block_contraction(self, m: Any, n: int) -> Any:
+        """
+        Splits `m` into `n x n` blocks of size `M x M` and contracts each with `(1, ..., 1) / sqrt(M)` from both
+        sides, giving the `n x n` matrix of block sums divided by `M`
+        """
+
+    @abstractmethod
+    def multiply_by_table(
+        self, m: Any, table: Sequence[Sequence[Any]], classes: Sequence[int]
+    ) -> Any:
+        """
+        Elementwise product of `m` with the matrix whose entry (i, j) is `table[classes[i]][classes[j]]`
+        """
+
+    @abstractmethod
+    def permute(
+        self,
+        m: Any,
+        perm: Sequence[int],
+        row_factors: Sequence[Any],
+        col_factors: Sequence[Any],
+    ) -> Any:
+        """
+        Matrix whose entry (i, j) is `row_factors[i] * m[perm[i], perm[j]] * col_factors[j]`
+        """
+
+
+class MpmathBackend(Backend):
+    """
+    Arbitrary-precision backend on `mpmath.matrix`, working at the current mpmath precision
+    """
+
+    name = "mpmath"
+    # Element access of `mpmath.matrix` dominates a pass over the state
+    fuse_diagonal = True
+
+    def owns(self, m: Any) -> bool:
+        return isinstance(m, mpmath.matrix)
+
+    def matrix(self, m: Any) -> mpmath.matrix:
+        return m
+
+    def scalar(self, value: Any) -> Any:
+        if isinstance(value, (mpmath.mpf, mpmath.mpc)):
+            return value
+        return mp.mpmathify(value)
+
+    @property
+    def pi(self) -> mpmath.mpf:
+        return mp.pi
+
+    def cos(self, angle: Any) -> mpmath.mpf:
+        return mp.cos(angle)
+
+    def sin(self, angle: Any) -> mpmath.mpf:
+        return mp.sin(angle)
+
+    def eye(self, n: int) -> mpmath.matrix:
+        return mp.eye(n)
+
+    def kron(self, *args: mpmath.matrix) -> mpmath.matrix:
+        new_rows: int = 1
+        new_cols: int = 1
+        for m in args:
+            new_rows *= m.rows
+            new_cols *= m.cols
+        res = mp.ones(new_rows, new_cols)
+        for i in range(new_rows):
+            for j in range(new_cols):
+                partition_rows: int = 1
+                partition_cols: int = 1
+                for m in args:
+                    partition_rows *= m.rows
+                    partition_cols *= m.cols
+                    res[i, j] *= m[
+                        int(i * partition_rows / new_rows) % m.rows,
+                        int(j * partition_cols / new_cols) % m.cols,
+                    ]
+        return res
+
+    def matmul(self, a: mpmath.matrix, b: mpmath.matrix) -> mpmath.matrix:
+        return a * b
+
+    def dagger(self, m: mpmath.matrix) -> mpmath.matrix:
+        return m.transpose_conj()
+
+    def dimension(self, m: mpmath.matrix) -> int:
+        return m.rows
+
+    def trace(self, m: mpmath.matrix) -> mpmath.mpc:
+        res: int = 0
+        for i in range(min(m.rows, m.cols)):
+            res += m[i, i]
+        return res
+
+    def trace_product(self, a: mpmath.matrix, b: mpmath.matrix) -> mpmath.mpc:
+        return mp.fdot((a[i, j], b[j, i]) for i in range(a.rows) for j in range(a.cols))
+
+    def block_contraction(self, m: mpmath.matrix, n: int) -> mpmath.matrix:
+        size = m.rows // n
+        res = mp.matrix(n, n)
+        for a in range(n):
+            for b in range(n):
+                block = mp.fsum(
+                    m[a * size + i, b * size + j]
+                    for i in range(size)
+                    for j in range(size)
+                )
+                res[a, b] = block / size
+        return res
+
+    def multiply_by_table(
+        self, m: mpmath.matrix, table: Sequence[Sequence[Any]], classes: Sequence[int]
+    ) -> mpmath.matrix:
+        res = mp.matrix(m.rows, m.cols)
+        for i in range(m.rows):
+            row = table[classes[i]]
+            for j in range(m.cols):
+                res[i, j] = m[i, j] * row[classes[j]]
+        return res
+
+    def permute(
+        self,
+        m: mpmath.matrix,
+        perm: Sequence[int],
+        row_factors: Sequence[Any],
+        col_factors: Sequence[Any],
+    ) -> mpmath.matrix:
+        res = mp.matrix(m.rows, m.cols)
+        for i in range(m.rows):
+            for j in range(m.cols):
+                res[i, j] = row_factors[i] * m[perm[i], perm[j]] * col_factors[j]
+        return res
+
+
+class NumpyBackend(Backend):
+    """
+    Double-precision backend on NumPy complex128 arrays, intended for fast pre-screening sweeps
+    """
+
+    name = "numpy"
+    dtype = np.complex128
+    split_ideal_branch = True
+    fixed_precision = 53
+
+    def owns(self, m: Any) -> bool:
+        return isinstance(m, np.ndarray) and m.dtype == self.dtype and m.ndim == 2
+
+    def matrix(self, m: Any) -> np.ndarray:
+        if isinstance(m, mpmath.matrix):
+            return np.array(
+                [[complex(m[i, j]) for j in range(m.cols)] for i in range(m.rows)],
+                dtype=self.dtype,
+            )
+        return np.asarray(m, dtype=self.dtype)
+
+    def scalar(self, value: Any) -> Any:
+        if isinstance(value, (complex, mpmath.mpc)):
+            return complex(value)
+        return float(value)
+
+    @property
+    def pi(self) -> float:
+        return math.pi
+
+    def cos(self, angle: Any) -> float:
+        return math.cos(angle)
+
+    def sin(self, angle: Any) -> float:
+        return math.sin(angle)
+
+    def eye(self, n: int) -> np.ndarray:
+        return np.eye(n, dtype=self.dtype)
+
+    def kron(self, *args: np.ndarray) -> np.ndarray:
+        res = np.ones((1, 1), dtype=self.dtype)
+        for m in args:
+            res = np.kron(res, m)
+        return res
+
+    def matmul(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        return a @ b
+
+    def dagger(self, m: np.ndarray) -> np.ndarray:
+        return m.conj().T
+
+    def trace(self, m: np.ndarray) -> complex:
+        return complex(np.trace(m))
+
+    def trace_product(self, a: np.ndarray, b: np.ndarray) -> complex:
+        return complex(np.einsum("ij,ji->", a, b))
+
+    def block_contraction(self, m: np.ndarray, n: int) -> np.ndarray:
+        size = m.shape[-1] // n
+        return m.reshape(n, size, n, size).sum(axis=(1, 3)) / size
+
+    def multiply_by_table(
+        self, m: np.ndarray, table: Sequence[Sequence[Any]], classes: Sequence[int]
+    ) -> np.ndarray:
+        index = np.asarray(classes)
+        return m * np.asarray(table, dtype=self.dtype)[np.ix_(index, index)]
+
+    def permute(
+        self,
+        m: np.ndarray,
+        perm: Sequence[int],
+        row_factors: Sequence[Any],
+        col_factors: Sequence[Any],
+    ) -> np.ndarray:
+        index = np.asarray(perm)
+        rows = np.asarray(row_factors, dtype=self.dtype)
+        cols = np.asarray(col_factors, dtype=self.dtype)
+        return rows[:, None] * m[np.ix_(index, index)] * cols[None, :]
+
+
+class BatchedNumpyBackend(NumpyBackend):
+    """
+    NumPy backend on stacks of density matrices of shape (batch, 2^n, 2^n), one per parameter point
+
+    Scalars are arrays of shape (batch, 1, 1) so that the ordinary scalar arithmetic of the protocols
+    broadcasts against the stacked states
+    """
+
+    name = "numpy-batched"
+
+    def owns(self, m: Any) -> bool:
+        return isinstance(m, np.ndarray) and m.dtype == self.dtype and m.ndim == 3
+
+    def matrix(self, m: Any) -> np.ndarray:
+        m = super().matrix(m)
+        return m if m.ndim == 3 else m[None]
+
+    def scalar(self, value: Any) -> Any:
+        if isinstance(value, (complex, mpmath.mpc)):
+            return complex(value)
+        if isinstance(value, mpmath.mpf):
+            return float(value)
+        value = np.asarray(value)
+        if value.ndim == 0:
+            return value.item()
+        return value.reshape(-1, 1, 1)
+
+    def eye(self, n: int) -> np.ndarray:
+        return super().eye(n)[None]
+
+    def kron(self, *args: np.ndarray) -> np.ndarray:
+        # Only constant operators are tensored, which all have a batch of 1
+        return super().kron(*[m.reshape(m.shape[-2:]) for m in args])[None]
+
+    def dagger(self, m: np.ndarray) -> np.ndarray:
+        return np.swapaxes(m, -1, -2).conj()
+
+    def trace(self, m: np.ndarray) -> Any:
+        return np.trace(m, axis1=-2, axis2=-1)[..., None, None]
+
+    def trace_product(self, a: np.ndarray, b: np.ndarray) -> Any:
+        return np.einsum("...ij,...ji->...", a, b)[..., None, None]
+
+    def block_contraction(self, m: np.ndarray, n: int) -> np.ndarray:
+        size = m.shape[-1] // n
+        blocks = m.reshape(m.shape[:-2] + (n, size, n, size))
+        return blocks.sum(axis=(-3, -1)) / size
+
+    def multiply_by_table(
+        self, m: np.ndarray, table: Sequence[Sequence[Any]], classes: Sequence[int]
+    ) -> np.ndarray:
+        entries = np.broadcast_arrays(
+            *[np.asarray(entry, dtype=self.dtype) for row in table for entry in row]
+        )
+        # (rows, cols, batch, 1, 1) -> (batch, rows, cols), with a batch of 1 for unbatched tables
+        stacked = np.stack(entries).reshape(len(table), len(table[0]), -1)
+        index = np.asarray(classes)
+        return m * np.moveaxis(stacked, -1, 0)[:, index[:, None], index[None, :]]
+
+    def permute(
+        self,
+        m: np.ndarray,
+        perm: Sequence[int],
+        row_factors: Sequence[Any],
+        col_factors: Sequence[Any],
+    ) -> np.ndarray:
+        index = np.asarray(perm)
+        rows = np.asarray(row_factors, dtype=self.dtype)
+        cols = np.asarray(col_factors, dtype=self.dtype)
+        return rows[:, None] * m[..., index[:, None], index[None, :]] * cols[None, :]
+
+
+class GmpyBackend(Backend):
+    """
+    Multiprecision backend on NumPy object arrays of gmpy2 `mpc` values, so that matrix products are
+    vectorized over rows and columns by NumPy instead of looping in Python like `mpmath.matrix`
+
+    Arithmetic is carried out at the precision of the gmpy2 context, which `multiprecision` scopes to the
+    working precision
+    """
+
+    name = "gmpy2"
+
+    def activate(self) -> None:
+        if gmpy2 is None:
+            raise ImportError("The gmpy2 backend requires the gmpy2 package")
+
+    def owns(self, m: Any) -> bool:
+        return isinstance(m, np.ndarray) and m.dtype == object and m.ndim == 2
+
+    def matrix(self, m: Any) -> np.ndarray:
+        if isinstance(m, mpmath.matrix):
+            return np.array(
+                [[self.scalar(m[i, j]) for j in range(m.cols)] for i in range(m.rows)],
+                dtype=object,
+            )
+        return np.asarray(m, dtype=object)
+
+    def scalar(self, value: Any) -> Any:
+        if isinstance(value, (complex, mpmath.mpc)):
+            return gmpy2.mpc(self.scalar(value.real), self.scalar(value.imag))
+        if isinstance(value, mpmath.mpf):
+            # Exact conversion through the binary mantissa and exponent
+            sign, man, exp, _ = value._mpf_
+            res = gmpy2.mpfr(-man if sign else man)
+            if exp >= 0:
+                return gmpy2.mul_2exp(res, exp)
+            return gmpy2.div_2exp(res, -exp)
+        if isinstance(value, (int, float)):
+            return gmpy2.mpfr(value)
+        return value
+
+    @property
+    def pi(self) -> Any:
+        return gmpy2.const_pi()
+
+    def cos(self, angle: Any) -> Any:
+        return gmpy2.cos(angle)
+
+    def sin(self, angle: Any) -> Any:
+        return gmpy2.sin(angle)
+
+    def eye(self, n: int) -> np.ndarray:
+        res = np.full((n, n), gmpy2.mpc(0), dtype=object)
+        np.fill_diagonal(res, gmpy2.mpc(1))
+        return res
+
+    def kron(self, *args: np.ndarray) -> np.ndarray:
+        res = np.full((1, 1), gmpy2.mpc(1), dtype=object)
+        for m in args:
+            res = np.kron(res, m)
+        return res
+
+    def matmul(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        return a @ b
+
+    def dagger(self, m: np.ndarray) -> np.ndarray:
+        return m.conj().T
+
+    def trace(self, m: np.ndarray) -> Any:
+        return sum(np.diagonal(m), gmpy2.mpc(0))
+
+    def trace_product(self, a: np.ndarray, b: np.ndarray) -> Any:
+        return sum((a * b.T).ravel(), gmpy2.mpc(0))
+
+    def block_contraction(self, m: np.ndarray, n: int) -> np.ndarray:
+        size = m.shape[-1] // n
+        return m.reshape(n, size, n, size).sum(axis=(1, 3)) / size
+
+    def multiply_by_table(
+        self, m: np.ndarray, table: Sequence[Sequence[Any]], classes: Sequence[int]
+    ) -> np.ndarray:
+        index = np.asarray(classes)
+        return m * np.array(table, dtype=object)[np.ix_(index, index)]
+
+    def permute(
+        self,
+        m: np.ndarray,
+        perm: Sequence[int],
+        row_factors: Sequence[Any],
+        col_factors: Sequence[Any],
+    ) -> np.ndarray:
+        index = np.asarray(perm)
+        rows = np.array(row_factors, dtype=object)
+        cols = np.array(col_factors, dtype=object)
+        return rows[:, None] * m[np.ix_(index, index)] * cols[None, :]
+
+
+class DoubleDoubleBackend(Backend):
+    """
+    Double-double backend on `doubledouble.DDArray`, giving about 106 bits of precision with vectorized
+    float64 arithmetic
+
+    Scalars stay mpmath numbers and are rounded to double-double when they meet a matrix
+    """
+
+    name = "doubledouble"
+    fixed_precision = 106
+
+    def owns(self, m: Any) -> bool:
+        return isinstance(m, DDArray) and len(m.shape) == 2
+
+    def matrix(self, m: Any) -> DDArray:
+        if isinstance(m, mpmath.matrix):
+            return DDArray.from_values(m.tolist())
+        return DDArray.lift(m)
+
+    def scalar(self, value: Any) -> Any:
+        if isinstance(value, (mpmath.mpf, mpmath.mpc)):
+            return value
+        if isinstance(value, complex):
+            return mp.mpc(value)
+        return mp.mpf(value)
+
+    @property
+    def pi(self) -> mpmath.mpf:
+        return mp.pi
+
+    def cos(self, angle: Any) -> mpmath.mpf:
+        return mp.cos(angle)
+
+    def sin(self, angle: Any) -> mpmath.mpf:
+        return mp.sin(angle)
+
+    def eye(self, n: int) -> DDArray:
+        zeros = np.zeros((n, n))
+        return DDArray((np.eye(n), zeros), (zeros, zeros))
+
+    def kron(self, *args: DDArray) -> DDArray:
+        res = args[0]
+        for m in args[1:]:
+            (a, b), (c, d) = res.shape, m.shape
+            res = (res[:, None, :, None] * m[None, :, None, :]).reshape(a * c, b * d)
+        return res
+
+    def matmul(self, a: DDArray, b: DDArray) -> DDArray:
+        res = a[:, 0:1] * b[0:1, :]
+        for k in range(1, a.shape[1]):
+            res = res + a[:, k : k + 1] * b[k : k + 1, :]
+        return res
+
+    def dagger(self, m: DDArray) -> DDArray:
+        return m.conj().transpose()
+
+    def trace(self, m: DDArray) -> mpmath.mpc:
+        diagonal = np.arange(min(m.shape))
+        return m[diagonal, diagonal].sum()
+
+    def trace_product(self, a: DDArray, b: DDArray) -> mpmath.mpc:
+        return (a * b.transpose()).sum()
+
+    def block_contraction(self, m: DDArray, n: int) -> DDArray:
+        size = m.shape[-1] // n
+        blocks = m.reshape(n, size, n, size)
+        res = blocks[:, 0, :, 0]
+        for i in range(size):
+            for j in range(size):
+                if i or j:
+                    res = res + blocks[:, i, :, j]
+        # Dividing by a power of two is exact
+        return res * (1 / size)
+
+    def multiply_by_table(
+        self, m: DDArray, table: Sequence[Sequence[Any]], classes: Sequence[int]
+    ) -> DDArray:
+        index = np.asarray(classes)
+        return m * DDArray.from_values(table)[np.ix_(index, index)]
+
+    def permute(
+        self,
+        m: DDArray,
+        perm: Sequence[int],
+        row_factors: Sequence[Any],
+        col_factors: Sequence[Any],
+    ) -> DDArray:
+        index = np.asarray(perm)
+        rows = DDArray.from_values(row_factors)
+        cols = DDArray.from_values(col_factors)
+        return rows[:, None] * m[np.ix_(index, index)] * cols[None, :]
+
+
+@contextmanager
+def multiprecision(bits: int) -> Iterator[None]:
+    """
+    Scopes the precision of mpmath and, where installed, of the gmpy2 context to `bits`
+    """
+    with mp.workprec(bits):
+        if gmpy2 is None:
+            yield
+        else:
+            with gmpy2.local_context(precision=bits):
+                yield
+
+
+# Anything `get_backend` accepts: a backend name, a backend instance or None for the default
+BackendLike = Union[str, Backend, None]
+
+BACKENDS: Dict[str, Backend] = {
+    "mpmath": MpmathBackend(),
+    "numpy": NumpyBackend(),
+    "numpy-batched": BatchedNumpyBackend(),
+    "gmpy2": GmpyBackend(),
+    "doubledouble": DoubleDoubleBackend(),
+}
+
+
+def get_backend(backend: BackendLike = None) -> Backend:
+    """
+    Looks up a backend by name, defaulting to the high-precision mpmath backend
+    """
+    if backend is None:
+        backend = "mpmath"
+    if not isinstance(backend, Backend):
+        try:
+            backend = BACKENDS[backend]
+        except KeyError:
+            raise ValueError(
+                f"Unknown backend {backend!r}, expected one of {sorted(BACKENDS)}"
+            ) from None
+    backend.activate()
+    return backend
+
+
+def backend_of(m: Any) -> Backend:
+    """
+    Finds the backend a matrix belongs to
+    """
+    for backend in BACKENDS.values():
+        if backend.owns(m):
+            return backend
+    raise TypeError(f"No backend for matrix of type {type(m).__name__}")
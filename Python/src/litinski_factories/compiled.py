@@ -0,0 +1,347 @@
+import hashlib
+import inspect
+import math
+import os
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Optional, Sequence, Tuple
+
+import mpmath
+import numpy as np
+from numpy.polynomial import polynomial
+from numpy.typing import ArrayLike
+
+from . import backends, definitions, schedule
+from .backends import BACKENDS, Backend
+from .definitions import CACHE_DIR, postselection_weights
+
+# Default truncation order of the compiled series in `s = sqrt(pphys)`, i.e. terms up to `pphys^30`
+DEFAULT_ORDER = 60
+
+
+def _pad(c: np.ndarray, length: int) -> np.ndarray:
+    if len(c) == length:
+        return c
+    res = np.zeros((length,) + c.shape[1:], dtype=c.dtype)
+    res[: len(c)] = c
+    return res
+
+
+def _align(a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Pad to a common length and give scalar coefficients trailing axes so they broadcast against matrices
+    length = max(len(a), len(b))
+    a, b = _pad(a, length), _pad(b, length)
+    while a.ndim < b.ndim:
+        a = a[..., None]
+    while b.ndim < a.ndim:
+        b = b[..., None]
+    return a, b
+
+
+def _convolve(a: np.ndarray, b: np.ndarray, product: Callable = np.multiply):
+    a, b = _align(a, b)
+    res = np.zeros_like(product(a, b))
+    for j in range(len(b)):
+        if b[j].any():
+            res[j:] += product(a[: len(a) - j], b[j])
+    return res
+
+
+class Series:
+    """
+    Power series in `s = sqrt(pphys)` truncated after a fixed order, with scalar or matrix coefficients
+
+    Coefficients beyond the stored ones are zero for constants and truncated away otherwise, so all
+    non-constant series taking part in one compilation must share the same order
+    """
+
+    def __init__(self, coefficients: Any):
+        self.coefficients = np.asarray(coefficients, dtype=complex)
+
+    @classmethod
+    def constant(cls, value: Any) -> "Series":
+        return cls(np.asarray(value, dtype=complex)[None])
+
+    @classmethod
+    def pphys(cls, order: int) -> "Series":
+        """
+        The physical error rate `pphys = s^2` as a series truncated after `s^order`
+        """
+        c = np.zeros(order + 1, dtype=complex)
+        c[2] = 1
+        return cls(c)
+
+    @staticmethod
+    def _coefficients(other: Any) -> np.ndarray:
+        if isinstance(other, Series):
+            return other.coefficients
+        return np.asarray(complex(other))[None]
+
+    def __add__(self, other: Any) -> "Series":
+        a, b = _align(self.coefficients, self._coefficients(other))
+        return Series(a + b)
+
+    __radd__ = __add__
+
+    def __neg__(self) -> "Series":
+        return Series(-self.coefficients)
+
+    def __sub__(self, other: Any) -> "Series":
+        return self + (-other)
+
+    def __rsub__(self, other: Any) -> "Series":
+        return (-self) + other
+
+    def __mul__(self, other: Any) -> "Series":
+        if not isinstance(other, Series):
+            return Series(self.coefficients * complex(other))
+        return Series(_convolve(self.coefficients, other.coefficients))
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other: Any) -> "Series":
+        return Series(self.coefficients / complex(other))
+
+    def __rtruediv__(self, other: Any) -> "Series":
+        # Reciprocal of a scalar series with a non-zero constant term, term by term
+        c = self.coefficients
+        inverse = np.zeros_like(c)
+        inverse[0] = 1 / c[0]
+        for k in range(1, len(c)):
+            inverse[k] = -np.dot(c[1 : k + 1], inverse[k - 1 :: -1][:k]) / c[0]
+        return Series(inverse) * other
+
+    def __pow__(self, exponent: Any) -> "Series":
+        nonzero = np.flatnonzero(self.coefficients)
+        if len(nonzero) == 1 and self.coefficients.ndim == 1:
+            # A monomial `c * s^k`, as in the logical error rate `0.1 * (100 * pphys)^((d+1)/2)`
+            degree = nonzero[0] * exponent
+            if degree != int(degree):
+                raise ValueError(f"Power s^{degree} is not a polynomial in s")
+            coefficients = np.zeros_like(self.coefficients)
+            if degree < len(coefficients):
+                coefficients[int(degree)] = self.coefficients[nonzero[0]] ** exponent
+            return Series(coefficients)
+        if exponent != int(exponent) or exponent < 0:
+            raise ValueError(f"Cannot raise a series to the power {exponent}")
+        res = Series.constant(1)
+        for _ in range(int(exponent)):
+            res = res * self
+        return res
+
+    def __eq__(self, other: Any) -> bool:  # type: ignore[override]
+        a, b = _align(self.coefficients, self._coefficients(other))
+        return bool(np.all(a == b))
+
+    def __ne__(self, other: Any) -> bool:  # type: ignore[override]
+        return not self == other
+
+    def __abs__(self) -> float:
+        return float(np.max(np.abs(self.coefficients)))
+
+    @property
+    def real(self) -> "Series":
+        return Series(self.coefficients.real)
+
+    def conjugate(self) -> "Series":
+        # `s` is real, so conjugation acts on the coefficients only
+        return Series(self.coefficients.conj())
+
+
+class SeriesBackend(Backend):
+    """
+    Backend whose matrices are `Series` with matrix coefficients, used to compile a protocol once into
+    power series of its output quantities
+    """
+
+    name = "series"
+    split_ideal_branch = True
+    fixed_precision = 53
+
+    def owns(self, m: Any) -> bool:
+        return isinstance(m, Series) and m.coefficients.ndim == 3
+
+    def matrix(self, m: Any) -> Series:
+        if isinstance(m, Series):
+            return m
+        return Series.constant(backends.BACKENDS["numpy"].matrix(m))
+
+    def scalar(self, value: Any) -> Any:
+        if isinstance(value, Series):
+            return value
+        if isinstance(value, (complex, mpmath.mpc)):
+            return complex(value)
+        return float(value)
+
+    @property
+    def pi(self) -> float:
+        return math.pi
+
+    def cos(self, angle: Any) -> float:
+        return math.cos(angle)
+
+    def sin(self, angle: Any) -> float:
+        return math.sin(angle)
+
+    def eye(self, n: int) -> Series:
+        return Series.constant(np.eye(n))
+
+    def kron(self, *args: Series) -> Series:
+        # Only constant operators are tensored
+        return Series.constant(
+            BACKENDS["numpy"].kron(*[m.coefficients[0] for m in args])
+        )
+
+    def matmul(self, a: Series, b: Series) -> Series:
+        return Series(_convolve(a.coefficients, b.coefficients, np.matmul))
+
+    def dagger(self, m: Series) -> Series:
+        return Series(np.swapaxes(m.coefficients, -1, -2).conj())
+
+    def trace(self, m: Series) -> Series:
+        return Series(np.trace(m.coefficients, axis1=-2, axis2=-1))
+
+    def dimension(self, m: Series) -> int:
+        return m.coefficients.shape[-1]
+
+    def trace_product(self, a: Series, b: Series) -> Series:
+        return Series(
+            _convolve(
+                a.coefficients,
+                b.coefficients,
+                lambda p, q: np.einsum("...ij,...ji->...", p, q),
+            )
+        )
+
+    def block_contraction(self, m: Series, n: int) -> Series:
+        c = m.coefficients
+        size = c.shape[-1] // n
+        return Series(c.reshape(len(c), n, size, n, size).sum(axis=(2, 4)) / size)
+
+    def multiply_by_table(
+        self, m: Series, table: Sequence[Sequence[Any]], classes: Sequence[int]
+    ) -> Series:
+        entries = [Series._coefficients(entry) for row in table for entry in row]
+        length = max(len(c) for c in entries)
+        stacked = np.stack([_pad(c, length) for c in entries], axis=-1)
+        stacked = stacked.reshape(length, len(table), len(table[0]))
+        index = np.asarray(classes)
+        multiplier = stacked[:, index[:, None], index[None, :]]
+        return Series(_convolve(m.coefficients, multiplier))
+
+    def permute(
+        self,
+        m: Series,
+        perm: Sequence[int],
+        row_factors: Sequence[Any],
+        col_factors: Sequence[Any],
+    ) -> Series:
+        index = np.asarray(perm)
+        rows = np.asarray(row_factors, dtype=complex)
+        cols = np.asarray(col_factors, dtype=complex)
+        return Series(
+            rows[:, None]
+            * m.coefficients[:, index[:, None], index[None, :]]
+            * cols[None, :]
+        )
+
+
+BACKENDS["series"] = SeriesBackend()
+
+
+@dataclass(frozen=True)
+class CompiledProtocol:
+    """
+    Failure probability and output error of a protocol at fixed distances as power series in `sqrt(pphys)`
+
+    `failure_probability` and `infidelity` hold the coefficients of `pfail` and of the infidelity of the
+    unnormalized post-selected state, so `pout = infidelity / (1 - pfail)`
+    """
+
+    name: str
+    distances: Tuple[int, ...]
+    failure_probability: np.ndarray
+    infidelity: np.ndarray
+
+    def __call__(self, pphys: ArrayLike) -> Tuple[Any, Any]:
+        """
+        Evaluates `pfail` and `pout` at one or an array of physical error rates
+        """
+        s = np.sqrt(np.asarray(pphys, dtype=float))
+        pfail = polynomial.polyval(s, self.failure_probability)
+        pout = polynomial.polyval(s, self.infidelity) / (1 - pfail)
+        return pfail, pout
+
+    def is_converged(self, pphys: ArrayLike, rtol: float = 1e-9) -> Any:
+        """
+        Whether dropping the highest quarter of the orders changes `pout` by less than `rtol`, a heuristic
+        for the range of `pphys` in which the truncated series can be trusted
+        """
+        s = np.sqrt(np.asarray(pphys, dtype=float))
+        keep = 3 * len(self.infidelity) // 4
+        full = polynomial.polyval(s, self.infidelity)
+        truncated = polynomial.polyval(s, self.infidelity[:keep])
+        return np.abs(full - truncated) <= rtol * np.abs(full)
+
+
+def code_version(*functions: Callable) -> str:
+    """
+    Hash of the source of the simulation primitives, the schedule interpreter and the modules defining
+    `functions`
+    """
+    digest = hashlib.sha256()
+    for module in [backends, definitions, schedule, sys.modules[__name__]] + [
+        sys.modules[f.__module__] for f in functions
+    ]:
+        digest.update(inspect.getsource(module).encode())
+    return digest.hexdigest()[:16]
+
+
+def compile_protocol(
+    state: Callable[..., Any],
+    ideal: mpmath.matrix,
+    distances: Sequence[int],
+    order: int = DEFAULT_ORDER,
+    cache_dir: Optional[Path] = CACHE_DIR,
+) -> CompiledProtocol:
+    """
+    Traces `state(pphys, *distances, backend=...)` once on power series in `sqrt(pphys)` and returns the
+    series of the failure probability and output error of post-selecting the measured qubits in |+>, with
+    `ideal` the density matrix of the ideal output qubits
+
+    The coefficients are cached in `cache_dir` per protocol, distances, order and code version.
+    Pass `cache_dir=None` to disable the cache
+    """
+    name = f"{state.__module__}.{state.__qualname__}"
+    key = "-".join(
+        [state.__qualname__]
+        + [str(d) for d in distances]
+        + [f"o{order}", code_version(state)]
+    )
+    path = None if cache_dir is None else Path(cache_dir) / f"{key}.npz"
+    if path is not None and path.exists():
+        with np.load(path) as cached:
+            return CompiledProtocol(
+                name, tuple(distances), cached["pfail"], cached["infidelity"]
+            )
+
+    out = state(Series.pphys(order), *distances, backend=BACKENDS["series"])
+
+    failure, infidelity = postselection_weights(out, ideal)
+    compiled = CompiledProtocol(
+        name,
+        tuple(distances),
+        failure.coefficients.real,
+        infidelity.coefficients.real,
+    )
+
+    if path is not None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first, so that concurrent workers never read a partial cache entry
+        tmp = path.with_name(f"{path.stem}-{os.getpid()}.tmp.npz")
+        np.savez(
+            tmp, pfail=compiled.failure_probability, infidelity=compiled.infidelity
+        )
+        os.replace(tmp, path)
+    return compiled
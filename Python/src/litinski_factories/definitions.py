@@ -1,7 +1,190 @@
+import dataclasses
+import inspect
+import math
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache, wraps
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+    cast,
+)
+
 import mpmath
+import numpy as np
 from mpmath import mp
-mp.prec = 128
-from typing import List
+
+from .backends import (
+    Backend,
+    BackendLike,
+    backend_of,
+    get_backend,
+    gmpy2,
+    multiprecision,
+)
+
+# Matrices are `mpmath.matrix` for the default backend or NumPy arrays for the others, see `backends`
+Matrix = Union[mpmath.matrix, np.ndarray]
+
+# Working precision in bits of the cost functions, unless set by their `precision` argument or `working_precision`
+DEFAULT_PRECISION = 128
+
+_precision: ContextVar[int] = ContextVar("precision", default=DEFAULT_PRECISION)
+
+# Direct calls of the primitives and protocols outside any `working_precision` block, such as `run_schedule` or
+# `postselection_errors`, run at the default precision as well
+mp.prec = DEFAULT_PRECISION
+if gmpy2 is not None:
+    gmpy2.get_context().precision = DEFAULT_PRECISION
+
+
+@contextmanager
+def working_precision(precision: Optional[int] = None) -> Iterator[int]:
+    """
+    Scopes the mpmath and gmpy2 working precision to a block, and with it the precision-dependent constants and
+    operator caches. Cost functions called in the block without a `precision` argument run at `precision` bits,
+    and `None` keeps the precision of the enclosing block
+
+    mpmath keeps its precision in a process-wide context, so threads must not run at different precisions
+    concurrently, whereas the gmpy2 context is per thread
+    """
+    bits = _precision.get() if precision is None else precision
+    token = _precision.set(bits)
+    try:
+        with multiprecision(bits):
+            yield bits
+    finally:
+        _precision.reset(token)
+
+
+# A precision in bits, "auto" to choose it from the expected output error, or `None` for the enclosing one
+Precision = Union[int, str, None]
+
+AUTO_PRECISION = "auto"
+
+# Highest precision the automatic choice re-runs at before giving up
+MAX_PRECISION = 1024
+
+# Guard bits on top of the 53 bits of the float results, for rounding errors accumulated over the protocol
+GUARD_BITS = 20
+
+
+def required_precision(error: float) -> int:
+    """
+    Bits needed to resolve an output error `error` to double precision, given that it is read out of a density
+    matrix with entries of order one, rounded up to a multiple of 32 so that few precisions share the caches
+    """
+    bits = 53 + GUARD_BITS + max(0, math.ceil(-math.log2(max(error, 1e-300))))
+    return -(-bits // 32) * 32
+
+
+def is_numerically_healthy(result: Any) -> bool:
+    """
+    Whether the output error of a cost function result is a probability below one and its time cost is finite
+    """
+    pout = float(result.distilled_magic_state_error_rate)
+    cycles = float(result.distillation_time_in_cycles)
+    return 0 < pout < 1 and math.isfinite(cycles) and cycles > 0
+
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def scoped_precision(
+    order: Union[int, Callable[[Dict[str, Any]], int]]
+) -> Callable[[F], F]:
+    """
+    Runs a cost function in `working_precision` of its `precision` argument and records the precision used in
+    its result, for the backends following the working precision
+
+    With `precision="auto"`, the backends following the working precision start at the `required_precision`
+    of an output error `pphys^order`, with `order` the leading order of the protocol or a function of the
+    arguments returning it. They re-run at the `required_precision` of the computed output error, or at twice
+    the precision if the result is not `is_numerically_healthy`, until the precision suffices. Backends of a fixed precision run once with the
+    constants at the starting precision, and raise an `ArithmeticError` if the output error is too small for
+    their precision, unless they evolve a `SplitState`
+    """
+
+    def decorator(f: F) -> F:
+        signature = inspect.signature(f)
+
+        @wraps(f)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            precision = bound.arguments.get("precision")
+            # mpmath and gmpy2 compute at the working precision, the other backends have a fixed one
+            be = get_backend(bound.arguments.get("backend"))
+            follows_working_precision = (
+                "backend" in bound.arguments and be.fixed_precision is None
+            )
+            if precision != AUTO_PRECISION:
+                with working_precision(cast(Optional[int], precision)) as bits:
+                    result = f(*args, **kwargs)
+                return _with_precision(
+                    result, bits if follows_working_precision else None
+                )
+
+            leading = order(bound.arguments) if callable(order) else order
+            bits = required_precision(float(bound.arguments["pphys"]) ** leading)
+            if not follows_working_precision:
+                bits = max(bits, be.fixed_precision or 0)
+                bound.arguments["precision"] = bits
+                with working_precision(bits):
+                    result = f(*bound.args, **bound.kwargs)
+                if be.fixed_precision is not None and not be.split_ideal_branch:
+                    _check_resolved(result, be.fixed_precision, f.__name__)
+                return _with_precision(result, None)
+
+            while True:
+                bound.arguments["precision"] = bits
+                with working_precision(bits):
+                    result = f(*bound.args, **bound.kwargs)
+                if is_numerically_healthy(result):
+                    needed = required_precision(result.distilled_magic_state_error_rate)
+                    if needed <= bits:
+                        return _with_precision(result, bits)
+                else:
+                    needed = 2 * bits
+                if bits >= MAX_PRECISION:
+                    raise ArithmeticError(
+                        f"{f.__name__} needs more than {MAX_PRECISION} bits of precision"
+                    )
+                bits = min(max(needed, bits + 32), MAX_PRECISION)
+
+        return cast(F, wrapper)
+
+    return decorator
+
+
+def _check_resolved(result: Any, bits: int, name: str) -> None:
+    # An output error taken as one minus a trace of order one keeps `bits` minus its exponent significant bits,
+    # of which the 53 bits of a float less the guard bits must remain
+    pout = float(result.distilled_magic_state_error_rate)
+    if not is_numerically_healthy(result) or (
+        53 - GUARD_BITS + math.ceil(-math.log2(pout)) > bits
+    ):
+        raise ArithmeticError(
+            f"{name} has an output error of {pout:.2e}, which {bits} bits of precision cannot resolve"
+        )
+
+
+def _with_precision(result: Any, bits: Optional[int]) -> Any:
+    if not hasattr(result, "precision_in_bits"):
+        return result
+    return dataclasses.replace(result, precision_in_bits=bits)
+
 
 # Pauli matrices and projector |+><+|
 x = mp.matrix([[0, 1], [1, 0]])
@@ -9,130 +192,696 @@ y = mp.matrix([[0, -1j], [1j, 0]])
 z = mp.matrix([[1, 0], [0, -1]])
 one = mp.eye(2)
 projx = (one + x) / 2
-rcp_sqrt2 = 1 / mp.sqrt(2)
-rcp_sqrt8 = 1 / mp.sqrt(8)
 
-# Density matrices of pure |+> states, pure magic states and pure CCZ states
-plusstate = mp.matrix([[rcp_sqrt2], [rcp_sqrt2]]) * mp.matrix([[rcp_sqrt2, rcp_sqrt2]])
+# Density matrices of pure |+> states and pure CCZ states, whose entries are exact at every precision
+plusstate = mp.matrix([[0.5, 0.5], [0.5, 0.5]])
 
+_ccz_signs = [1, 1, 1, 1, 1, 1, 1, -1]
+CCZstate = mp.matrix([[a * b / 8 for b in _ccz_signs] for a in _ccz_signs])
 
-magicstate = mp.matrix([[rcp_sqrt2], [mp.exp(1j * mp.pi / 4) * rcp_sqrt2]]) * mp.matrix(
-    [[rcp_sqrt2, mp.exp(-1j * mp.pi / 4) * 1 / mp.sqrt(2)]]
-)
 
-CCZstate = mp.matrix(
-    [
-        [rcp_sqrt8],
-        [rcp_sqrt8],
-        [rcp_sqrt8],
-        [rcp_sqrt8],
-        [rcp_sqrt8],
-        [rcp_sqrt8],
-        [rcp_sqrt8],
-        [-rcp_sqrt8],
-    ]
-) * mp.matrix(
-    [
-        [
-            rcp_sqrt8,
-            rcp_sqrt8,
-            rcp_sqrt8,
-            rcp_sqrt8,
-            rcp_sqrt8,
-            rcp_sqrt8,
-            rcp_sqrt8,
-            -rcp_sqrt8,
-        ]
-    ]
-)
+def _magic_state() -> mpmath.matrix:
+    rcp_sqrt2 = 1 / mp.sqrt(2)
+    return mp.matrix([[rcp_sqrt2], [mp.exp(1j * mp.pi / 4) * rcp_sqrt2]]) * mp.matrix(
+        [[rcp_sqrt2, mp.exp(-1j * mp.pi / 4) * 1 / mp.sqrt(2)]]
+    )
+
+
+# Number of operators the operator cache keeps of each kind before evicting the least recently used ones
+OPERATOR_CACHE_SIZE = 256
 
 
-def kron(*args: mpmath.matrix) -> mpmath.matrix:
+def operator_key(*ops: mpmath.matrix) -> Tuple[Any, ...]:
+    """
+    Hashable key of a sequence of mpmath matrices, by their shapes and entries
+    """
+    return tuple((m.rows, m.cols, tuple(m)) for m in ops)
+
+
+def operators_of(key: Tuple[Any, ...]) -> List[mpmath.matrix]:
+    """
+    Inverse of `operator_key`
+    """
+    ops = []
+    for rows, cols, entries in key:
+        m = mp.matrix(rows, cols)
+        for k, entry in enumerate(entries):
+            m[k // cols, k % cols] = entry
+        ops.append(m)
+    return ops
+
+
+def kron(*args: Matrix) -> Matrix:
     """
     Calculates the tensor products of 2 or more matrices
+
+    Products of mpmath matrices are cached, so they must not be modified in place
     """
-    new_rows: int = 1
-    new_cols: int = 1
-    for m in args:
-        new_rows *= m.rows
-        new_cols *= m.cols
-    res = mp.ones(new_rows, new_cols)
-    for i in range(new_rows):
-        for j in range(new_cols):
-            partition_rows: int = 1
-            partition_cols: int = 1
-            for m in args:
-                partition_rows *= m.rows
-                partition_cols *= m.cols
-                res[i, j] *= m[
-                    int(i * partition_rows / new_rows) % m.rows,
-                    int(j * partition_cols / new_cols) % m.cols,
-                ]
-    return res
+    if all(isinstance(m, mpmath.matrix) for m in args):
+        return _cached_kron(operator_key(*args), mp.prec)
+    return backend_of(args[0]).kron(*args)
 
 
-def trace(m: mpmath.matrix) -> mpmath.mpc:
-    res: int = 0
-    for i in range(min(m.rows, m.cols)):
-        res += m[i, i]
-    return res
+@lru_cache(maxsize=OPERATOR_CACHE_SIZE)
+def _cached_kron(key: Tuple[Any, ...], prec: int) -> mpmath.matrix:
+    return backend_of(mp.eye(1)).kron(*operators_of(key))
 
 
-# Density matrices of 5, 7 and 4 |+> states
-init5qubit = kron(plusstate, plusstate, plusstate, plusstate, plusstate)
+def trace(m: Matrix) -> Any:
+    return backend_of(m).trace(m)
 
-init7qubit = kron(
-    plusstate, plusstate, plusstate, plusstate, plusstate, plusstate, plusstate
-)
-init4qubit = kron(plusstate, plusstate, plusstate, plusstate)
 
-# Density matrices corresponding to the ideal output state of 15-to-1, 20-to-4 and 8-to-CCZ
-ideal15to1 = kron(magicstate, plusstate, plusstate, plusstate, plusstate)
-ideal20to4 = kron(
-    magicstate, magicstate, magicstate, magicstate, plusstate, plusstate, plusstate
+def trace_product(a: Matrix, b: Matrix) -> Any:
+    """
+    Trace of `a * b` in O(N^2) operations, without forming the product
+    """
+    return backend_of(a).trace_product(a, b)
+
+
+def fidelity(rho: Matrix, psi: Matrix) -> Any:
+    """
+    Fidelity `<psi|rho|psi>` of the density matrix `rho` with the pure state given by the column vector `psi`
+    """
+    be = backend_of(rho)
+    psi = be.matrix(psi)
+    return be.trace(be.matmul(be.dagger(psi), be.matmul(rho, psi))).real
+
+
+class SplitState(NamedTuple):
+    """
+    Density matrix `ideal + error`, keeping the noiseless branch `ideal`, weighted by the probability that no
+    error occurred so far, apart from the sum `error` of all branches with at least one error
+
+    The output errors are then read out of `error` as accumulated error weight instead of as one minus a
+    near-unity trace, so double precision resolves them far below 1e-16
+    """
+
+    ideal: Matrix
+    error: Matrix
+
+
+# A density matrix as evolved by the primitives: a plain matrix or a `SplitState`
+State = Union[Matrix, SplitState]
+
+
+def backend_of_state(state: State) -> Backend:
+    if isinstance(state, SplitState):
+        return backend_of(state.ideal)
+    return backend_of(state)
+
+
+def initial_state(init: mpmath.matrix, backend: BackendLike = None) -> State:
+    """
+    Converts the density matrix `init` to `backend`, split into an ideal and an error branch on backends
+    without the precision to take output errors as one minus a trace
+    """
+    be = get_backend(backend)
+    state = be.matrix(init)
+    if be.split_ideal_branch:
+        return SplitState(state, state * 0)
+    return state
+
+
+def apply_channel(
+    state: State,
+    full: Callable[[Matrix], Matrix],
+    ideal: Callable[[Matrix], Matrix],
+    errors: Callable[[Matrix], Matrix],
+) -> State:
+    """
+    Applies the channel `full = ideal + errors`, where `ideal` is its no-error branch and `errors` the sum of
+    its error branches
+
+    Scalars multiply matrices from the right, since `mpf * mpmath.matrix` first tries to convert the matrix
+    to a number through its string representation
+    """
+    if isinstance(state, SplitState):
+        return SplitState(ideal(state.ideal), full(state.error) + errors(state.ideal))
+    return full(state)
+
+
+# Directory of on-disk caches, shared with the compiled protocols in `compiled`
+CACHE_DIR = Path(
+    os.environ.get(
+        "LITINSKI_FACTORIES_CACHE", Path.home() / ".cache" / "litinski_factories"
+    )
 )
-ideal8toCCZ = kron(CCZstate, plusstate)
 
+# Snapshots of the multi-qubit states below are kept in this directory per precision, `None` disables them
+SNAPSHOT_DIR: Optional[Path] = CACHE_DIR / "states"
+
+# States that depend on the precision are only computed on first access, as module attributes through
+# `__getattr__`, and kept per precision
+_LAZY_STATES: Dict[str, Callable[[], mpmath.matrix]] = {
+    # Density matrix of a pure magic state
+    "magicstate": _magic_state,
+    # Density matrices of 5, 7 and 4 |+> states
+    "init5qubit": lambda: kron(*[plusstate] * 5),
+    "init7qubit": lambda: kron(*[plusstate] * 7),
+    "init4qubit": lambda: kron(*[plusstate] * 4),
+    # Density matrices corresponding to the ideal output state of 15-to-1, 20-to-4 and 8-to-CCZ
+    "ideal15to1": lambda: kron(magic_states(1), *[plusstate] * 4),
+    "ideal20to4": lambda: kron(magic_states(4), *[plusstate] * 3),
+    "ideal8toCCZ": lambda: kron(CCZstate, plusstate),
+}
+
+_states: Dict[Tuple[str, int], mpmath.matrix] = {}
 
-def pauli_rot(axis: List[mpmath.matrix], angle: mpmath.mpc) -> mpmath.matrix:
+
+# Scalars that depend on the precision, computed on every access
+_LAZY_SCALARS: Dict[str, Callable[[], mpmath.mpf]] = {
+    "rcp_sqrt2": lambda: 1 / mp.sqrt(2),
+    "rcp_sqrt8": lambda: 1 / mp.sqrt(8),
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_STATES:
+        return lazy_state(name)
+    if name in _LAZY_SCALARS:
+        return _LAZY_SCALARS[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def lazy_state(name: str) -> mpmath.matrix:
+    """
+    The state `name` at the current precision, computed on first use or loaded from its snapshot
+    in `SNAPSHOT_DIR`
+    """
+    key = (name, mp.prec)
+    if key not in _states:
+        path = None if SNAPSHOT_DIR is None else SNAPSHOT_DIR / f"{name}-p{mp.prec}.npz"
+        if path is not None and path.exists():
+            try:
+                _states[key] = _load_matrix(path)
+            except (OSError, KeyError, ValueError):
+                # Unreadable snapshots are recomputed and overwritten
+                pass
+        if key not in _states:
+            _states[key] = _LAZY_STATES[name]()
+            if path is not None:
+                try:
+                    _save_matrix(path, _states[key])
+                except OSError:
+                    # Snapshots only speed up later runs, so an unwritable cache directory is not an error
+                    pass
+    return _states[key]
+
+
+def plus_states(n: int) -> mpmath.matrix:
+    """
+    Density matrix of `n` |+> states, the initial state of the protocols
+    """
+    return lazy_state(f"init{n}qubit")
+
+
+def magic_states(n: int) -> mpmath.matrix:
+    """
+    Density matrix of `n` magic states, the ideal output of the protocols distilling magic states
+    """
+    if n == 1:
+        return lazy_state("magicstate")
+    return kron(*[lazy_state("magicstate")] * n)
+
+
+def _save_matrix(path: Path, m: mpmath.matrix) -> None:
+    # Entries are stored exactly as the (sign, mantissa, exponent, bit count) of their real and imaginary parts,
+    # with the mantissas as hex strings since they do not fit into 64 bits
+    parts = [
+        part._mpf_
+        for i in range(m.rows)
+        for j in range(m.cols)
+        for part in (mp.mpc(m[i, j]).real, mp.mpc(m[i, j]).imag)
+    ]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write to a temporary file first, so that concurrent workers never read a partial snapshot
+    tmp = path.with_name(f"{path.stem}-{os.getpid()}.tmp.npz")
+    np.savez(
+        tmp,
+        shape=np.array([m.rows, m.cols]),
+        mantissas=np.array([format(man, "x") for _, man, _, _ in parts]),
+        exponents=np.array([(sign, exp, bc) for sign, _, exp, bc in parts]),
+    )
+    os.replace(tmp, path)
+
+
+def _load_matrix(path: Path) -> mpmath.matrix:
+    with np.load(path) as snapshot:
+        rows, cols = (int(n) for n in snapshot["shape"])
+        mantissas = snapshot["mantissas"].tolist()
+        exponents = snapshot["exponents"].tolist()
+    parts = [
+        (sign, int(man, 16), exp, bc)
+        for man, (sign, exp, bc) in zip(mantissas, exponents)
+    ]
+    values = [mp.make_mpc((parts[k], parts[k + 1])) for k in range(0, len(parts), 2)]
+    return mp.matrix([values[i * cols : (i + 1) * cols] for i in range(rows)])
+
+
+# Phases `i^k` of Pauli products by the exponent `k`
+PHASES = (1, 1j, -1, -1j)
+
+# Single-qubit Paulis by `x + 2*z`, with `Y = iXZ` for x = z = 1
+PAULI_LETTERS = "IXZY"
+
+
+class PauliString(NamedTuple):
+    """
+    Pauli product `i^phase * P_1 x ... x P_n` in (x-mask, z-mask) encoding: qubit `k` carries X if bit `n-1-k`
+    of `xmask` is set, Z if that bit of `zmask` is set and Y if both are
+    """
+
+    n: int
+    xmask: int
+    zmask: int
+    phase: int = 0
+
+    @classmethod
+    def from_label(cls, label: str) -> "PauliString":
+        """
+        Parses labels such as "IZIZZ", "-ZZIZ" or "iXY"
+        """
+        letters = label.lstrip("+-i")
+        sign = label[: len(label) - len(letters)]
+        if sign not in ("", "+", "-", "i", "+i", "-i"):
+            raise ValueError(f"Invalid sign {sign!r} in Pauli string {label!r}")
+        phase = (2 if "-" in sign else 0) + (1 if "i" in sign else 0)
+        xmask = zmask = 0
+        for letter in letters:
+            if letter not in PAULI_LETTERS:
+                raise ValueError(f"Invalid Pauli {letter!r} in Pauli string {label!r}")
+            k = PAULI_LETTERS.index(letter)
+            xmask, zmask = 2 * xmask + k % 2, 2 * zmask + k // 2
+        return cls(len(letters), xmask, zmask, phase)
+
+    @property
+    def label(self) -> str:
+        sign = ("", "i", "-", "-i")[self.phase]
+        return sign + "".join(
+            PAULI_LETTERS[(self.xmask >> b & 1) + 2 * (self.zmask >> b & 1)]
+            for b in reversed(range(self.n))
+        )
+
+    def factors(self) -> List[mpmath.matrix]:
+        """
+        The Pauli product as a list of 2x2 mpmath matrices, with the phase folded into the first factor
+        """
+        matrices = {"I": one, "X": x, "Y": y, "Z": z}
+        factors = [matrices[letter] for letter in self.label.lstrip("-i")]
+        if self.phase:
+            factors[0] = PHASES[self.phase] * factors[0]
+        return factors
+
+
+# The forms a Pauli product axis can be given in: a label, the mask encoding or a list of 2x2 matrices
+PauliLike = Union[str, PauliString, Sequence[mpmath.matrix]]
+
+
+def pauli_of(axis: PauliLike) -> PauliString:
+    """
+    Converts a Pauli product to its mask encoding, raising ValueError if `axis` is not a Pauli product
+    """
+    if isinstance(axis, PauliString):
+        return axis
+    if isinstance(axis, str):
+        return PauliString.from_label(axis)
+    matrices: Sequence[mpmath.matrix] = axis
+    phase = xmask = zmask = 0
+    for m in matrices:
+        for k, letter in enumerate(PAULI_LETTERS):
+            pauli = {"I": one, "X": x, "Y": y, "Z": z}[letter]
+            # The first non-zero entry of the Pauli fixes the candidate phase of the factor
+            row, col = (0, 0) if k in (0, 2) else (0, 1)
+            factor = m[row, col] / pauli[row, col]
+            if factor in PHASES and all(
+                m[i, j] == factor * pauli[i, j] for i in range(2) for j in range(2)
+            ):
+                phase = (phase + PHASES.index(factor)) % 4
+                xmask, zmask = 2 * xmask + k % 2, 2 * zmask + k // 2
+                break
+        else:
+            raise ValueError("Axis is not a product of Pauli operators")
+    return PauliString(len(axis), xmask, zmask, phase)
+
+
+def pauli_rot(
+    axis: PauliLike,
+    angle: mpmath.mpc,
+    backend: BackendLike = None,
+) -> Matrix:
     """
     Pauli product rotation `e^(iP*phi)`, where the Pauli product `P` is specified by 'axis' and `phi` is the rotation angle
+
+    Rotations are cached per axis, angle and backend
+    """
+    return _cached_pauli_rot(pauli_of(axis), angle, get_backend(backend), mp.prec)
+
+
+@lru_cache(maxsize=OPERATOR_CACHE_SIZE)
+def _cached_pauli_rot(pauli: PauliString, angle: Any, be: Backend, prec: int) -> Matrix:
+    return be.cos(angle) * be.eye(2**pauli.n) + 1j * be.sin(angle) * pauli_product(
+        pauli, be
+    )
+
+
+def pauli_product(pauli: PauliLike, backend: BackendLike = None) -> Matrix:
+    """
+    Tensor product of the Pauli operators in `pauli` on `backend`, cached per Pauli product and backend
+    """
+    return _cached_pauli_product(pauli_of(pauli), get_backend(backend), mp.prec)
+
+
+@lru_cache(maxsize=OPERATOR_CACHE_SIZE)
+def _cached_pauli_product(pauli: PauliString, be: Backend, prec: int) -> Matrix:
+    return be.kron(*[be.matrix(m) for m in pauli.factors()])
+
+
+def clear_operator_cache() -> None:
+    """
+    Empties the caches of tensor products, rotations, Pauli products and post-selection operators
+    """
+    for cached in [
+        _cached_kron,
+        _cached_pauli_rot,
+        _cached_pauli_product,
+        _cached_diagonal_of,
+        _cached_permutation_of,
+        _cached_readout_operator,
+    ]:
+        cached.cache_clear()
+
+
+def _try_pauli_of(axis: PauliLike) -> Optional[PauliString]:
+    try:
+        return pauli_of(axis)
+    except ValueError:
+        return None
+
+
+def diagonal_of(axis: PauliLike) -> Optional[List[Any]]:
+    """
+    Diagonal of the Pauli product specified by 'axis', or None if the product is not diagonal
+    """
+    pauli = _try_pauli_of(axis)
+    if pauli is None or pauli.xmask:
+        return None
+    return _cached_diagonal_of(pauli)
+
+
+@lru_cache(maxsize=OPERATOR_CACHE_SIZE)
+def _cached_diagonal_of(pauli: PauliString) -> List[Any]:
+    # Z on a qubit contributes a sign -1 to the entries whose index has that bit set
+    return [
+        PHASES[(pauli.phase + 2 * bin(i & pauli.zmask).count("1")) % 4]
+        for i in range(2**pauli.n)
+    ]
+
+
+# Multipliers of a `DiagonalChannel`, indexed by the classes of the row and column
+Table = List[List[Any]]
+
+
+class DiagonalChannel(NamedTuple):
+    """
+    Channel acting on a density matrix as an elementwise (Schur) multiplication, of entry (i, j) by
+    `table[classes[i]][classes[j]]`, with the tables of the `full` channel and of its no-error branch
+    `ideal` and error branches `errors`
+
+    `ideal` and `errors` are only used on `SplitState`s, and are None where they are not needed
+    """
+
+    classes: List[int]
+    full: Table
+    ideal: Optional[Table]
+    errors: Optional[Table]
+
+
+def diagonal_rotation(
+    be: Backend, axis: PauliLike, p1: Any, p2: Any, p3: Any
+) -> Optional[DiagonalChannel]:
+    """
+    The noisy rotation of `apply_rot` about 'axis' as a `DiagonalChannel`, or None if 'axis' is not
+    diagonal. The error probabilities must be scalars of `be`
+    """
+    diagonal = diagonal_of(axis)
+    if diagonal is None:
+        return None
+
+    channel = rotation_branches(be, p1, p2, p3)
+    # For a diagonal `P` with entries `d_i`, the rotation multiplies entry (i, j) of the density matrix
+    # by `r_i(phi) * conj(r_j(phi))` with `r_i(phi) = cos(phi) + i*sin(phi)*d_i`, so the whole channel
+    # is an elementwise multiplication. The multiplier only depends on the values of `d_i` and `d_j`.
+    values = list(dict.fromkeys(diagonal))
+    rows = [
+        [be.cos(phi) + 1j * be.sin(phi) * be.scalar(d) for d in values]
+        for _, phi in channel
+    ]
+
+    def table(branches: slice) -> Table:
+        return [
+            [
+                sum(
+                    p * r[a] * r[b].conjugate()
+                    for (p, _), r in zip(channel[branches], rows[branches])
+                )
+                for b in range(len(values))
+            ]
+            for a in range(len(values))
+        ]
+
+    return DiagonalChannel(
+        [values.index(d) for d in diagonal],
+        table(slice(None)),
+        table(slice(1)),
+        table(slice(1, None)),
+    )
+
+
+def rotation_branches(be: Backend, p1: Any, p2: Any, p3: Any) -> List[Tuple[Any, Any]]:
+    """
+    Probabilities and angles of the branches of the noisy `pi/8` rotation of `apply_rot`, no-error branch first
+    """
+    return [
+        (1 - p1 - p2 - p3, be.pi / 8),
+        (p1, 5 * be.pi / 8),
+        (p2, -1 * be.pi / 8),
+        (p3, 3 * be.pi / 8),
+    ]
+
+
+def apply_diagonal(state: State, channel: DiagonalChannel) -> State:
+    """
+    Applies a `DiagonalChannel` to a state in one elementwise multiplication per matrix
+    """
+    be = backend_of_state(state)
+    return apply_channel(
+        state,
+        lambda m: be.multiply_by_table(m, channel.full, channel.classes),
+        lambda m: be.multiply_by_table(m, cast(Table, channel.ideal), channel.classes),
+        lambda m: be.multiply_by_table(m, cast(Table, channel.errors), channel.classes),
+    )
+
+
+def fuse_diagonal(channels: Sequence[DiagonalChannel], split: bool) -> DiagonalChannel:
+    """
+    Composes `DiagonalChannel`s, applied in order, into one, with the `ideal` and `errors` tables of the
+    branches of a `SplitState` only if `split`
+
+    The classes of the composition are the distinct combinations of the classes of the channels, so its
+    tables stay as small as the qubits the channels act on allow
     """
-    return mp.cos(angle) * mp.eye(2 ** len(axis)) + 1j * mp.sin(angle) * kron(*axis)
+    first, *rest = channels
+    classes = first.classes
+    full = _object_table(first.full)
+    # Only composed if `split`
+    ideal = _object_table(cast(Table, first.ideal)) if split else full
+    errors = _object_table(cast(Table, first.errors)) if split else full
+    for channel in rest:
+        pairs = list(zip(classes, channel.classes))
+        combined = list(dict.fromkeys(pairs))
+        # Rows and columns of the composed tables in those of the previous composition and of the channel
+        old = np.ix_(*[np.array([i for i, _ in combined])] * 2)
+        new = np.ix_(*[np.array([j for _, j in combined])] * 2)
+
+        if split:
+            # The error branches of the composition are those with an error in the new channel after the
+            # no-error branch of the previous ones, or after their error branches. Accumulating them this
+            # way never subtracts the near-unity no-error weight
+            errors = (
+                errors[old] * _object_table(cast(Table, channel.full))[new]
+                + ideal[old] * _object_table(cast(Table, channel.errors))[new]
+            )
+            ideal = ideal[old] * _object_table(cast(Table, channel.ideal))[new]
+        full = full[old] * _object_table(channel.full)[new]
+        index = {pair: c for c, pair in enumerate(combined)}
+        classes = [index[pair] for pair in pairs]
+    if not split:
+        return DiagonalChannel(classes, full.tolist(), None, None)
+    return DiagonalChannel(classes, full.tolist(), ideal.tolist(), errors.tolist())
+
+
+def _object_table(table: Table) -> np.ndarray:
+    # Filled entry by entry, since NumPy would otherwise unpack entries that are arrays themselves
+    res = np.empty((len(table), len(table[0])), dtype=object)
+    for i, row in enumerate(table):
+        for j, entry in enumerate(row):
+            res[i, j] = entry
+    return res
 
 
 def apply_rot(
-    state: mpmath.matrix,
-    axis: List[mpmath.matrix],
+    state: State,
+    axis: PauliLike,
     p1: mpmath.mpc,
     p2: mpmath.mpc,
     p3: mpmath.mpc,
-) -> mpmath.matrix:
+) -> State:
     """
     Applies a `pi/8` Pauli product rotation specified by 'axis' with probability `1-p1-p2-p3`
 
     A `P_(pi/2) / P_(-pi/4) / P_(pi/4)` error occurs with probability `p1 / p2 / p3`
+
+    'axis' is a Pauli string such as "IZZZI", a `PauliString` or a list of 2x2 Pauli matrices.
+    The rotation runs on the backend of `state`
+    """
+    be = backend_of_state(state)
+    p1, p2, p3 = be.scalar(p1), be.scalar(p2), be.scalar(p3)
+
+    diagonal = diagonal_rotation(be, axis, p1, p2, p3)
+    if diagonal is not None:
+        return apply_diagonal(state, diagonal)
+
+    channel = rotation_branches(be, p1, p2, p3)
+
+    def multiply(m: Matrix, branches: slice) -> Matrix:
+        res = m * 0
+        for p, phi in channel[branches]:
+            rot = pauli_rot(axis, phi, be)
+            res = res + be.matmul(be.matmul(rot * p, m), be.dagger(rot))
+        return res
+
+    return apply_channel(
+        state,
+        lambda m: multiply(m, slice(None)),
+        lambda m: multiply(m, slice(1)),
+        lambda m: multiply(m, slice(1, None)),
+    )
+
+
+def permutation_of(pauli: PauliLike) -> Optional[Tuple[int, List[Any]]]:
+    """
+    Writes the Pauli product specified by 'pauli' as `P|j> = v_(j^xmask) |j^xmask>` and returns `xmask`
+    and the phases `v`, or None if 'pauli' is not a Pauli product
     """
-    rot0 = pauli_rot(axis, mp.pi / 8)
-    rot1 = pauli_rot(axis, 5 * mp.pi / 8)
-    rot2 = pauli_rot(axis, -1 * mp.pi / 8)
-    rot3 = pauli_rot(axis, 3 * mp.pi / 8)
+    encoded = _try_pauli_of(pauli)
+    if encoded is None:
+        return None
+    return _cached_permutation_of(encoded)
+
+
+@lru_cache(maxsize=OPERATOR_CACHE_SIZE)
+def _cached_permutation_of(pauli: PauliString) -> Tuple[int, List[Any]]:
+    # Entry (i, i^xmask) of the product: X contributes 1, Z the sign (-1)^bit and Y = [[0, -i], [i, 0]]
+    # the phase -i * (-1)^bit
+    ys = bin(pauli.xmask & pauli.zmask).count("1")
+    return pauli.xmask, [
+        PHASES[(pauli.phase + 3 * ys + 2 * bin(i & pauli.zmask).count("1")) % 4]
+        for i in range(2**pauli.n)
+    ]
+
+
+def apply_pauli(state: State, pauli: PauliLike, p: float) -> State:
+    """
+    Applies a Pauli operator, given in any form `pauli_of` accepts, to a state with probability `p`
+    """
+    be = backend_of_state(state)
+    p = be.scalar(p)
+
+    permutation = permutation_of(pauli)
+    if permutation is None:
+        raise ValueError("apply_pauli needs a product of Pauli operators")
+
+    # Row i of P has its only entry v_i in column i^xmask, so (P * state * P)_(i, j) is
+    # v_i * state_(i^xmask, j^xmask) * v_(j^xmask): a permutation of rows and columns with phases
+    xmask, phases = permutation
+    perm = [i ^ xmask for i in range(len(phases))]
+    row_factors = [be.scalar(v) for v in phases]
+    col_factors = [row_factors[k] for k in perm]
+
+    def flip(m: Matrix) -> Matrix:
+        return be.permute(m, perm, row_factors, col_factors)
+
+    return apply_channel(
+        state,
+        lambda m: m * (1 - p) + flip(m) * p,
+        lambda m: m * (1 - p),
+        lambda m: flip(m) * p,
+    )
+
 
+def postselected_block(state: Matrix, ideal: mpmath.matrix) -> Matrix:
+    """
+    Unnormalized density matrix of the output qubits of `state` after post-selecting the remaining, measured
+    qubits in |+>, i.e. `state` contracted with <+| on the measured qubits
+
+    The output qubits are the leading qubits of `state` and as many as those of the `ideal` output state
+    """
+    return backend_of(state).block_contraction(state, ideal.rows)
+
+
+def postselection_weights(state: State, ideal: mpmath.matrix) -> Tuple[Any, Any]:
+    """
+    Returns the failure probability `pfail` of post-selecting the measured qubits of `state` in |+> and the
+    infidelity of the unnormalized output block with the `ideal` density matrix of the output qubits
+
+    The infidelity is read out against `1 - ideal`, which annihilates the ideal output
+    """
+    be = backend_of_state(state)
+    complement = _cached_readout_operator(operator_key(ideal), be, mp.prec)
+
+    def readout(m: Matrix) -> Tuple[Any, Any]:
+        block = be.block_contraction(m, ideal.rows)
+        return (
+            (be.trace(m) - be.trace(block)).real,
+            be.trace_product(complement, block).real,
+        )
+
+    if not isinstance(state, SplitState):
+        return readout(state)
+
+    # The noiseless branch of a distillation protocol passes post-selection with certainty as the ideal
+    # state, so its readout only consists of rounding errors and is dropped. These are at most a unit roundoff
+    # of the backend per diagonal entry of the branch, relative to its trace
+    eps = 2.0 ** -(be.fixed_precision or mp.prec)
+    norm = np.abs(np.asarray(be.trace(state.ideal), dtype=object))
+    tolerance = eps * be.dimension(state.ideal) * norm
+
+    def combined(res: Any, noiseless: Any) -> Any:
+        if np.all(np.abs(np.asarray(noiseless, dtype=object)) <= tolerance):
+            return res
+        return res + noiseless
+
+    failure, infidelity = readout(state.error)
+    noiseless_failure, noiseless_infidelity = readout(state.ideal)
     return (
-        (1 - p1 - p2 - p3) * rot0 * state * rot0.transpose_conj()
-        + p1 * rot1 * state * rot1.transpose_conj()
-        + p2 * rot2 * state * rot2.transpose_conj()
-        + p3 * rot3 * state * rot3.transpose_conj()
+        combined(failure, noiseless_failure),
+        combined(infidelity, noiseless_infidelity),
     )
 
 
-def apply_pauli(
-    state: mpmath.matrix, pauli: List[mpmath.matrix], p: float
-) -> mpmath.matrix:
+@lru_cache(maxsize=OPERATOR_CACHE_SIZE)
+def _cached_readout_operator(key: Tuple[Any, ...], be: Backend, prec: int) -> Matrix:
+    (ideal,) = operators_of(key)
+    return be.matrix(mp.eye(ideal.rows) - ideal)
+
+
+def postselection_errors(state: State, ideal: mpmath.matrix) -> Tuple[Any, Any]:
     """
-    Applies a Pauli operator to a state with probability `p`
+    Returns the failure probability `pfail` of post-selecting the measured qubits of `state` in |+> and the
+    output error `pout`, the infidelity between the post-selected output qubits and the `ideal` density matrix
     """
-    return (1 - p) * state + p * kron(*pauli) * state * kron(*pauli)
+    pfail, infidelity = postselection_weights(state, ideal)
+    return pfail, infidelity / (1 - pfail)
 
 
 def plog(pphys: mpmath.mpf, d: int) -> mpmath.mpc:
@@ -142,66 +891,125 @@ def plog(pphys: mpmath.mpf, d: int) -> mpmath.mpc:
     return 0.1 * (100 * pphys) ** ((d + 1) / 2)
 
 
+def is_zero(p: Any) -> bool:
+    """
+    Whether an error probability, or every entry of an array of them, is zero
+    """
+    if isinstance(p, np.ndarray):
+        return not p.any()
+    return p == 0
+
+
+def z_storage(be: Backend, z: Sequence[Any], n: int) -> Optional[DiagonalChannel]:
+    """
+    Independent Z errors on `n` qubits, with probability `z[k]` on qubit `k+1`, as a `DiagonalChannel`, or
+    None if all probabilities are zero
+    """
+    z_errors = [
+        (1 << (n - 1 - k), be.scalar(p)) for k, p in enumerate(z) if not is_zero(p)
+    ]
+    if not z_errors:
+        return None
+
+    # A Z error on a qubit scales the entries whose row and column differ in that qubit by `1-2p`,
+    # so the multiplier of entry (i, j) only depends on the bits of i and j on the qubits with errors
+    classes = [
+        sum(1 << t for t, (bit, _) in enumerate(z_errors) if i & bit)
+        for i in range(2**n)
+    ]
+    # Per qubit the multiplier is `(1-p) + p*s` with `s = -1` if the row and column differ in it, else 1.
+    # The no-error branch contributes the product of the `1-p`, the error branches the remainder, which
+    # is accumulated term by term rather than as a difference of near-unity products.
+    damping = []
+    remainder = []
+    for differing in range(2 ** len(z_errors)):
+        full, no_error, rest = be.scalar(1), be.scalar(1), be.scalar(0)
+        for t, (_, p) in enumerate(z_errors):
+            sign = -1 if differing >> t & 1 else 1
+            rest = rest * (1 - p + sign * p) + no_error * sign * p
+            full = full * (1 - p + sign * p)
+            no_error = no_error * (1 - p)
+        damping.append(full)
+        remainder.append(rest)
+
+    def table(factors: List[Any]) -> Table:
+        return [
+            [factors[a ^ b] for b in range(2 ** len(z_errors))]
+            for a in range(2 ** len(z_errors))
+        ]
+
+    return DiagonalChannel(
+        classes, table(damping), table([no_error] * len(damping)), table(remainder)
+    )
+
+
+def apply_storage(
+    state: State,
+    x: Sequence[mpmath.mpf] = (),
+    z: Sequence[mpmath.mpf] = (),
+) -> State:
+    """
+    Applies independent X and Z storage errors, where `x[k]` / `z[k]` is the probability of an X / Z error on
+    qubit `k+1`. Qubits with a zero error probability are skipped.
+
+    All Z errors are applied in a single elementwise multiplication, see `z_storage`, each X error as one
+    permutation pass
+    """
+    be = backend_of_state(state)
+    n = max(len(x), len(z))
+    x_errors = [
+        (1 << (n - 1 - k), be.scalar(p)) for k, p in enumerate(x) if not is_zero(p)
+    ]
+
+    dephasing = z_storage(be, z, n)
+    if dephasing is not None:
+        state = apply_diagonal(state, dephasing)
+
+    ones = [be.scalar(1)] * 2**n
+    for bit, p in x_errors:
+        perm = [i ^ bit for i in range(2**n)]
+
+        def flip(m: Matrix) -> Matrix:
+            return be.permute(m, perm, ones, ones)
+
+        state = apply_channel(
+            state,
+            lambda m: m * (1 - p) + flip(m) * p,
+            lambda m: m * (1 - p),
+            lambda m: flip(m) * p,
+        )
+
+    return state
+
+
 def storage_x_4(state, p1, p2, p3, p4):
     """
     For the 8-to-CCZ protocol, applies X/Z storage errors to qubits 1-4 with probabilities p1-p4
     """
-    res = apply_pauli(state, [x, one, one, one], p1)
-    res = apply_pauli(res, [one, x, one, one], p2)
-    res = apply_pauli(res, [one, one, x, one], p3)
-    res = apply_pauli(res, [one, one, one, x], p4)
-    return res
+    return apply_storage(state, x=[p1, p2, p3, p4])
 
 
 def storage_z_4(state, p1, p2, p3, p4):
-    res = apply_pauli(state, [z, one, one, one], p1)
-    res = apply_pauli(res, [one, z, one, one], p2)
-    res = apply_pauli(res, [one, one, z, one], p3)
-    res = apply_pauli(res, [one, one, one, z], p4)
-    return res
+    return apply_storage(state, z=[p1, p2, p3, p4])
 
 
 def storage_x_5(state, p1, p2, p3, p4, p5):
     """
     For the 15-to-1 protocol, applies X/Z storage errors to qubits 1-5 with probabilities p1-p5
     """
-    res = apply_pauli(state, [x, one, one, one, one], p1)
-    res = apply_pauli(res, [one, x, one, one, one], p2)
-    res = apply_pauli(res, [one, one, x, one, one], p3)
-    res = apply_pauli(res, [one, one, one, x, one], p4)
-    res = apply_pauli(res, [one, one, one, one, x], p5)
-    return res
+    return apply_storage(state, x=[p1, p2, p3, p4, p5])
 
 
 def storage_z_5(state, p1, p2, p3, p4, p5):
-    res = apply_pauli(state, [z, one, one, one, one], p1)
-    res = apply_pauli(res, [one, z, one, one, one], p2)
-    res = apply_pauli(res, [one, one, z, one, one], p3)
-    res = apply_pauli(res, [one, one, one, z, one], p4)
-    res = apply_pauli(res, [one, one, one, one, z], p5)
-    return res
+    return apply_storage(state, z=[p1, p2, p3, p4, p5])
 
 
 def storage_x_7(state, p1, p2, p3, p4, p5, p6, p7):
     """
     For the 20-to-4 protocol, applies X/Z storage errors to qubits 1-7 with probabilities p1-p7
     """
-    res = apply_pauli(state, [x, one, one, one, one, one, one], p1)
-    res = apply_pauli(res, [one, x, one, one, one, one, one], p2)
-    res = apply_pauli(res, [one, one, x, one, one, one, one], p3)
-    res = apply_pauli(res, [one, one, one, x, one, one, one], p4)
-    res = apply_pauli(res, [one, one, one, one, x, one, one], p5)
-    res = apply_pauli(res, [one, one, one, one, one, x, one], p6)
-    res = apply_pauli(res, [one, one, one, one, one, one, x], p7)
-    return res
+    return apply_storage(state, x=[p1, p2, p3, p4, p5, p6, p7])
 
 
 def storage_z_7(state, p1, p2, p3, p4, p5, p6, p7):
-    res = apply_pauli(state, [z, one, one, one, one, one, one], p1)
-    res = apply_pauli(res, [one, z, one, one, one, one, one], p2)
-    res = apply_pauli(res, [one, one, z, one, one, one, one], p3)
-    res = apply_pauli(res, [one, one, one, z, one, one, one], p4)
-    res = apply_pauli(res, [one, one, one, one, z, one, one], p5)
-    res = apply_pauli(res, [one, one, one, one, one, z, one], p6)
-    res = apply_pauli(res, [one, one, one, one, one, one, z], p7)
-    return res
+    return apply_storage(state, z=[p1, p2, p3, p4, p5, p6, p7])
@@ -0,0 +1,162 @@
+from typing import Any, Tuple
+
+import mpmath
+import numpy as np
+from mpmath import mp
+
+# Double-double numbers represent `hi + lo` with `|lo| <= ulp(hi) / 2`, giving about 106 bits of precision.
+# The error-free transformations below are the classic ones of Dekker and Knuth, applied elementwise.
+
+_SPLITTER = 134217729.0  # 2^27 + 1
+
+
+def two_sum(a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    s = a + b
+    bb = s - a
+    return s, (a - (s - bb)) + (b - bb)
+
+
+def quick_two_sum(a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    s = a + b
+    return s, b - (s - a)
+
+
+def split(a: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    t = _SPLITTER * a
+    hi = t - (t - a)
+    return hi, a - hi
+
+
+def two_prod(a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    p = a * b
+    ah, al = split(a)
+    bh, bl = split(b)
+    return p, ((ah * bh - p) + ah * bl + al * bh) + al * bl
+
+
+def dd_add(a: Tuple[Any, Any], b: Tuple[Any, Any]) -> Tuple[Any, Any]:
+    s, e = two_sum(a[0], b[0])
+    t, f = two_sum(a[1], b[1])
+    s, e = quick_two_sum(s, e + t)
+    return quick_two_sum(s, e + f)
+
+
+def dd_mul(a: Tuple[Any, Any], b: Tuple[Any, Any]) -> Tuple[Any, Any]:
+    p, e = two_prod(a[0], b[0])
+    return quick_two_sum(p, e + (a[0] * b[1] + a[1] * b[0]))
+
+
+def dd_neg(a: Tuple[Any, Any]) -> Tuple[Any, Any]:
+    return -a[0], -a[1]
+
+
+def to_dd(value: Any) -> Tuple[float, float]:
+    """
+    Rounds a real mpmath number to the nearest double-double
+    """
+    value = mp.mpf(value)
+    hi = float(value)
+    return hi, float(value - hi)
+
+
+class DDArray:
+    """
+    Array of complex double-double numbers, stored as four float64 arrays for the high and low parts of the
+    real and imaginary parts
+    """
+
+    def __init__(self, re: Tuple[Any, Any], im: Tuple[Any, Any]):
+        self.re = (np.asarray(re[0], dtype=float), np.asarray(re[1], dtype=float))
+        self.im = (np.asarray(im[0], dtype=float), np.asarray(im[1], dtype=float))
+
+    @classmethod
+    def from_values(cls, values: Any) -> "DDArray":
+        """
+        Converts a nested sequence of mpmath or Python numbers entry by entry
+        """
+        values = np.asarray(values, dtype=object)
+        parts = np.empty(values.shape + (4,))
+        for index, value in np.ndenumerate(values):
+            value = mp.mpc(value)
+            parts[index] = to_dd(value.real) + to_dd(value.imag)
+        return cls(
+            (parts[..., 0], parts[..., 1]),
+            (parts[..., 2], parts[..., 3]),
+        )
+
+    @classmethod
+    def lift(cls, other: Any) -> "DDArray":
+        if isinstance(other, DDArray):
+            return other
+        return cls.from_values(other)
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self.re[0].shape
+
+    def __getitem__(self, index: Any) -> "DDArray":
+        return DDArray(
+            (self.re[0][index], self.re[1][index]),
+            (self.im[0][index], self.im[1][index]),
+        )
+
+    def __add__(self, other: Any) -> "DDArray":
+        other = DDArray.lift(other)
+        return DDArray(dd_add(self.re, other.re), dd_add(self.im, other.im))
+
+    __radd__ = __add__
+
+    def __neg__(self) -> "DDArray":
+        return DDArray(dd_neg(self.re), dd_neg(self.im))
+
+    def __sub__(self, other: Any) -> "DDArray":
+        return self + (-DDArray.lift(other))
+
+    def __rsub__(self, other: Any) -> "DDArray":
+        return DDArray.lift(other) + (-self)
+
+    def __mul__(self, other: Any) -> "DDArray":
+        other = DDArray.lift(other)
+        return DDArray(
+            dd_add(dd_mul(self.re, other.re), dd_neg(dd_mul(self.im, other.im))),
+            dd_add(dd_mul(self.re, other.im), dd_mul(self.im, other.re)),
+        )
+
+    __rmul__ = __mul__
+
+    def reshape(self, *shape: int) -> "DDArray":
+        return DDArray(
+            (self.re[0].reshape(*shape), self.re[1].reshape(*shape)),
+            (self.im[0].reshape(*shape), self.im[1].reshape(*shape)),
+        )
+
+    def conj(self) -> "DDArray":
+        return DDArray(self.re, dd_neg(self.im))
+
+    def transpose(self, *axes: int) -> "DDArray":
+        return DDArray(
+            (self.re[0].transpose(*axes), self.re[1].transpose(*axes)),
+            (self.im[0].transpose(*axes), self.im[1].transpose(*axes)),
+        )
+
+    def sum(self) -> mpmath.mpc:
+        """
+        Sum of all entries, accumulated in double-double and returned as an mpmath number
+        """
+        re = (0.0, 0.0)
+        im = (0.0, 0.0)
+        for index in np.ndindex(*self.shape):
+            re = dd_add(re, (self.re[0][index], self.re[1][index]))
+            im = dd_add(im, (self.im[0][index], self.im[1][index]))
+        return mp.mpc(mp.mpf(re[0]) + re[1], mp.mpf(im[0]) + im[1])
+
+    def to_mpmath(self) -> mpmath.matrix:
+        rows, cols = self.shape
+        res = mp.matrix(rows, cols)
+        for i in range(rows):
+            for j in range(cols):
+                res[i, j] = mp.mpc(
+                    mp.mpf(self.re[0][i, j]) + self.re[1][i, j],
+                    mp.mpf(self.im[0][i, j]) + self.im[1][i, j],
+                )
+        return res
@@ -1,9 +1,6 @@
-import mpmath as mp
-
-mp.prec = 128
+import mpmath
 
 from multiprocessing import Pool
-import pandas as pd
 from datetime import datetime
 
 from ..magic_state_factory import MagicStateFactory
@@ -13,12 +10,15 @@ import itertools
 import numpy as np
 
 
-def objective(factory: MagicStateFactory) -> mp.mpf:
-    return mp.mpf(factory.distilled_magic_state_error_rate) / factory.qubits
+def objective(factory: MagicStateFactory) -> mpmath.mpf:
+    return mpmath.mpf(factory.distilled_magic_state_error_rate) / factory.qubits
 
 
 step_size: int = 2
 
+# Working precision of the simulations in bits, or "auto" to choose it per simulation from its output error
+precision = "auto"
+
 
 # find the best factory which has less than 1000 qubits.
 class SimulationOneLevel15to1SmallFootprint:
@@ -31,42 +31,44 @@ class SimulationOneLevel15to1SmallFootprint:
         dm: int,
         tag: str = "Simulation",
     ):
-        self.prec = mp.prec
         self.pphys = error_rate
         self.dx = dx
         self.dz = dz
         self.dm = dm
-        self.factory = cost_of_one_level_15to1_small_footprint(error_rate, dx, dz, dm)
+        self.factory = cost_of_one_level_15to1_small_footprint(
+            error_rate, dx, dz, dm, precision=precision
+        )
         print(
             f"{tag}: {self.factory.name}; rating={self.rating()}; qubits={self.factory.qubits}"
         )
 
-    def rating(self) -> mp.mpf:
+    def rating(self) -> mpmath.mpf:
         if self.factory.qubits > 3000:
             return -99999999
         return -math.log10(self.factory.distilled_magic_state_error_rate)
 
 
-df = pd.DataFrame(
-    columns=[
-        "date",
-        "precision_in_bits",
-        "pphys",
-        "dx",
-        "dz",
-        "dm",
-        "error_rate",
-        "qubits",
-        "code_cycles",
-    ]
-)
+columns = [
+    "date",
+    "precision_in_bits",
+    "pphys",
+    "dx",
+    "dz",
+    "dm",
+    "error_rate",
+    "qubits",
+    "code_cycles",
+]
+
+# Rows of the simulation log, only turned into a DataFrame when saving so workers never import pandas
+rows: list = []
 
 
 def log_simulation(sim: SimulationOneLevel15to1SmallFootprint) -> None:
     new_row = {
         "date": datetime.now().strftime("%Y-%m-%d %H:%M"),
         "pphys": sim.pphys,
-        "precision_in_bits": mp.prec,
+        "precision_in_bits": sim.factory.precision_in_bits,
         "dx": sim.dx,
         "dz": sim.dz,
         "dm": sim.dm,
@@ -74,7 +76,7 @@ def log_simulation(sim: SimulationOneLevel15to1SmallFootprint) -> None:
         "qubits": sim.factory.qubits,
         "code_cycles": sim.factory.distillation_time_in_cycles,
     }
-    df.loc[len(df)] = new_row  # type: ignore
+    rows.append(new_row)
 
 
 def search_for_optimal_factory():
@@ -110,7 +112,9 @@ def search_for_optimal_factory():
                 for job in jobs:
                     log_simulation(job.get())
     finally:
-        df.to_csv(
+        import pandas as pd
+
+        pd.DataFrame(rows, columns=columns).to_csv(
             f'Simulation_Data/small_footprint_one_level_15to1_varying_pphys-{datetime.now().strftime("%Y-%m-%d-%H-%M")}.csv',
             mode="a",
             index=False,
@@ -1,5 +1,4 @@
 import pandas as pd
-from scipy.spatial import ConvexHull
 import numpy as np
 
 # Load the data from CSV
@@ -1,8 +1,6 @@
-import mpmath as mp
+import mpmath
 
-mp.prec = 128
 from multiprocessing import Pool
-import pandas as pd
 from datetime import datetime
 
 from ..magic_state_factory import MagicStateFactory
@@ -11,11 +9,14 @@ import math
 import itertools
 
 
-def objective(factory: MagicStateFactory) -> mp.mpf:
-    return mp.mpf(factory.distilled_magic_state_error_rate) / factory.qubits
+def objective(factory: MagicStateFactory) -> mpmath.mpf:
+    return mpmath.mpf(factory.distilled_magic_state_error_rate) / factory.qubits
 
 
 step_size: int = 2
+
+# Working precision of the simulations in bits, or "auto" to choose it per simulation from its output error
+precision = "auto"
 pphys = 10**-3
 
 
@@ -32,7 +33,6 @@ class SimulationTwoLevel15to1SmallFootprint:
         dm2: int,
         tag: str = "Simulation",
     ):
-        self.prec = mp.prec
         self.pphys = pphys
         self.dx = dx
         self.dz = dz
@@ -41,39 +41,40 @@ class SimulationTwoLevel15to1SmallFootprint:
         self.dz2 = dz2
         self.dm2 = dm2
         self.factory = cost_of_two_level_15to1_small_footprint(
-            pphys, dx, dz, dm, dx2, dz2, dm2
+            pphys, dx, dz, dm, dx2, dz2, dm2, precision=precision
         )
         print(
             f"{tag}: {self.factory.name}; rating={self.rating()}; qubits={self.factory.qubits}"
         )
 
-    def rating(self) -> mp.mpf:
+    def rating(self) -> mpmath.mpf:
         return -math.log10(self.factory.distilled_magic_state_error_rate)
 
 
-df = pd.DataFrame(
-    columns=[
-        "date",
-        "precision_in_bits",
-        "pphys",
-        "dx",
-        "dz",
-        "dm",
-        "dx2",
-        "dz2",
-        "dm2",
-        "error_rate",
-        "qubits",
-        "code_cycles",
-    ]
-)
+columns = [
+    "date",
+    "precision_in_bits",
+    "pphys",
+    "dx",
+    "dz",
+    "dm",
+    "dx2",
+    "dz2",
+    "dm2",
+    "error_rate",
+    "qubits",
+    "code_cycles",
+]
+
+# Rows of the simulation log, only turned into a DataFrame when saving so workers never import pandas
+rows: list = []
 
 
 def log_simulation(sim: SimulationTwoLevel15to1SmallFootprint) -> None:
     new_row = {
         "date": datetime.now().strftime("%Y-%m-%d %H:%M"),
         "pphys": pphys,
-        "precision_in_bits": mp.prec,
+        "precision_in_bits": sim.factory.precision_in_bits,
         "dx": sim.dx,
         "dz": sim.dz,
         "dm": sim.dm,
@@ -84,7 +85,7 @@ def log_simulation(sim: SimulationTwoLevel15to1SmallFootprint) -> None:
         "qubits": sim.factory.qubits,
         "code_cycles": sim.factory.distillation_time_in_cycles,
     }
-    df.loc[len(df)] = new_row  # type: ignore
+    rows.append(new_row)
 
 
 def search_for_optimal_factory():
@@ -126,7 +127,9 @@ def search_for_optimal_factory():
                 for job in jobs:
                     log_simulation(job.get())
     finally:
-        df.to_csv(
+        import pandas as pd
+
+        pd.DataFrame(rows, columns=columns).to_csv(
             f'Simulation_Data/small_footprint_two_level_15to1_simulations-{datetime.now().strftime("%Y-%m-%d-%H-%M")}.csv',
             mode="a",
             index=False,
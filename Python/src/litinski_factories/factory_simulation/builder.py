@@ -0,0 +1,355 @@
+from itertools import combinations
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import mpmath
+
+from ..backends import BackendLike, get_backend
+from ..definitions import (
+    Precision,
+    magic_states,
+    pauli_of,
+    postselection_errors,
+    scoped_precision,
+)
+from ..magic_state_factory import MagicStateFactory
+from ..pauli_transfer import pauli_postselection_errors, run_pauli_transfer
+from ..schedule import (
+    Expr,
+    Label,
+    Rotation,
+    Schedule,
+    Step,
+    Storage,
+    evaluate,
+    run_schedule,
+)
+
+# Builds the schedule and cost of a distillation protocol from its rotations instead of unrolling it by
+# hand: `DistillationCode` describes the protocol, and a layout such as `LinearLayout` supplies the error
+# probabilities of its rotations and storage windows and the cost of the factory
+
+
+class DistillationCode(NamedTuple):
+    """
+    A distillation protocol as the `pi/8` rotations about Z-type Pauli strings it applies to |+> states, in
+    the steps they are applied in
+
+    The first `outputs` qubits are the output qubits, the others are check qubits post-selected in |+>.
+    Single-qubit rotations are faulty T measurements on their patch and do not count towards the rotations
+    per step of a layout
+    """
+
+    name: str
+    outputs: int
+    steps: Tuple[Tuple[str, ...], ...]
+
+    @property
+    def qubits(self) -> int:
+        return pauli_of(self.steps[0][0]).n
+
+    @property
+    def order(self) -> int:
+        """
+        Leading order of the output error in the rotation errors: the fewest faulty rotations whose Z errors
+        leave all check qubits in |+> but not all output qubits
+        """
+        masks = [
+            sum(1 << k for k in _support(axis)) for step in self.steps for axis in step
+        ]
+        checks = (1 << self.qubits) - (1 << self.outputs)
+        for weight in range(1, len(masks) + 1):
+            for faults in combinations(masks, weight):
+                error = 0
+                for mask in faults:
+                    error ^= mask
+                if error and not error & checks:
+                    return weight
+        raise ValueError(f"{self.name} detects every error of its rotations")
+
+
+def distillation_code(
+    name: str, outputs: int, axes: Sequence[str], per_step: int = 2
+) -> DistillationCode:
+    """
+    `DistillationCode` applying the rotations about `axes` in order, with up to `per_step` multi-qubit
+    rotations per step
+    """
+    steps: List[List[str]] = [[]]
+    for axis in axes:
+        multi = _support(axis)
+        if len(multi) > 1 and sum(len(_support(a)) > 1 for a in steps[-1]) == per_step:
+            steps.append([])
+        steps[-1].append(axis)
+    return DistillationCode(name, outputs, tuple(tuple(step) for step in steps))
+
+
+def _support(axis: str) -> List[int]:
+    # The qubits an axis acts on, with qubit 0 the leftmost
+    return [k for k, letter in enumerate(axis.lstrip("+-i")) if letter != "I"]
+
+
+FIFTEEN_TO_ONE = DistillationCode(
+    name="15-to-1",
+    outputs=1,
+    steps=(
+        ("IZIII", "IIZII", "IIIZI", "IZZZI"),
+        ("ZZZII", "ZZIZI"),
+        ("ZIZZI", "ZIIZZ", "IIIIZ"),
+        ("ZZIIZ", "ZIZIZ"),
+        ("ZZZZZ", "IIZZZ"),
+        ("IZIZZ", "IZZIZ"),
+    ),
+)
+
+TWENTY_TO_FOUR = DistillationCode(
+    name="20-to-4",
+    outputs=4,
+    steps=(
+        ("-IIIIZII", "-IIIIIZI"),
+        ("ZIIIZZI", "-IIIIZZZ"),
+        ("ZIIIIZZ", "-IIIIIIZ"),
+        ("ZIIIZIZ", "IZIIZZI"),
+        ("ZZZZIZI", "IZIIZIZ"),
+        ("ZZZZZII", "IZIIIZZ"),
+        ("ZZZZZZZ", "IIZIZZI"),
+        ("ZZZZIIZ", "IIZIZIZ"),
+        ("IIZIIZZ", "IIIZZZI"),
+        ("IIIZZIZ", "IIIZIZZ"),
+    ),
+)
+
+
+class LinearLayout:
+    """
+    Cost model of the one-level 15-to-1 protocol of `onelevel15to1`, for any `DistillationCode`: the output
+    patches of distance `dx` and the check patches of distance `dz` in a row, with an ancilla region above and
+    below for up to two multi-patch measurements of `dm` code cycles per step
+
+    Subclasses model other layouts by overriding the error probabilities and costs, all expressions in the
+    `parameters` and `derived` shorthands of the schedule
+    """
+
+    parameters: Tuple[str, ...] = ("pphys", "dx", "dz", "dm")
+    derived: Tuple[Tuple[str, Expr], ...] = (
+        ("px", "plog(pphys, dx)"),
+        ("pz", "plog(pphys, dz)"),
+        ("pm", "plog(pphys, dm)"),
+    )
+    rotations_per_step = 2
+
+    def width(self, code: DistillationCode, qubits: Sequence[int]) -> str:
+        """
+        Total width of the patches of `qubits`, e.g. "dx + 4 * dz"
+        """
+        outputs = sum(k < code.outputs for k in qubits)
+        terms = [
+            (count, distance)
+            for count, distance in ((outputs, "dx"), (len(qubits) - outputs, "dz"))
+            if count
+        ]
+        return " + ".join(f"{c} * {d}" if c > 1 else d for c, d in terms)
+
+    def span(self, code: DistillationCode, axis: str) -> str:
+        """
+        Length of the ancilla region measuring the multi-qubit rotation about `axis`, along the patches from
+        its first to its last qubit
+        """
+        support = _support(axis)
+        return self.width(code, range(support[0], support[-1] + 1))
+
+    def rotation(self, code: DistillationCode, axis: str) -> Rotation:
+        """
+        The noisy rotation about `axis`
+        """
+        support = _support(axis)
+        if len(support) == 1:
+            # Faulty T measurement on the patch
+            d, p = ("dx", "px") if support[0] < code.outputs else ("dz", "pz")
+            return Rotation(
+                axis,
+                f"pphys / 3 + 0.5 * (dm / {d}) * {p} * dm",
+                f"pphys / 3 + 0.5 * {d} * pm",
+                "pphys / 3",
+            )
+        return Rotation(
+            axis,
+            "pphys / 3 + 0.5 * pm * dm",
+            f"pphys / 3 + 0.5 * pm * dm + 0.5 * ({self.span(code, axis)}) * dx / dm * pm",
+            "pphys / 3",
+        )
+
+    def storage(self, code: DistillationCode, step: int) -> List[Storage]:
+        """
+        The storage windows after the rotations of step `step`: the Z errors of the output patches next to
+        the ancilla regions, and the errors of all qubits in use for `dm` code cycles, plus `2 * dx` cycles for
+        the output qubits consumed after this step
+        """
+        windows: List[Storage] = []
+        first, last = _first_and_last_steps(code)
+        spans: List[List[str]] = [[] for _ in range(code.outputs)]
+        for axis in code.steps[step]:
+            support = _support(axis)
+            if len(support) > 1:
+                for k in support:
+                    if k < code.outputs:
+                        spans[k].append(self.span(code, axis))
+        if any(spans):
+            windows.append(
+                Storage(
+                    z=tuple(_ancilla_storage(s) for s in spans)
+                    + (0,) * (code.qubits - code.outputs)
+                )
+            )
+
+        x: List[Expr] = []
+        z: List[Expr] = []
+        for k in range(code.qubits):
+            if k < code.outputs:
+                if not first[k] <= step <= last[k]:
+                    p: Expr = 0
+                elif step == last[k]:
+                    p = "0.5 * px * (dm + 2 * dx)"
+                else:
+                    p = "0.5 * px * dm"
+                x.append(p)
+                z.append(p)
+            elif first[k] <= step:
+                x.append("0.5 * (dz / dx) * px * dm")
+                z.append("0.5 * (dx / dz) * pz * dm")
+            else:
+                x.append(0)
+                z.append(0)
+        windows += [Storage(x=tuple(x)), Storage(z=tuple(z))]
+        return windows
+
+    def qubits(self, code: DistillationCode) -> str:
+        """
+        Number of physical qubits of the factory
+        """
+        return f"2 * (({self.width(code, range(code.qubits))}) * 3 * dx + 2 * dm)"
+
+    def dimensions(self, code: DistillationCode) -> Tuple[str, str]:
+        """
+        Height and width of the factory in physical qubits
+        """
+        return "3 * dx", self.width(code, range(code.qubits))
+
+    def cycles(self, code: DistillationCode) -> str:
+        """
+        Code cycles of one run of the protocol, without repetitions after failures
+        """
+        return f"{len(code.steps)} * dm"
+
+
+def _first_and_last_steps(code: DistillationCode) -> Tuple[List[int], List[int]]:
+    used = [{k for axis in step for k in _support(axis)} for step in code.steps]
+    steps = range(len(used))
+    return (
+        [min(s for s in steps if k in used[s]) for k in range(code.qubits)],
+        [max(s for s in steps if k in used[s]) for k in range(code.qubits)],
+    )
+
+
+def _ancilla_storage(spans: List[str]) -> Expr:
+    # Z error probability of an output patch next to the ancilla regions of lengths `spans`
+    if not spans:
+        return 0
+    total = spans[0] if len(spans) == 1 else " + ".join(f"({s})" for s in spans)
+    return f"0.5 * ({total}) / dx * px * dm"
+
+
+def build_schedule(
+    code: DistillationCode, layout: Optional[LinearLayout] = None
+) -> Schedule:
+    """
+    The `Schedule` of `code` with the error probabilities of `layout`, by default a `LinearLayout`
+    """
+    layout = layout or LinearLayout()
+    steps: List[Step] = []
+    number = 0
+    for s, rotations in enumerate(code.steps):
+        multi = sum(len(_support(axis)) > 1 for axis in rotations)
+        if multi > layout.rotations_per_step:
+            raise ValueError(
+                f"Step {s + 1} of {code.name} has {multi} multi-qubit rotations, "
+                f"the layout allows {layout.rotations_per_step}"
+            )
+        first, number = number + 1, number + len(rotations)
+        numbers = f"{first}-{number}" if number > first else f"{first}"
+        steps.append(
+            Label(
+                f"Step 1 of {code.name} protocol applying rotations {numbers}"
+                if s == 0
+                else f"Step {s + 1}: apply rotations {numbers}"
+            )
+        )
+        steps += [layout.rotation(code, axis) for axis in rotations]
+        steps += layout.storage(code, s)
+    return Schedule(
+        name=code.name,
+        qubits=code.qubits,
+        parameters=layout.parameters,
+        derived=layout.derived,
+        steps=tuple(steps),
+    )
+
+
+def protocol_errors(
+    schedule: Schedule,
+    ideal: mpmath.matrix,
+    backend: BackendLike = "mpmath",
+    **parameters: Any,
+) -> Tuple[Any, Any]:
+    """
+    Failure probability and output error of post-selecting all but the output qubits of `schedule` in |+>,
+    with the ideal output `ideal`, on the fastest engine for `backend`
+
+    Backends that evolve a `SplitState` run the dense schedule, whose ideal branch keeps the output error
+    accurate in double precision. All others run the Pauli-transfer engine, which is faster on every
+    protocol of this package
+    """
+    be = get_backend(backend)
+    if be.split_ideal_branch:
+        return postselection_errors(run_schedule(schedule, be, **parameters), ideal)
+    outputs = ideal.rows.bit_length() - 1
+    state = run_pauli_transfer(schedule, outputs, be, **parameters)
+    return pauli_postselection_errors(state, ideal)
+
+
+@scoped_precision(order=lambda arguments: arguments["code"].order)
+def cost_of_protocol(
+    code: DistillationCode,
+    pphys: float | mpmath.mpf,
+    layout: Optional[LinearLayout] = None,
+    ideal: Optional[mpmath.matrix] = None,
+    backend: BackendLike = "mpmath",
+    precision: Precision = None,
+    **parameters: Any,
+) -> MagicStateFactory:
+    """
+    Calculates the output error and cost of the protocol of `code` with a physical error rate `pphys` and
+    the other `parameters` of `layout`, by default a `LinearLayout` with distances `dx`, `dz` and `dm`
+
+    `ideal` is the ideal output, by default the magic states of the output qubits. The output error is per
+    output qubit, as for the 20-to-4 protocol of `twolevel20to4`
+    """
+    layout = layout or LinearLayout()
+    schedule = build_schedule(code, layout)
+    pphys = get_backend(backend).scalar(pphys)
+    if ideal is None:
+        ideal = magic_states(code.outputs)
+    pfail, pout = protocol_errors(schedule, ideal, backend, pphys=pphys, **parameters)
+
+    namespace: Dict[str, Any] = dict(pphys=float(pphys), **parameters)
+    height, width = layout.dimensions(code)
+    settings = ", ".join(f"{k}={v}" for k, v in namespace.items())
+    return MagicStateFactory(
+        name=f"{code.name} with {settings}",
+        distilled_magic_state_error_rate=float(pout / code.outputs),
+        qubits=int(evaluate(layout.qubits(code), namespace)),
+        distillation_time_in_cycles=float(
+            evaluate(layout.cycles(code), namespace) / (1 - pfail)
+        ),
+        dimensions=(int(evaluate(height, namespace)), int(evaluate(width, namespace))),
+        n_t_gates_produced_per_distillation=code.outputs,
+    )
@@ -0,0 +1,245 @@
+from dataclasses import dataclass
+from functools import lru_cache, partial
+from typing import Any, Callable, NamedTuple, Optional, Sequence, Tuple
+
+import mpmath
+from mpmath import mp
+
+from ..backends import BackendLike, get_backend
+from ..definitions import (
+    OPERATOR_CACHE_SIZE,
+    CCZstate,
+    Precision,
+    magic_states,
+    postselection_errors,
+    scoped_precision,
+)
+from ..magic_state_factory import MagicStateFactory
+from ..schedule import FUNCTIONS, Expr, Schedule, evaluate, run_schedule
+from .twolevel15to1 import TWO_LEVEL_15TO1, one_level_15to1_state_memoized
+from .twolevel20to4 import TWO_LEVEL_20TO4
+from .twolevel8toCCZ import TWO_LEVEL_8TOCCZ
+
+# Factories of any number of levels: level 1 is the 15-to-1 protocol of `onelevel15to1`, and every level
+# above runs the level-2 protocol of a two-level factory on the output states of `n_lower` factories of the
+# level below, which it only sees through their `LevelSummary`. Levels are cached on their parameters and the
+# summary of the level below, so that a sweep over the upper levels evaluates every lower level once, up to
+# the `OPERATOR_CACHE_SIZE` most recently used levels of each kind
+
+
+class LevelSummary(NamedTuple):
+    """
+    What a level supplies to the level above: its failure probability and output error per output state as
+    backend scalars, the code cycles per distillation including repetitions after failures, the outputs per
+    distillation, and the physical qubits and footprint of one factory
+    """
+
+    pfail: Any
+    pout: Any
+    cycles: Any
+    outputs: int
+    qubits: int
+    dimensions: Optional[Tuple[int, int]]
+
+
+@dataclass(frozen=True, eq=False)
+class UpperLevel:
+    """
+    A protocol consuming the output states of lower-level factories, as level 2 of the two-level factories
+
+    `schedule` has the parameters of the level-2 schedules, in terms of which `width` is the width of its
+    block, run in `rotation_steps` steps of `l1time` code cycles each. `dimensions` is its footprint in terms of
+    these parameters and the `height` and `width` of a lower-level factory, or None where unknown. `ideal`
+    returns the ideal output at the working precision
+    """
+
+    name: str
+    schedule: Schedule
+    ideal: Callable[[], mpmath.matrix]
+    width: Expr
+    rotation_steps: float
+    outputs: int = 1
+    dimensions: Optional[Tuple[Expr, Expr]] = None
+
+
+LEVEL_15TO1 = UpperLevel(
+    name="15-to-1",
+    schedule=TWO_LEVEL_15TO1,
+    ideal=partial(magic_states, 1),
+    width="dx2 + 4 * dz2",
+    rotation_steps=7.5,
+    dimensions=("2 * height + dm2 + max(dx2 - height, 0)", "width"),
+)
+
+LEVEL_20TO4 = UpperLevel(
+    name="20-to-4",
+    schedule=TWO_LEVEL_20TO4,
+    ideal=partial(magic_states, 4),
+    width="4 * dx2 + 3 * dz2",
+    rotation_steps=10,
+    outputs=4,
+)
+
+LEVEL_8TOCCZ = UpperLevel(
+    name="8-to-CCZ",
+    schedule=TWO_LEVEL_8TOCCZ,
+    ideal=lambda: CCZstate,
+    width="3 * dx2 + dz2",
+    rotation_steps=4,
+)
+
+
+class FactoryLevel(NamedTuple):
+    """
+    A level above the first: its protocol, its distances and the number of factories of the level below
+    feeding it
+    """
+
+    protocol: UpperLevel
+    dx: int
+    dz: int
+    dm: int
+    n_lower: int
+
+
+@lru_cache(maxsize=OPERATOR_CACHE_SIZE)
+def first_level(
+    pphys: Any,
+    dx: int,
+    dz: int,
+    dm: int,
+    backend: BackendLike = "mpmath",
+    prec: int = 0,
+) -> LevelSummary:
+    """
+    `LevelSummary` of the 15-to-1 protocol with distances `dx`, `dz` and `dm`, cached at the working
+    precision `prec`
+    """
+    pfail, pout = one_level_15to1_state_memoized(pphys, dx, dz, dm, backend, prec)
+    return LevelSummary(
+        pfail=pfail,
+        pout=pout,
+        cycles=6 * dm / (1 - pfail),
+        outputs=1,
+        qubits=2 * ((dx + 4 * dz) * 3 * dx + 2 * dm),
+        dimensions=(3 * dx, dx + 4 * dz),
+    )
+
+
+@lru_cache(maxsize=OPERATOR_CACHE_SIZE)
+def upper_level(
+    level: UpperLevel,
+    lower: LevelSummary,
+    pphys: Any,
+    dx: int,
+    dz: int,
+    dm: int,
+    n_lower: int,
+    backend: BackendLike = "mpmath",
+    prec: int = 0,
+) -> LevelSummary:
+    """
+    `LevelSummary` of `level` with distances `dx`, `dz` and `dm` fed by `n_lower` factories summarized by
+    `lower`, cached at the working precision `prec`
+    """
+    if lower.dimensions is None:
+        raise ValueError("The level below has no known footprint to lay out")
+    height, width = lower.dimensions
+
+    # The speed at which rotations can be performed with the states of the level below (t_{L1} in the
+    # paper), consumed two per step
+    l1time = max(lower.cycles / lower.outputs / (n_lower / 2), dm)
+
+    # The effective width-dm region a lower-level state needs to traverse before reaching the block,
+    # picking up additional storage errors
+    lmove = 10 * dm + n_lower / 4 * width
+
+    out = run_schedule(
+        level.schedule,
+        backend,
+        pphys=pphys,
+        dx2=dx,
+        dz2=dz,
+        dm2=dm,
+        pl1=lower.pout,
+        lmove=lmove,
+        l1time=l1time,
+    )
+    pfail, pout = postselection_errors(out, level.ideal())
+
+    namespace = dict(FUNCTIONS, dx2=dx, dz2=dz, dm2=dm, height=height, width=width)
+    qubits = 2 * int(
+        evaluate(level.width, namespace) * 3 * dx
+        + n_lower * (lower.qubits / 2 + width * dm / 2)
+        + 20 * dm * dm
+        + 2 * dx * dm
+    )
+    dimensions = None
+    if level.dimensions is not None:
+        dimensions = (
+            int(evaluate(level.dimensions[0], namespace)),
+            int(evaluate(level.dimensions[1], namespace)),
+        )
+    return LevelSummary(
+        pfail=pfail,
+        pout=pout / level.outputs,
+        cycles=level.rotation_steps * l1time / (1 - pfail),
+        outputs=level.outputs,
+        qubits=qubits,
+        dimensions=dimensions,
+    )
+
+
+def clear_level_cache() -> None:
+    """
+    Empties the caches of `first_level` and `upper_level`
+    """
+    first_level.cache_clear()
+    upper_level.cache_clear()
+
+
+@scoped_precision(order=3)
+def cost_of_concatenated_factory(
+    pphys: float | mpmath.mpf,
+    dx: int,
+    dz: int,
+    dm: int,
+    levels: Sequence[FactoryLevel],
+    backend: BackendLike = "mpmath",
+    precision: Precision = None,
+) -> MagicStateFactory:
+    """
+    Calculates the output error and cost of a factory of 15-to-1 protocols with distances `dx`, `dz` and `dm`
+    feeding the `levels` above in order, with a physical error rate `pphys`
+
+    With one level of `LEVEL_15TO1`, `LEVEL_20TO4` or `LEVEL_8TOCCZ` this is the two-level factory of
+    `cost_of_two_level_15to1`, `cost_of_two_level_20to4` or `cost_of_two_level_8toccz`
+    """
+    pphys = get_backend(backend).scalar(pphys)
+    summary = first_level(pphys, dx, dz, dm, backend, mp.prec)
+    settings = [f"pphys={float(pphys)}, dx={dx}, dz={dz}, dm={dm}"]
+    for k, level in enumerate(levels, 2):
+        summary = upper_level(
+            level.protocol,
+            summary,
+            pphys,
+            level.dx,
+            level.dz,
+            level.dm,
+            level.n_lower,
+            backend,
+            mp.prec,
+        )
+        settings.append(
+            f"dx{k}={level.dx}, dz{k}={level.dz}, dm{k}={level.dm}, nl{k - 1}={level.n_lower}"
+        )
+
+    chain = "x".join(["(15-to-1)"] + [f"({level.protocol.name})" for level in levels])
+    return MagicStateFactory(
+        name=f"{chain} with {', '.join(settings)}",
+        distilled_magic_state_error_rate=float(summary.pout),
+        qubits=summary.qubits,
+        distillation_time_in_cycles=float(summary.cycles),
+        dimensions=summary.dimensions,
+        n_t_gates_produced_per_distillation=summary.outputs,
+    )
@@ -1,328 +1,370 @@
-from ..magic_state_factory import MagicStateFactory
-from scipy import optimize
+from ..magic_state_factory import MagicStateFactory, MagicStateFactoryBatch
 import mpmath
+import numpy as np
+from numpy.typing import ArrayLike
 
+from ..backends import BackendLike, get_backend
+from ..compiled import DEFAULT_ORDER, CompiledProtocol, compile_protocol
 from ..definitions import (
-    z,
-    one,
-    projx,
-    apply_rot,
-    kron,
-    trace,
-    plog,
-    storage_x_5,
-    storage_z_5,
-    init5qubit,
-    ideal15to1,
+    Matrix,
+    postselection_errors,
+    magic_states,
+    Precision,
+    scoped_precision,
+)
+from ..schedule import Label, Rotation, Schedule, Storage, run_schedule
+
+
+ONE_LEVEL_15TO1 = Schedule(
+    name="15-to-1",
+    qubits=5,
+    parameters=("pphys", "dx", "dz", "dm"),
+    derived=(
+        # Introduce shorthand notation for logical error rate with distances dx/dz/dm
+        ("px", "plog(pphys, dx)"),
+        ("pz", "plog(pphys, dz)"),
+        ("pm", "plog(pphys, dm)"),
+    ),
+    steps=(
+        Label("Step 1 of 15-to-1 protocol applying rotations 1-3 and 5"),
+        Rotation(
+            "IZIII",
+            "pphys / 3 + 0.5 * (dm / dz) * pz * dm",
+            "pphys / 3 + 0.5 * dz * pm",
+            "pphys / 3",
+        ),
+        Rotation(
+            "IIZII",
+            "pphys / 3 + 0.5 * (dm / dz) * pz * dm",
+            "pphys / 3 + 0.5 * dz * pm",
+            "pphys / 3",
+        ),
+        Rotation(
+            "IIIZI",
+            "pphys / 3 + 0.5 * (dm / dz) * pz * dm",
+            "pphys / 3 + 0.5 * dz * pm",
+            "pphys / 3",
+        ),
+        Rotation(
+            "IZZZI",
+            "pphys / 3 + 0.5 * pm * dm",
+            "pphys / 3 + 0.5 * pm * dm + 0.5 * (3 * dz) * dx / dm * pm",
+            "pphys / 3",
+        ),
+        # Apply storage errors for dm code cycles
+        Storage(
+            x=(
+                0,
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                0,
+            )
+        ),
+        Storage(
+            z=(
+                0,
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                0,
+            )
+        ),
+        Label("Step 2: apply rotations 6-7"),
+        # Last operation: apply additional storage errors due to multi-patch measurements
+        Rotation(
+            "ZZZII",
+            "pphys / 3 + 0.5 * pm * dm",
+            "pphys / 3 + 0.5 * pm * dm + 0.5 * (dx + 2 * dz) * dx / dm * pm",
+            "pphys / 3",
+        ),
+        Rotation(
+            "ZZIZI",
+            "pphys / 3 + 0.5 * pm * dm",
+            "pphys / 3 + 0.5 * pm * dm + 0.5 * (dx + 3 * dz) * dx / dm * pm",
+            "pphys / 3",
+        ),
+        Storage(z=("0.5 * ((dx + 2 * dz) + (dx + 3 * dz)) / dx * px * dm", 0, 0, 0, 0)),
+        # Apply storage errors for dm code cycles
+        Storage(
+            x=(
+                "0.5 * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                0,
+            )
+        ),
+        Storage(
+            z=(
+                "0.5 * px * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                0,
+            )
+        ),
+        Label("Step 3: apply rotation 4 and 8-9"),
+        Rotation(
+            "ZIZZI",
+            "pphys / 3 + 0.5 * pm * dm",
+            "pphys / 3 + 0.5 * pm * dm + 0.5 * (dx + 3 * dz) * dx / dm * pm",
+            "pphys / 3",
+        ),
+        Rotation(
+            "ZIIZZ",
+            "pphys / 3 + 0.5 * pm * dm",
+            "pphys / 3 + 0.5 * pm * dm + 0.5 * (dx + 4 * dz) * dx / dm * pm",
+            "pphys / 3",
+        ),
+        Rotation(
+            "IIIIZ",
+            "pphys / 3 + 0.5 * (dm / dz) * pz * dm",
+            "pphys / 3 + 0.5 * dz * pm",
+            "pphys / 3",
+        ),
+        Storage(z=("0.5 * ((dx + 3 * dz) + (dx + 4 * dz)) / dx * px * dm", 0, 0, 0, 0)),
+        # Apply storage errors for dm code cycles
+        Storage(
+            x=(
+                "0.5 * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+            )
+        ),
+        Storage(
+            z=(
+                "0.5 * px * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+            )
+        ),
+        Label("Step 4: apply rotations 10-11"),
+        Rotation(
+            "ZZIIZ",
+            "pphys / 3 + 0.5 * pm * dm",
+            "pphys / 3 + 0.5 * pm * dm + 0.5 * (dx + 4 * dz) * dx / dm * pm",
+            "pphys / 3",
+        ),
+        Rotation(
+            "ZIZIZ",
+            "pphys / 3 + 0.5 * pm * dm",
+            "pphys / 3 + 0.5 * pm * dm + 0.5 * (dx + 4 * dz) * dx / dm * pm",
+            "pphys / 3",
+        ),
+        Storage(z=("0.5 * ((dx + 4 * dz) + (dx + 4 * dz)) / dx * px * dm", 0, 0, 0, 0)),
+        # Apply storage errors for dm code cycles
+        Storage(
+            x=(
+                "0.5 * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+            )
+        ),
+        Storage(
+            z=(
+                "0.5 * px * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+            )
+        ),
+        Label("Step 5: apply rotations 12-13"),
+        Rotation(
+            "ZZZZZ",
+            "pphys / 3 + 0.5 * pm * dm",
+            "pphys / 3 + 0.5 * pm * dm + 0.5 * (dx + 4 * dz) * dx / dm * pm",
+            "pphys / 3",
+        ),
+        Rotation(
+            "IIZZZ",
+            "pphys / 3 + 0.5 * pm * dm",
+            "pphys / 3 + 0.5 * pm * dm + 0.5 * (3 * dz) * dx / dm * pm",
+            "pphys / 3",
+        ),
+        Storage(z=("0.5 * (dx + 4 * dz) / dx * px * dm", 0, 0, 0, 0)),
+        # Apply storage errors for dm code cycles
+        # Qubit 1 is consumed as an output state: additional storage errors for dx code cycles
+        Storage(
+            x=(
+                "0.5 * px * (dm + 2 * dx)",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+            )
+        ),
+        Storage(
+            z=(
+                "0.5 * px * (dm + 2 * dx)",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+            )
+        ),
+        Label("Step 6: apply rotation 14-15"),
+        Rotation(
+            "IZIZZ",
+            "pphys / 3 + 0.5 * pm * dm",
+            "pphys / 3 + 0.5 * pm * dm + 0.5 * (4 * dz) * dx / dm * pm",
+            "pphys / 3",
+        ),
+        Rotation(
+            "IZZIZ",
+            "pphys / 3 + 0.5 * pm * dm",
+            "pphys / 3 + 0.5 * pm * dm + 0.5 * (4 * dz) * dx / dm * pm",
+            "pphys / 3",
+        ),
+        # Apply storage errors for dm code cycles
+        Storage(
+            x=(
+                0,
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+            )
+        ),
+        Storage(
+            z=(
+                0,
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+            )
+        ),
+    ),
 )
 
 
 def one_level_15to1_state(
-    pphys: float | mpmath.mpf, dx: int, dz: int, dm: int
-) -> mpmath.matrix:
+    pphys: float | mpmath.mpf | np.ndarray,
+    dx: int | np.ndarray,
+    dz: int | np.ndarray,
+    dm: int | np.ndarray,
+    backend: BackendLike = "mpmath",
+) -> Matrix:
     """
     Generates the output-state density matrix of the 15-to-1 protocol
 
     `pphys`: The physical error rate
 
     `dx`, `dz`, `dm`: distance for x, z, and measurement errors respectively
-    """
-
-    pphys = mpmath.mpf(pphys)
-
-    # Introduce shorthand notation for logical error rate with distances dx/dz/dm
-    px = plog(pphys, dx)
-    pz = plog(pphys, dz)
-    pm = plog(pphys, dm)
-
-    # Step 1 of 15-to-1 protocol applying rotations 1-3 and 5
-    out = apply_rot(
-        init5qubit,
-        [one, z, one, one, one],
-        pphys / 3 + 0.5 * (dm / dz) * pz * dm,
-        pphys / 3 + 0.5 * dz * pm,
-        pphys / 3,
-    )
-
-    out = apply_rot(
-        out,
-        [one, one, z, one, one],
-        pphys / 3 + 0.5 * (dm / dz) * pz * dm,
-        pphys / 3 + 0.5 * dz * pm,
-        pphys / 3,
-    )
-
-    out = apply_rot(
-        out,
-        [one, one, one, z, one],
-        pphys / 3 + 0.5 * (dm / dz) * pz * dm,
-        pphys / 3 + 0.5 * dz * pm,
-        pphys / 3,
-    )
-
-    out = apply_rot(
-        out,
-        [one, z, z, z, one],
-        pphys / 3 + 0.5 * pm * dm,
-        pphys / 3 + 0.5 * pm * dm + 0.5 * (3 * dz) * dx / dm * pm,
-        pphys / 3,
-    )
-
-    # Apply storage errors for dm code cycles
-
-    out = storage_x_5(
-        out,
-        0,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0,
-    )
-
-    out = storage_z_5(
-        out,
-        0,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0,
-    )
-
-    # Step 2: apply rotations 6-7
-    # Last operation: apply additional storage errors due to multi-patch measurements
 
-    out = apply_rot(
-        out,
-        [z, z, z, one, one],
-        pphys / 3 + 0.5 * pm * dm,
-        pphys / 3 + 0.5 * pm * dm + 0.5 * (dx + 2 * dz) * dx / dm * pm,
-        pphys / 3,
-    )
-
-    out = apply_rot(
-        out,
-        [z, z, one, z, one],
-        pphys / 3 + 0.5 * pm * dm,
-        pphys / 3 + 0.5 * pm * dm + 0.5 * (dx + 3 * dz) * dx / dm * pm,
-        pphys / 3,
-    )
-    out = storage_z_5(
-        out, 0.5 * ((dx + 2 * dz) + (dx + 3 * dz)) / dx * px * dm, 0, 0, 0, 0
-    )
-
-    # Apply storage errors for dm code cycles
-    out = storage_x_5(
-        out,
-        0.5 * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0,
-    )
-    out = storage_z_5(
-        out,
-        0.5 * px * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0,
-    )
-
-    # Step 3: apply rotation 4 and 8-9
-    out = apply_rot(
-        out,
-        [z, one, z, z, one],
-        pphys / 3 + 0.5 * pm * dm,
-        pphys / 3 + 0.5 * pm * dm + 0.5 * (dx + 3 * dz) * dx / dm * pm,
-        pphys / 3,
-    )
-    out = apply_rot(
-        out,
-        [z, one, one, z, z],
-        pphys / 3 + 0.5 * pm * dm,
-        pphys / 3 + 0.5 * pm * dm + 0.5 * (dx + 4 * dz) * dx / dm * pm,
-        pphys / 3,
-    )
-    out = apply_rot(
-        out,
-        [one, one, one, one, z],
-        pphys / 3 + 0.5 * (dm / dz) * pz * dm,
-        pphys / 3 + 0.5 * dz * pm,
-        pphys / 3,
-    )
-    out = storage_z_5(
-        out, 0.5 * ((dx + 3 * dz) + (dx + 4 * dz)) / dx * px * dm, 0, 0, 0, 0
-    )
+    On the batched backend, the parameters are arrays over the batch, see `cost_of_one_level_15to1_batch`
 
-    # Apply storage errors for dm code cycles
-    out = storage_x_5(
-        out,
-        0.5 * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-    )
-    out = storage_z_5(
-        out,
-        0.5 * px * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-    )
-
-    # Step 4: apply rotations 10-11
-    out = apply_rot(
-        out,
-        [z, z, one, one, z],
-        pphys / 3 + 0.5 * pm * dm,
-        pphys / 3 + 0.5 * pm * dm + 0.5 * (dx + 4 * dz) * dx / dm * pm,
-        pphys / 3,
-    )
-    out = apply_rot(
-        out,
-        [z, one, z, one, z],
-        pphys / 3 + 0.5 * pm * dm,
-        pphys / 3 + 0.5 * pm * dm + 0.5 * (dx + 4 * dz) * dx / dm * pm,
-        pphys / 3,
-    )
-    out = storage_z_5(
-        out, 0.5 * ((dx + 4 * dz) + (dx + 4 * dz)) / dx * px * dm, 0, 0, 0, 0
-    )
-
-    # Apply storage errors for dm code cycles
-    out = storage_x_5(
-        out,
-        0.5 * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-    )
-    out = storage_z_5(
-        out,
-        0.5 * px * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-    )
-
-    # Step 5: apply rotations 12-13
-    out = apply_rot(
-        out,
-        [z, z, z, z, z],
-        pphys / 3 + 0.5 * pm * dm,
-        pphys / 3 + 0.5 * pm * dm + 0.5 * (dx + 4 * dz) * dx / dm * pm,
-        pphys / 3,
-    )
-    out = apply_rot(
-        out,
-        [one, one, z, z, z],
-        pphys / 3 + 0.5 * pm * dm,
-        pphys / 3 + 0.5 * pm * dm + 0.5 * (3 * dz) * dx / dm * pm,
-        pphys / 3,
-    )
-    out = storage_z_5(out, 0.5 * (dx + 4 * dz) / dx * px * dm, 0, 0, 0, 0)
-
-    # Apply storage errors for dm code cycles
-    # Qubit 1 is consumed as an output state: additional storage errors for dx code cycles
-    out = storage_x_5(
-        out,
-        0.5 * px * (dm + 2 * dx),
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-    )
-    out = storage_z_5(
-        out,
-        0.5 * px * (dm + 2 * dx),
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-    )
-
-    # Step 6: apply rotation 14-15
-    out = apply_rot(
-        out,
-        [one, z, one, z, z],
-        pphys / 3 + 0.5 * pm * dm,
-        pphys / 3 + 0.5 * pm * dm + 0.5 * (4 * dz) * dx / dm * pm,
-        pphys / 3,
-    )
-    out = apply_rot(
-        out,
-        [one, z, z, one, z],
-        pphys / 3 + 0.5 * pm * dm,
-        pphys / 3 + 0.5 * pm * dm + 0.5 * (4 * dz) * dx / dm * pm,
-        pphys / 3,
-    )
-
-    # Apply storage errors for dm code cycles
-    out = storage_x_5(
-        out,
-        0,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-    )
-    out = storage_z_5(
-        out,
-        0,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-    )
+    `backend`: numerical backend the density matrix is evolved on, see `backends`
+    """
 
-    return out
+    return run_schedule(ONE_LEVEL_15TO1, backend, pphys=pphys, dx=dx, dz=dz, dm=dm)
 
 
+@scoped_precision(order=3)
 def cost_of_one_level_15to1(
-    pphys: float | mpmath.mpf, dx: int, dz: int, dm: int
+    pphys: float | mpmath.mpf,
+    dx: int,
+    dz: int,
+    dm: int,
+    backend: BackendLike = "mpmath",
+    precision: Precision = None,
 ) -> MagicStateFactory:
     """
     Calculates the output error and cost of the 15-to-1 protocol with a physical error rate `pphys` and distances `dx`, `dz` and `dm`
     """
 
-    pphys = mpmath.mpf(pphys)
+    pphys = get_backend(backend).scalar(pphys)
 
     # Generate output state of 15-to-1 protocol
-    out = one_level_15to1_state(pphys, dx, dz, dm)
+    out = one_level_15to1_state(pphys, dx, dz, dm, backend)
 
     # Compute failure probability as the probability to measure qubits 2-5 in the |+> state
-    pfail = (1 - trace(kron(one, projx, projx, projx, projx) * out)).real
+    # and output error from the infidelity between the post-selected state and the ideal output state
+    pfail, pout = postselection_errors(out, magic_states(1))
 
-    # Compute the density matrix of the post-selected output state, i.e., after projecting qubits 2-5 into |+>
-    outpostsel = (
-        (1 / (1 - pfail))
-        * kron(one, projx, projx, projx, projx)
-        * out
-        * kron(one, projx, projx, projx, projx).transpose_conj()
+    return MagicStateFactory(
+        name=f"15-to-1 with pphys={float(pphys)}, dx={dx}, dz={dz}, dm={dm}",
+        distilled_magic_state_error_rate=float(pout),
+        qubits=2 * ((dx + 4 * dz) * 3 * dx + 2 * dm),
+        distillation_time_in_cycles=float(6 * dm / (1 - pfail)),
+        dimensions=(3 * dx, dx + 4 * dz),
+        n_t_gates_produced_per_distillation=1,
     )
 
-    # Compute output error from the infidelity between the post-selected state and the ideal output state
-    pout = (1 - trace(outpostsel * ideal15to1)).real
 
-    # Full-distance computation: determine full distance required for a 100-qubit / 10000-qubit computation
-    def logerr1(d):
-        return float((231 / pout) * d * plog(pphys, d) - 0.01)
+def cost_of_one_level_15to1_batch(
+    pphys: ArrayLike,
+    dx: ArrayLike,
+    dz: ArrayLike,
+    dm: ArrayLike,
+    batch_size: int = 4096,
+) -> MagicStateFactoryBatch:
+    """
+    Output errors and costs of the 15-to-1 protocol at many parameter points at once
 
-    def logerr2(d):
-        return float((20284 / pout) * d * plog(pphys, d) - 0.01)
+    `pphys`, `dx`, `dz` and `dm` are broadcast against each other and flattened. The protocol is run once per
+    chunk of `batch_size` points on a stack of density matrices in double precision, see `BatchedNumpyBackend`
+    """
 
-    reqdist1 = int(2 * round(optimize.root(logerr1, 3, method="hybr").x[0] / 2) + 1)
-    reqdist2 = int(2 * round(optimize.root(logerr2, 3, method="hybr").x[0] / 2) + 1)
+    pphys, dx, dz, dm = (np.ravel(a) for a in np.broadcast_arrays(pphys, dx, dz, dm))
+    pphys = pphys.astype(float)
+
+    pfail = np.empty(len(pphys))
+    pout = np.empty(len(pphys))
+    for start in range(0, len(pphys), batch_size):
+        chunk = slice(start, start + batch_size)
+        out = one_level_15to1_state(
+            pphys[chunk],
+            dx[chunk].reshape(-1, 1, 1),
+            dz[chunk].reshape(-1, 1, 1),
+            dm[chunk].reshape(-1, 1, 1),
+            backend="numpy-batched",
+        )
+        chunk_pfail, chunk_pout = postselection_errors(out, magic_states(1))
+        pfail[chunk] = chunk_pfail.ravel()
+        pout[chunk] = chunk_pout.ravel()
+
+    return MagicStateFactoryBatch(
+        name="15-to-1",
+        distilled_magic_state_error_rate=pout,
+        failure_probability=pfail,
+        qubits=2 * ((dx + 4 * dz) * 3 * dx + 2 * dm),
+        distillation_time_in_cycles=6 * dm / (1 - pfail),
+        n_t_gates_produced_per_distillation=1,
+    )
 
+
+def compile_one_level_15to1(
+    dx: int, dz: int, dm: int, order: int = DEFAULT_ORDER
+) -> CompiledProtocol:
+    """
+    Compiles the 15-to-1 protocol with distances `dx`, `dz` and `dm` to power series in `sqrt(pphys)`,
+    see `compiled.compile_protocol`
+    """
+    return compile_protocol(one_level_15to1_state, magic_states(1), (dx, dz, dm), order)
+
+
+def cost_of_one_level_15to1_compiled(
+    pphys: float, dx: int, dz: int, dm: int
+) -> MagicStateFactory:
+    """
+    Same as `cost_of_one_level_15to1`, evaluating the compiled protocol instead of simulating it, in double
+    precision
+    """
+    pfail, pout = compile_one_level_15to1(dx, dz, dm)(pphys)
     return MagicStateFactory(
         name=f"15-to-1 with pphys={float(pphys)}, dx={dx}, dz={dz}, dm={dm}",
         distilled_magic_state_error_rate=float(pout),
         qubits=2 * ((dx + 4 * dz) * 3 * dx + 2 * dm),
         distillation_time_in_cycles=float(6 * dm / (1 - pfail)),
-        dimensions=(3 * dx, dx + 4*dz),
+        dimensions=(3 * dx, dx + 4 * dz),
         n_t_gates_produced_per_distillation=1,
     )
@@ -1,414 +1,441 @@
 import mpmath
-from mpmath import mp
-from scipy import optimize
+from ..backends import BackendLike, get_backend
+from ..compiled import DEFAULT_ORDER, CompiledProtocol, compile_protocol
 from ..definitions import (
-    z,
-    one,
-    projx,
-    kron,
-    trace,
-    apply_rot,
+    Matrix,
+    postselection_errors,
     plog,
-    storage_x_5,
-    storage_z_5,
-    init5qubit,
-    ideal15to1,
+    magic_states,
+    Precision,
+    scoped_precision,
 )
+from ..schedule import Label, Rotation, Schedule, Storage, run_schedule
 from ..factory_simulation.onelevel15to1 import one_level_15to1_state
 from ..magic_state_factory import MagicStateFactory
 
 
-def cost_of_one_level_15to1_small_footprint(
-    pphys: float | mpmath.mpf, dx: int, dz: int, dm: int
-) -> MagicStateFactory:
-    """
-    Calculates the output error and cost of the small-footprint 15-to-1 protocol with a physical error rate pphys and distances dx, dz and dm,
-    """
-    pphys = mpmath.mpf(pphys)
-
-    # Introduce shorthand notation for logical error rate with distances dx/dz/dm
-    px = plog(pphys, dx)
-    pz = plog(pphys, dz)
-    pm = plog(pphys, dm)
-
-    # Step 1 of 15-to-1 protocol applying rotations 1-3
-    # Last operation: apply additional storage errors due to fast faulty T measurements
-    out = apply_rot(
-        init5qubit,
-        [one, z, one, one, one],
-        pphys / 3 + 0.5 * (dm / dz) * pz * dm,
-        pphys / 3 + 0.5 * dz * pm,
-        pphys / 3,
-    )
-    out = apply_rot(
-        out,
-        [one, one, z, one, one],
-        pphys / 3 + 0.5 * (dm / dz) * pz * dm,
-        pphys / 3 + 0.5 * dz * pm,
-        pphys / 3,
-    )
-    out = apply_rot(
-        out,
-        [one, one, one, z, one],
-        pphys / 3 + 0.5 * (dm / dz) * pz * dm,
-        pphys / 3 + 0.5 * dz * pm,
-        pphys / 3,
-    )
-
-    # Apply storage errors for dm code cycles
-    out = storage_x_5(
-        out,
-        0,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0,
-    )
-    out = storage_z_5(
-        out,
-        0,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0,
-    )
-
-    # Step 2: apply rotation 5
-    out = apply_rot(
-        out,
-        [one, z, z, z, one],
-        pphys / 3 + 0.5 * pm * dm,
-        pphys / 3 + 0.5 * pm * dm + 0.5 * (3 * dz) * dx / dm * pm,
-        pphys / 3,
-    )
-
-    # Apply storage errors for dm code cycles
-    out = storage_x_5(
-        out,
-        0,
-        0.5 * (dz / dx) * px * dm,
-        (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0,
-    )
-    out = storage_z_5(
-        out,
-        0,
-        0.5 * (dx / dz) * pz * dm,
-        (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0,
-    )
-
-    # Step 3: apply rotation 6
-    # Last operation: apply additional storage errors due to multi-patch measurements
-    out = apply_rot(
-        out,
-        [z, z, z, one, one],
-        pphys / 3 + 0.5 * pm * dm,
-        pphys / 3 + 0.5 * pm * dm + 0.5 * (dx + 2 * dz) * dx / dm * pm,
-        pphys / 3,
-    )
-    out = storage_z_5(out, 0.5 * (dx + 2 * dz) / dx * px * dm, 0, 0, 0, 0)
-
-    # Apply storage errors for dm code cycles
-    out = storage_x_5(
-        out,
-        0.5 * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0,
-    )
-    out = storage_z_5(
-        out,
-        0.5 * px * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0,
-    )
-
-    # Step 4: apply rotation 7
-    out = apply_rot(
-        out,
-        [z, z, one, z, one],
-        pphys / 3 + 0.5 * pm * dm,
-        pphys / 3 + 0.5 * pm * dm + 0.5 * (dx + 3 * dz) * dx / dm * pm,
-        pphys / 3,
-    )
-    out = storage_z_5(out, 0.5 * (dx + 3 * dz) / dx * px * dm, 0, 0, 0, 0)
-
-    # Apply storage errors for dm code cycles
-    out = storage_x_5(
-        out,
-        0.5 * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0,
-    )
-    out = storage_z_5(
-        out,
-        0.5 * px * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0,
-    )
-
-    # Step 5: apply rotations 4 and 8
-    out = apply_rot(
-        out,
-        [z, one, z, z, one],
-        pphys / 3 + 0.5 * pm * dm,
-        pphys / 3 + 0.5 * pm * dm + 0.5 * (dx + 3 * dz) * dx / dm * pm,
-        pphys / 3,
-    )
-    out = apply_rot(
-        out,
-        [one, one, one, one, z],
-        pphys / 3 + 0.5 * (dm / dz) * pz * dm,
-        pphys / 3 + 0.5 * dz * pm,
-        pphys / 3,
-    )
-    out = storage_z_5(out, 0.5 * (dx + 3 * dz) / dx * px * dm, 0, 0, 0, 0)
-
-    # Apply storage errors for dm code cycles
-    out = storage_x_5(
-        out,
-        0.5 * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-    )
-    out = storage_z_5(
-        out,
-        0.5 * px * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-    )
-
-    # Step 6: apply rotation 9
-    out = apply_rot(
-        out,
-        [z, one, one, z, z],
-        pphys / 3 + 0.5 * pm * dm,
-        pphys / 3 + 0.5 * pm * dm + 0.5 * (dx + 4 * dz) * dx / dm * pm,
-        pphys / 3,
-    )
-    out = storage_z_5(out, 0.5 * (dx + 4 * dz) / dx * px * dm, 0, 0, 0, 0)
-
-    # Apply storage errors for dm code cycles
-    out = storage_x_5(
-        out,
-        0.5 * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-    )
-    out = storage_z_5(
-        out,
-        0.5 * px * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-    )
-
-    # Step 7: apply rotation 10
-    out = apply_rot(
-        out,
-        [z, z, one, one, z],
-        pphys / 3 + 0.5 * pm * dm,
-        pphys / 3 + 0.5 * pm * dm + 0.5 * (dx + 4 * dz) * dx / dm * pm,
-        pphys / 3,
-    )
-    out = storage_z_5(out, 0.5 * (dx + 4 * dz) / dx * px * dm, 0, 0, 0, 0)
-
-    # Apply storage errors for dm code cycles
-    out = storage_x_5(
-        out,
-        0.5 * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-    )
-    out = storage_z_5(
-        out,
-        0.5 * px * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-    )
-
-    # Step 8: apply rotation 11
-    out = apply_rot(
-        out,
-        [z, one, z, one, z],
-        pphys / 3 + 0.5 * pm * dm,
-        pphys / 3 + 0.5 * pm * dm + 0.5 * (dx + 4 * dz) * dx / dm * pm,
-        pphys / 3,
-    )
-    out = storage_z_5(out, 0.5 * (dx + 4 * dz) / dx * px * dm, 0, 0, 0, 0)
-
-    # Apply storage errors for dm code cycles
-    out = storage_x_5(
-        out,
-        0.5 * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-    )
-    out = storage_z_5(
-        out,
-        0.5 * px * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-    )
-
-    # Step 9: apply rotation 12
-    out = apply_rot(
-        out,
-        [z, z, z, z, z],
-        pphys / 3 + 0.5 * pm * dm,
-        pphys / 3 + 0.5 * pm * dm + 0.5 * (dx + 4 * dz) * dx / dm * pm,
-        pphys / 3,
-    )
-    out = storage_z_5(out, 0.5 * (dx + 4 * dz) / dx * px * dm, 0, 0, 0, 0)
-
-    # Apply storage errors for dm code cycles
-    out = storage_x_5(
-        out,
-        0.5 * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-    )
-    out = storage_z_5(
-        out,
-        0.5 * px * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-    )
-
-    # Step 10: apply rotation 13
-    out = apply_rot(
-        out,
-        [one, one, z, z, z],
-        pphys / 3 + 0.5 * pm * dm,
-        pphys / 3 + 0.5 * pm * dm + 0.5 * (3 * dz) * dx / dm * pm,
-        pphys / 3,
-    )
+ONE_LEVEL_15TO1_SMALL_FOOTPRINT = Schedule(
+    name="Small footprint 15-to-1",
+    qubits=5,
+    parameters=("pphys", "dx", "dz", "dm"),
+    derived=(
+        # Introduce shorthand notation for logical error rate with distances dx/dz/dm
+        ("px", "plog(pphys, dx)"),
+        ("pz", "plog(pphys, dz)"),
+        ("pm", "plog(pphys, dm)"),
+    ),
+    steps=(
+        Label("Step 1 of 15-to-1 protocol applying rotations 1-3"),
+        # Last operation: apply additional storage errors due to fast faulty T measurements
+        Rotation(
+            "IZIII",
+            "pphys / 3 + 0.5 * (dm / dz) * pz * dm",
+            "pphys / 3 + 0.5 * dz * pm",
+            "pphys / 3",
+        ),
+        Rotation(
+            "IIZII",
+            "pphys / 3 + 0.5 * (dm / dz) * pz * dm",
+            "pphys / 3 + 0.5 * dz * pm",
+            "pphys / 3",
+        ),
+        Rotation(
+            "IIIZI",
+            "pphys / 3 + 0.5 * (dm / dz) * pz * dm",
+            "pphys / 3 + 0.5 * dz * pm",
+            "pphys / 3",
+        ),
+        # Apply storage errors for dm code cycles
+        Storage(
+            x=(
+                0,
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                0,
+            )
+        ),
+        Storage(
+            z=(
+                0,
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                0,
+            )
+        ),
+        Label("Step 2: apply rotation 5"),
+        Rotation(
+            "IZZZI",
+            "pphys / 3 + 0.5 * pm * dm",
+            "pphys / 3 + 0.5 * pm * dm + 0.5 * (3 * dz) * dx / dm * pm",
+            "pphys / 3",
+        ),
+        # Apply storage errors for dm code cycles
+        Storage(
+            x=(
+                0,
+                "0.5 * (dz / dx) * px * dm",
+                "(dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                0,
+            )
+        ),
+        Storage(
+            z=(
+                0,
+                "0.5 * (dx / dz) * pz * dm",
+                "(dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                0,
+            )
+        ),
+        Label("Step 3: apply rotation 6"),
+        # Last operation: apply additional storage errors due to multi-patch measurements
+        Rotation(
+            "ZZZII",
+            "pphys / 3 + 0.5 * pm * dm",
+            "pphys / 3 + 0.5 * pm * dm + 0.5 * (dx + 2 * dz) * dx / dm * pm",
+            "pphys / 3",
+        ),
+        Storage(z=("0.5 * (dx + 2 * dz) / dx * px * dm", 0, 0, 0, 0)),
+        # Apply storage errors for dm code cycles
+        Storage(
+            x=(
+                "0.5 * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                0,
+            )
+        ),
+        Storage(
+            z=(
+                "0.5 * px * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                0,
+            )
+        ),
+        Label("Step 4: apply rotation 7"),
+        Rotation(
+            "ZZIZI",
+            "pphys / 3 + 0.5 * pm * dm",
+            "pphys / 3 + 0.5 * pm * dm + 0.5 * (dx + 3 * dz) * dx / dm * pm",
+            "pphys / 3",
+        ),
+        Storage(z=("0.5 * (dx + 3 * dz) / dx * px * dm", 0, 0, 0, 0)),
+        # Apply storage errors for dm code cycles
+        Storage(
+            x=(
+                "0.5 * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                0,
+            )
+        ),
+        Storage(
+            z=(
+                "0.5 * px * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                0,
+            )
+        ),
+        Label("Step 5: apply rotations 4 and 8"),
+        Rotation(
+            "ZIZZI",
+            "pphys / 3 + 0.5 * pm * dm",
+            "pphys / 3 + 0.5 * pm * dm + 0.5 * (dx + 3 * dz) * dx / dm * pm",
+            "pphys / 3",
+        ),
+        Rotation(
+            "IIIIZ",
+            "pphys / 3 + 0.5 * (dm / dz) * pz * dm",
+            "pphys / 3 + 0.5 * dz * pm",
+            "pphys / 3",
+        ),
+        Storage(z=("0.5 * (dx + 3 * dz) / dx * px * dm", 0, 0, 0, 0)),
+        # Apply storage errors for dm code cycles
+        Storage(
+            x=(
+                "0.5 * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+            )
+        ),
+        Storage(
+            z=(
+                "0.5 * px * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+            )
+        ),
+        Label("Step 6: apply rotation 9"),
+        Rotation(
+            "ZIIZZ",
+            "pphys / 3 + 0.5 * pm * dm",
+            "pphys / 3 + 0.5 * pm * dm + 0.5 * (dx + 4 * dz) * dx / dm * pm",
+            "pphys / 3",
+        ),
+        Storage(z=("0.5 * (dx + 4 * dz) / dx * px * dm", 0, 0, 0, 0)),
+        # Apply storage errors for dm code cycles
+        Storage(
+            x=(
+                "0.5 * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+            )
+        ),
+        Storage(
+            z=(
+                "0.5 * px * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+            )
+        ),
+        Label("Step 7: apply rotation 10"),
+        Rotation(
+            "ZZIIZ",
+            "pphys / 3 + 0.5 * pm * dm",
+            "pphys / 3 + 0.5 * pm * dm + 0.5 * (dx + 4 * dz) * dx / dm * pm",
+            "pphys / 3",
+        ),
+        Storage(z=("0.5 * (dx + 4 * dz) / dx * px * dm", 0, 0, 0, 0)),
+        # Apply storage errors for dm code cycles
+        Storage(
+            x=(
+                "0.5 * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+            )
+        ),
+        Storage(
+            z=(
+                "0.5 * px * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+            )
+        ),
+        Label("Step 8: apply rotation 11"),
+        Rotation(
+            "ZIZIZ",
+            "pphys / 3 + 0.5 * pm * dm",
+            "pphys / 3 + 0.5 * pm * dm + 0.5 * (dx + 4 * dz) * dx / dm * pm",
+            "pphys / 3",
+        ),
+        Storage(z=("0.5 * (dx + 4 * dz) / dx * px * dm", 0, 0, 0, 0)),
+        # Apply storage errors for dm code cycles
+        Storage(
+            x=(
+                "0.5 * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+            )
+        ),
+        Storage(
+            z=(
+                "0.5 * px * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+            )
+        ),
+        Label("Step 9: apply rotation 12"),
+        Rotation(
+            "ZZZZZ",
+            "pphys / 3 + 0.5 * pm * dm",
+            "pphys / 3 + 0.5 * pm * dm + 0.5 * (dx + 4 * dz) * dx / dm * pm",
+            "pphys / 3",
+        ),
+        Storage(z=("0.5 * (dx + 4 * dz) / dx * px * dm", 0, 0, 0, 0)),
+        # Apply storage errors for dm code cycles
+        Storage(
+            x=(
+                "0.5 * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+            )
+        ),
+        Storage(
+            z=(
+                "0.5 * px * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+            )
+        ),
+        Label("Step 10: apply rotation 13"),
+        Rotation(
+            "IIZZZ",
+            "pphys / 3 + 0.5 * pm * dm",
+            "pphys / 3 + 0.5 * pm * dm + 0.5 * (3 * dz) * dx / dm * pm",
+            "pphys / 3",
+        ),
+        # Apply storage errors for dm code cycles
+        Storage(
+            x=(
+                "0.5 * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+            )
+        ),
+        Storage(
+            z=(
+                "0.5 * px * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+            )
+        ),
+        Label("Step 11: apply rotation 14"),
+        Rotation(
+            "IZIZZ",
+            "pphys / 3 + 0.5 * pm * dm",
+            "pphys / 3 + 0.5 * pm * dm + 0.5 * (4 * dz) * dx / dm * pm",
+            "pphys / 3",
+        ),
+        # Apply storage errors for dm code cycles
+        Storage(
+            x=(
+                "0.5 * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+            )
+        ),
+        Storage(
+            z=(
+                "0.5 * px * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+            )
+        ),
+        Label("Step 12: apply rotation 15"),
+        Rotation(
+            "IZZIZ",
+            "pphys / 3 + 0.5 * pm * dm",
+            "pphys / 3 + 0.5 * pm * dm + 0.5 * (4 * dz) * dx / dm * pm",
+            "pphys / 3",
+        ),
+        # Apply storage errors for 2dm code cycles
+        # Qubit 1 is consumed as an output state in the following step: additional storage errors for dx code cycles
+        Storage(
+            x=(
+                "0.5 * px * (dm + 2 * dx)",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+                "0.5 * (dz / dx) * px * dm",
+            )
+        ),
+        Storage(
+            z=(
+                "0.5 * px * (dm + 2 * dx)",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+                "0.5 * (dx / dz) * pz * dm",
+            )
+        ),
+    ),
+)
 
-    # Apply storage errors for dm code cycles
-    out = storage_x_5(
-        out,
-        0.5 * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-    )
-    out = storage_z_5(
-        out,
-        0.5 * px * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-    )
 
-    # Step 11: apply rotation 14
-    out = apply_rot(
-        out,
-        [one, z, one, z, z],
-        pphys / 3 + 0.5 * pm * dm,
-        pphys / 3 + 0.5 * pm * dm + 0.5 * (4 * dz) * dx / dm * pm,
-        pphys / 3,
+def one_level_15to1_small_footprint_state(
+    pphys: float | mpmath.mpf,
+    dx: int,
+    dz: int,
+    dm: int,
+    backend: BackendLike = "mpmath",
+) -> Matrix:
+    """
+    Generates the output-state density matrix of the small-footprint 15-to-1 protocol with a physical error rate
+    pphys and distances dx, dz and dm, evolved on `backend`
+    """
+    return run_schedule(
+        ONE_LEVEL_15TO1_SMALL_FOOTPRINT, backend, pphys=pphys, dx=dx, dz=dz, dm=dm
     )
 
-    # Apply storage errors for dm code cycles
-    out = storage_x_5(
-        out,
-        0.5 * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-    )
-    out = storage_z_5(
-        out,
-        0.5 * px * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-    )
 
-    # Step 12: apply rotation 15
-    out = apply_rot(
-        out,
-        [one, z, z, one, z],
-        pphys / 3 + 0.5 * pm * dm,
-        pphys / 3 + 0.5 * pm * dm + 0.5 * (4 * dz) * dx / dm * pm,
-        pphys / 3,
-    )
+@scoped_precision(order=3)
+def cost_of_one_level_15to1_small_footprint(
+    pphys: float | mpmath.mpf,
+    dx: int,
+    dz: int,
+    dm: int,
+    backend: BackendLike = "mpmath",
+    precision: Precision = None,
+) -> MagicStateFactory:
+    """
+    Calculates the output error and cost of the small-footprint 15-to-1 protocol with a physical error rate pphys and distances dx, dz and dm,
+    """
+    be = get_backend(backend)
+    pphys = be.scalar(pphys)
 
-    # Apply storage errors for 2dm code cycles
-    # Qubit 1 is consumed as an output state in the following step: additional storage errors for dx code cycles
-    out = storage_x_5(
-        out,
-        0.5 * px * (dm + 2 * dx),
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-        0.5 * (dz / dx) * px * dm,
-    )
-    out = storage_z_5(
-        out,
-        0.5 * px * (dm + 2 * dx),
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-        0.5 * (dx / dz) * pz * dm,
-    )
+    out = one_level_15to1_small_footprint_state(pphys, dx, dz, dm, be)
 
     # Compute failure probability as the probability to measure qubits 2-5 in the |+> state
-    pfail = 1 - trace(kron(one, projx, projx, projx, projx) * out).real
+    # and output error from the infidelity between the post-selected state and the ideal output state
+    pfail, pout = postselection_errors(out, magic_states(1))
 
-    # Compute the density matrix of the post-selected output state, i.e., after projecting qubits 2-5 into |+>
-    outpostsel = (
-        (1 / (1 - pfail))
-        * kron(one, projx, projx, projx, projx)
-        * out
-        * kron(one, projx, projx, projx, projx).transpose_conj()
+    return MagicStateFactory(
+        name=f"Small footprint 15-to-1 with pphys={float(pphys)}, dx={dx}, dz={dz}, dm={dm}",
+        distilled_magic_state_error_rate=float(pout),
+        qubits=2 * (2 * dx * (dx + 4 * dz) + dm),
+        distillation_time_in_cycles=float(12 * dm / (1 - pfail)),
+        dimensions=(2 * dx, dx + 4 * dz),
+        n_t_gates_produced_per_distillation=1,
     )
-    # Compute output error from the infidelity between the post-selected state and the ideal output state
-    pout = 1 - trace(outpostsel * ideal15to1).real
 
-    # Full-distance computation: determine full distance required for a 100-qubit / 10000-qubit computation
-    def logerr1(d):
-        return float(231 / pout * d * plog(pphys, d) - 0.01)
 
-    def logerr2(d):
-        return float(20284 / pout * d * plog(pphys, d) - 0.01)
+def compile_one_level_15to1_small_footprint(
+    dx: int, dz: int, dm: int, order: int = DEFAULT_ORDER
+) -> CompiledProtocol:
+    """
+    Compiles the small-footprint 15-to-1 protocol with distances dx, dz and dm to power series in
+    `sqrt(pphys)`, see `compiled.compile_protocol`
+    """
+    return compile_protocol(
+        one_level_15to1_small_footprint_state, magic_states(1), (dx, dz, dm), order
+    )
 
-    reqdist1 = int(2 * round(optimize.root(logerr1, 3, method="hybr").x[0] / 2) + 1)
-    reqdist2 = int(2 * round(optimize.root(logerr2, 3, method="hybr").x[0] / 2) + 1)
 
+def cost_of_one_level_15to1_small_footprint_compiled(
+    pphys: float, dx: int, dz: int, dm: int
+) -> MagicStateFactory:
+    """
+    Same as `cost_of_one_level_15to1_small_footprint`, evaluating the compiled protocol instead of simulating
+    it, in double precision
+    """
+    pfail, pout = compile_one_level_15to1_small_footprint(dx, dz, dm)(pphys)
     return MagicStateFactory(
         name=f"Small footprint 15-to-1 with pphys={float(pphys)}, dx={dx}, dz={dz}, dm={dm}",
         distilled_magic_state_error_rate=float(pout),
@@ -419,33 +446,417 @@ def cost_of_one_level_15to1_small_footprint(
     )
 
 
+TWO_LEVEL_15TO1_SMALL_FOOTPRINT = Schedule(
+    name="Level 2 of small footprint (15-to-1)x(15-to-1)",
+    qubits=5,
+    parameters=("pphys", "dx2", "dz2", "dm2", "pl1", "lmove", "l1time"),
+    derived=(
+        # Introduce shorthand notation for logical error rate with distances dx2/dz2/dm2
+        ("px2", "plog(pphys, dx2)"),
+        ("pz2", "plog(pphys, dz2)"),
+        ("pm2", "plog(pphys, dm2)"),
+    ),
+    steps=(
+        Label(
+            "Step 1 of the small-footprint (15-to-1)x(15-to-1) protocol applying rotation 1"
+        ),
+        Rotation(
+            "IZIII",
+            "pl1 + 0.5 * lmove * pm2",
+            "0.5 * lmove * pm2 + 0.5 * (4 * dz2 + dm2) * dx2 / dm2 * pm2",
+        ),
+        # Apply storage errors for l1time code cycles
+        Storage(x=(0, "0.5 * (dz2 / dx2) * px2 * l1time", 0, 0, 0)),
+        Storage(z=(0, "0.5 * (dx2 / dz2) * pz2 * l1time", 0, 0, 0)),
+        Label("Step 2: apply rotation 2"),
+        Rotation(
+            "IIZII",
+            "pl1 + 0.5 * lmove * pm2",
+            "0.5 * lmove * pm2 + 0.5 * (3 * dz2 + dm2) * dx2 / dm2 * pm2",
+        ),
+        # Apply storage errors for l1time code cycles
+        Storage(
+            x=(
+                0,
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                0,
+                0,
+            )
+        ),
+        Storage(
+            z=(
+                0,
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                0,
+                0,
+            )
+        ),
+        Label("Step 3: apply rotation 3"),
+        Rotation(
+            "IIIZI",
+            "pl1 + 0.5 * lmove * pm2",
+            "0.5 * lmove * pm2 + 0.5 * (2 * dz2 + dm2) * dx2 / dm2 * pm2",
+        ),
+        # Apply storage errors for l1time code cycles
+        Storage(
+            x=(
+                0,
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                0,
+            )
+        ),
+        Storage(
+            z=(
+                0,
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                0,
+            )
+        ),
+        Label("Step 4: apply rotation 4"),
+        Rotation(
+            "IIIIZ",
+            "pl1 + 0.5 * lmove * pm2",
+            "0.5 * lmove * pm2 + 0.5 * (dz2 + dm2) * dx2 / dm2 * pm2",
+        ),
+        # Apply storage errors for l1time code cycles
+        Storage(
+            x=(
+                0,
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+            )
+        ),
+        Storage(
+            z=(
+                0,
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+            )
+        ),
+        Label("Step 5: apply rotation 5"),
+        Rotation(
+            "ZZZII",
+            "pl1 + 0.5 * lmove * pm2",
+            "0.5 * lmove * pm2 + 0.5 * (dx2 + 4 * dz2 + dm2) * dx2 / dm2 * pm2",
+        ),
+        Storage(z=("0.5 * (dx2 + 4 * dz2 + dm2) * dm2 / dx2 * px2", 0, 0, 0, 0)),
+        # Apply storage errors for l1time code cycles
+        Storage(
+            x=(
+                "0.5 * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+            )
+        ),
+        Storage(
+            z=(
+                "0.5 * px2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+            )
+        ),
+        Label("Step 6: apply rotation 6"),
+        Rotation(
+            "IZZZI",
+            "pl1 + 0.5 * lmove * pm2",
+            "0.5 * lmove * pm2 + 0.5 * (4 * dz2 + dm2) * dx2 / dm2 * pm2",
+        ),
+        # Apply storage errors for l1time code cycles
+        Storage(
+            x=(
+                "0.5 * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+            )
+        ),
+        Storage(
+            z=(
+                "0.5 * px2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+            )
+        ),
+        Label("Step 7: apply rotation 7"),
+        Rotation(
+            "ZIZZI",
+            "pl1 + 0.5 * lmove * pm2",
+            "0.5 * lmove * pm2 + 0.5 * (dx2 + 4 * dz2 + dm2) * dx2 / dm2 * pm2",
+        ),
+        Storage(z=("0.5 * (dx2 + 4 * dz2 + dm2) * dm2 / dx2 * px2", 0, 0, 0, 0)),
+        # Apply storage errors for l1time code cycles
+        Storage(
+            x=(
+                "0.5 * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+            )
+        ),
+        Storage(
+            z=(
+                "0.5 * px2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+            )
+        ),
+        Label("Step 8: apply rotation 8"),
+        Rotation(
+            "ZZIZI",
+            "pl1 + 0.5 * lmove * pm2",
+            "0.5 * lmove * pm2 + 0.5 * (dx2 + 4 * dz2 + dm2) * dx2 / dm2 * pm2",
+        ),
+        Storage(z=("0.5 * (dx2 + 4 * dz2 + dm2) * dm2 / dx2 * px2", 0, 0, 0, 0)),
+        # Apply storage errors for l1time code cycles
+        Storage(
+            x=(
+                "0.5 * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+            )
+        ),
+        Storage(
+            z=(
+                "0.5 * px2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+            )
+        ),
+        Label("Step 9: apply rotation 9"),
+        Rotation(
+            "ZZIIZ",
+            "pl1 + 0.5 * lmove * pm2",
+            "0.5 * lmove * pm2 + 0.5 * (dx2 + 4 * dz2 + dm2) * dx2 / dm2 * pm2",
+        ),
+        Storage(z=("0.5 * (dx2 + 4 * dz2 + dm2) * dm2 / dx2 * px2", 0, 0, 0, 0)),
+        # Apply storage errors for l1time code cycles
+        Storage(
+            x=(
+                "0.5 * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+            )
+        ),
+        Storage(
+            z=(
+                "0.5 * px2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+            )
+        ),
+        Label("Step 10: apply rotation 10"),
+        Rotation(
+            "ZIIZZ",
+            "pl1 + 0.5 * lmove * pm2",
+            "0.5 * lmove * pm2 + 0.5 * (dx2 + 4 * dz2 + dm2) * dx2 / dm2 * pm2",
+        ),
+        Storage(z=("0.5 * (dx2 + 4 * dz2 + dm2) * dm2 / dx2 * px2", 0, 0, 0, 0)),
+        # Apply storage errors for l1time code cycles
+        Storage(
+            x=(
+                "0.5 * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+            )
+        ),
+        Storage(
+            z=(
+                "0.5 * px2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+            )
+        ),
+        Label("Step 11: apply rotation 11"),
+        Rotation(
+            "ZIZIZ",
+            "pl1 + 0.5 * lmove * pm2",
+            "0.5 * lmove * pm2 + 0.5 * (dx2 + 4 * dz2 + dm2) * dx2 / dm2 * pm2",
+        ),
+        Storage(z=("0.5 * (dx2 + 4 * dz2 + dm2) * dm2 / dx2 * px2", 0, 0, 0, 0)),
+        # Apply storage errors for l1time code cycles
+        Storage(
+            x=(
+                "0.5 * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+            )
+        ),
+        Storage(
+            z=(
+                "0.5 * px2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+            )
+        ),
+        Label("Step 12: apply rotation 12"),
+        Rotation(
+            "ZZZZZ",
+            "pl1 + 0.5 * lmove * pm2",
+            "0.5 * lmove * pm2 + 0.5 * (dx2 + 4 * dz2 + dm2) * dx2 / dm2 * pm2",
+        ),
+        Storage(z=("0.5 * (dx2 + 4 * dz2 + dm2) * dm2 / dx2 * px2", 0, 0, 0, 0)),
+        # Apply storage errors for l1time code cycles
+        Storage(
+            x=(
+                "0.5 * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+            )
+        ),
+        Storage(
+            z=(
+                "0.5 * px2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+            )
+        ),
+        Label("Step 13: apply rotation 13"),
+        Rotation(
+            "IZIZZ",
+            "pl1 + 0.5 * lmove * pm2",
+            "0.5 * lmove * pm2 + 0.5 * (4 * dz2 + dm2) * dx2 / dm2 * pm2",
+        ),
+        # Apply storage errors for l1time code cycles
+        Storage(
+            x=(
+                "0.5 * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+            )
+        ),
+        Storage(
+            z=(
+                "0.5 * px2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+            )
+        ),
+        Label("Step 14: apply rotation 14"),
+        Rotation(
+            "IIZZZ",
+            "pl1 + 0.5 * lmove * pm2",
+            "0.5 * lmove * pm2 + 0.5 * (3 * dz2 + dm2) * dx2 / dm2 * pm2",
+        ),
+        # Apply storage errors for l1time code cycles
+        Storage(
+            x=(
+                "0.5 * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+            )
+        ),
+        Storage(
+            z=(
+                "0.5 * px2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+            )
+        ),
+        Label("Step 15: apply rotation 15"),
+        Rotation(
+            "IZZIZ",
+            "pl1 + 0.5 * lmove * pm2",
+            "0.5 * lmove * pm2 + 0.5 * (4 * dz2 + dm2) * dx2 / dm2 * pm2",
+        ),
+        # Apply storage errors for l1time code cycles
+        # Qubit 1 is consumed as an output state in the following step: additional storage errors for dx2 code cycles
+        Storage(
+            x=(
+                "0.5 * px2 * (l1time + dx2)",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                0,
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+            )
+        ),
+        Storage(
+            z=(
+                "0.5 * px2 * (l1time + dx2)",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                0,
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+            )
+        ),
+    ),
+)
+
+
+@scoped_precision(order=9)
 def cost_of_two_level_15to1_small_footprint(
-    pphys: float | mpmath.mpf, dx: int, dz: int, dm: int, dx2: int, dz2: int, dm2: int
+    pphys: float | mpmath.mpf,
+    dx: int,
+    dz: int,
+    dm: int,
+    dx2: int,
+    dz2: int,
+    dm2: int,
+    backend: BackendLike = "mpmath",
+    precision: Precision = None,
 ) -> MagicStateFactory:
     """
     Calculates the output error and cost of the small-footprint (15-to-1)x(15-to-1) protocol with a physical error rate `pphys`, level-1 distances `dx`, `dz` and `dm`, and level-2 distances `dx2`, `dz2` and `dm2`
     """
 
-    pphys = mpmath.mpf(pphys)
+    be = get_backend(backend)
+    pphys = be.scalar(pphys)
 
-    # Introduce shorthand notation for logical error rate with distances dx2/dz2/dm2
-    px2 = plog(pphys, dx2)
-    pz2 = plog(pphys, dz2)
+    # Introduce shorthand notation for logical error rate with distance dm2
     pm2 = plog(pphys, dm2)
 
     # Compute pl1, the output error of level-1 states with an added Z storage error
     # to the output state from moving the level-1 state dispinto the intermediate region
-    out = one_level_15to1_state(pphys, dx, dz, dm)
-    pfail = 1 - trace(kron(one, projx, projx, projx, projx) * out).real
-
-    outpostsel = (
-        (1 / (1 - pfail))
-        * kron(one, projx, projx, projx, projx)
-        * out
-        * kron(one, projx, projx, projx, projx).transpose_conj()
-    )
-
-    pl1 = 1 - trace(outpostsel * ideal15to1).real + 5 * pm2 * dm2
+    out = one_level_15to1_state(pphys, dx, dz, dm, backend)
+    pfail, pl1 = postselection_errors(out, magic_states(1))
+    pl1 = pl1 + 5 * pm2 * dm2
 
     # Compute l1time, the speed at which level-2 rotations can be performed (t_{L1} in the paper)
     l1time = max(6 * dm / (1 - pfail), 2 * dm2)
@@ -454,428 +865,21 @@ def cost_of_two_level_15to1_small_footprint(
     # picking up additional storage errors
     lmove = 5 * dm2
 
-    # Step 1 of the small-footprint (15-to-1)x(15-to-1) protocol applying rotation 1
-    out2 = apply_rot(
-        init5qubit,
-        [one, z, one, one, one],
-        pl1 + 0.5 * lmove * pm2,
-        0.5 * lmove * pm2 + 0.5 * (4 * dz2 + dm2) * dx2 / dm2 * pm2,
-        0,
-    )
-
-    # Apply storage errors for l1time code cycles
-    out2 = storage_x_5(out2, 0, 0.5 * (dz2 / dx2) * px2 * l1time, 0, 0, 0)
-    out2 = storage_z_5(out2, 0, 0.5 * (dx2 / dz2) * pz2 * l1time, 0, 0, 0)
-
-    # Step 2: apply rotation 2
-    out2 = apply_rot(
-        out2,
-        [one, one, z, one, one],
-        pl1 + 0.5 * lmove * pm2,
-        0.5 * lmove * pm2 + 0.5 * (3 * dz2 + dm2) * dx2 / dm2 * pm2,
-        0,
-    )
-
-    # Apply storage errors for l1time code cycles
-    out2 = storage_x_5(
-        out2,
-        0,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0,
-        0,
-    )
-    out2 = storage_z_5(
-        out2,
-        0,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0,
-        0,
-    )
-
-    # Step 3: apply rotation 3
-    out2 = apply_rot(
-        out2,
-        [one, one, one, z, one],
-        pl1 + 0.5 * lmove * pm2,
-        0.5 * lmove * pm2 + 0.5 * (2 * dz2 + dm2) * dx2 / dm2 * pm2,
-        0,
-    )
-
-    # Apply storage errors for l1time code cycles
-    out2 = storage_x_5(
-        out2,
-        0,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0,
-    )
-    out2 = storage_z_5(
-        out2,
-        0,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0,
-    )
-
-    # Step 4: apply rotation 4
-    out2 = apply_rot(
-        out2,
-        [one, one, one, one, z],
-        pl1 + 0.5 * lmove * pm2,
-        0.5 * lmove * pm2 + 0.5 * (dz2 + dm2) * dx2 / dm2 * pm2,
-        0,
-    )
-
-    # Apply storage errors for l1time code cycles
-    out2 = storage_x_5(
-        out2,
-        0,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-    )
-    out2 = storage_z_5(
-        out2,
-        0,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-    )
-
-    # Step 5: apply rotation 5
-    out2 = apply_rot(
-        out2,
-        [z, z, z, one, one],
-        pl1 + 0.5 * lmove * pm2,
-        0.5 * lmove * pm2 + 0.5 * (dx2 + 4 * dz2 + dm2) * dx2 / dm2 * pm2,
-        0,
-    )
-    out2 = storage_z_5(out2, 0.5 * (dx2 + 4 * dz2 + dm2) * dm2 / dx2 * px2, 0, 0, 0, 0)
-
-    # Apply storage errors for l1time code cycles
-    out2 = storage_x_5(
-        out2,
-        0.5 * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-    )
-    out2 = storage_z_5(
-        out2,
-        0.5 * px2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-    )
-
-    # Step 6: apply rotation 6
-    out2 = apply_rot(
-        out2,
-        [one, z, z, z, one],
-        pl1 + 0.5 * lmove * pm2,
-        0.5 * lmove * pm2 + 0.5 * (4 * dz2 + dm2) * dx2 / dm2 * pm2,
-        0,
-    )
-
-    # Apply storage errors for l1time code cycles
-    out2 = storage_x_5(
-        out2,
-        0.5 * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-    )
-    out2 = storage_z_5(
-        out2,
-        0.5 * px2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-    )
-
-    # Step 7: apply rotation 7
-    out2 = apply_rot(
-        out2,
-        [z, one, z, z, one],
-        pl1 + 0.5 * lmove * pm2,
-        0.5 * lmove * pm2 + 0.5 * (dx2 + 4 * dz2 + dm2) * dx2 / dm2 * pm2,
-        0,
-    )
-    out2 = storage_z_5(out2, 0.5 * (dx2 + 4 * dz2 + dm2) * dm2 / dx2 * px2, 0, 0, 0, 0)
-
-    # Apply storage errors for l1time code cycles
-    out2 = storage_x_5(
-        out2,
-        0.5 * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-    )
-    out2 = storage_z_5(
-        out2,
-        0.5 * px2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-    )
-
-    # Step 8: apply rotation 8
-    out2 = apply_rot(
-        out2,
-        [z, z, one, z, one],
-        pl1 + 0.5 * lmove * pm2,
-        0.5 * lmove * pm2 + 0.5 * (dx2 + 4 * dz2 + dm2) * dx2 / dm2 * pm2,
-        0,
-    )
-    out2 = storage_z_5(out2, 0.5 * (dx2 + 4 * dz2 + dm2) * dm2 / dx2 * px2, 0, 0, 0, 0)
-
-    # Apply storage errors for l1time code cycles
-    out2 = storage_x_5(
-        out2,
-        0.5 * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-    )
-    out2 = storage_z_5(
-        out2,
-        0.5 * px2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-    )
-
-    # Step 9: apply rotation 9
-    out2 = apply_rot(
-        out2,
-        [z, z, one, one, z],
-        pl1 + 0.5 * lmove * pm2,
-        0.5 * lmove * pm2 + 0.5 * (dx2 + 4 * dz2 + dm2) * dx2 / dm2 * pm2,
-        0,
-    )
-    out2 = storage_z_5(out2, 0.5 * (dx2 + 4 * dz2 + dm2) * dm2 / dx2 * px2, 0, 0, 0, 0)
-
-    # Apply storage errors for l1time code cycles
-    out2 = storage_x_5(
-        out2,
-        0.5 * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-    )
-    out2 = storage_z_5(
-        out2,
-        0.5 * px2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-    )
-
-    # Step 10: apply rotation 10
-    out2 = apply_rot(
-        out2,
-        [z, one, one, z, z],
-        pl1 + 0.5 * lmove * pm2,
-        0.5 * lmove * pm2 + 0.5 * (dx2 + 4 * dz2 + dm2) * dx2 / dm2 * pm2,
-        0,
-    )
-    out2 = storage_z_5(out2, 0.5 * (dx2 + 4 * dz2 + dm2) * dm2 / dx2 * px2, 0, 0, 0, 0)
-
-    # Apply storage errors for l1time code cycles
-    out2 = storage_x_5(
-        out2,
-        0.5 * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-    )
-    out2 = storage_z_5(
-        out2,
-        0.5 * px2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-    )
-
-    # Step 11: apply rotation 11
-    out2 = apply_rot(
-        out2,
-        [z, one, z, one, z],
-        pl1 + 0.5 * lmove * pm2,
-        0.5 * lmove * pm2 + 0.5 * (dx2 + 4 * dz2 + dm2) * dx2 / dm2 * pm2,
-        0,
-    )
-    out2 = storage_z_5(out2, 0.5 * (dx2 + 4 * dz2 + dm2) * dm2 / dx2 * px2, 0, 0, 0, 0)
-
-    # Apply storage errors for l1time code cycles
-    out2 = storage_x_5(
-        out2,
-        0.5 * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-    )
-    out2 = storage_z_5(
-        out2,
-        0.5 * px2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-    )
-
-    # Step 12: apply rotation 12
-    out2 = apply_rot(
-        out2,
-        [z, z, z, z, z],
-        pl1 + 0.5 * lmove * pm2,
-        0.5 * lmove * pm2 + 0.5 * (dx2 + 4 * dz2 + dm2) * dx2 / dm2 * pm2,
-        0,
-    )
-    out2 = storage_z_5(out2, 0.5 * (dx2 + 4 * dz2 + dm2) * dm2 / dx2 * px2, 0, 0, 0, 0)
-
-    # Apply storage errors for l1time code cycles
-    out2 = storage_x_5(
-        out2,
-        0.5 * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-    )
-    out2 = storage_z_5(
-        out2,
-        0.5 * px2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-    )
-
-    # Step 13: apply rotation 13
-    out2 = apply_rot(
-        out2,
-        [one, z, one, z, z],
-        pl1 + 0.5 * lmove * pm2,
-        0.5 * lmove * pm2 + 0.5 * (4 * dz2 + dm2) * dx2 / dm2 * pm2,
-        0,
-    )
-
-    # Apply storage errors for l1time code cycles
-    out2 = storage_x_5(
-        out2,
-        0.5 * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-    )
-    out2 = storage_z_5(
-        out2,
-        0.5 * px2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-    )
-
-    # Step 14: apply rotation 14
-    out2 = apply_rot(
-        out2,
-        [one, one, z, z, z],
-        pl1 + 0.5 * lmove * pm2,
-        0.5 * lmove * pm2 + 0.5 * (3 * dz2 + dm2) * dx2 / dm2 * pm2,
-        0,
-    )
-
-    # Apply storage errors for l1time code cycles
-    out2 = storage_x_5(
-        out2,
-        0.5 * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-    )
-    out2 = storage_z_5(
-        out2,
-        0.5 * px2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-    )
-
-    # Step 15: apply rotation 15
-    out2 = apply_rot(
-        out2,
-        [one, z, z, one, z],
-        pl1 + 0.5 * lmove * pm2,
-        0.5 * lmove * pm2 + 0.5 * (4 * dz2 + dm2) * dx2 / dm2 * pm2,
-        0,
-    )
-
-    # Apply storage errors for l1time code cycles
-    # Qubit 1 is consumed as an output state in the following step: additional storage errors for dx2 code cycles
-    out2 = storage_x_5(
-        out2,
-        0.5 * px2 * (l1time + dx2),
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-    )
-    out2 = storage_z_5(
-        out2,
-        0.5 * px2 * (l1time + dx2),
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
+    out2 = run_schedule(
+        TWO_LEVEL_15TO1_SMALL_FOOTPRINT,
+        be,
+        pphys=pphys,
+        dx2=dx2,
+        dz2=dz2,
+        dm2=dm2,
+        pl1=pl1,
+        lmove=lmove,
+        l1time=l1time,
     )
 
     # Compute level-2 failure probability as the probability to measure qubits 2-5 in the |+> state
-    pfail2 = 1 - trace(kron(one, projx, projx, projx, projx) * out2).real
-
-    # Compute the density matrix of the post-selected output state, i.e., after projecting qubits 2-5 into |+>
-    outpostsel2 = (
-        (1 / (1 - pfail2))
-        * kron(one, projx, projx, projx, projx)
-        * out2
-        * kron(one, projx, projx, projx, projx).transpose_conj()
-    )
-
-    # Compute level-2 output error from the infidelity between the post-selected state and the ideal output state
-    pout = 1 - trace(outpostsel2 * ideal15to1).real
-
-    # Full-distance computation: determine full distance required for a 100-qubit / 10000-qubit computation
-    def logerr1(d):
-        return float(231 / pout * d * plog(pphys, d) - 0.01)
-
-    def logerr2(d):
-        return float(20284 / pout * d * plog(pphys, d) - 0.01)
-
-    # reqdist1 = int(2 * round(optimize.root(logerr1, 3, method="hybr").x[0] / 2) + 1)
-    # reqdist2 = int(2 * round(optimize.root(logerr2, 3, method="hybr").x[0] / 2) + 1)
+    # and level-2 output error from the infidelity between the post-selected state and the ideal output state
+    pfail2, pout = postselection_errors(out2, magic_states(1))
 
     # Print output error, failure probability, space cost, time cost and space-time cost
     nqubits = 2 * (
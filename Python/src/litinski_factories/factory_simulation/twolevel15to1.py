@@ -2,40 +2,309 @@ from ..magic_state_factory import MagicStateFactory
 from functools import lru_cache
 import mpmath
 from mpmath import mp
-from scipy import optimize
+from ..backends import BackendLike, get_backend
 from ..definitions import (
-    z,
-    one,
-    projx,
-    kron,
-    trace,
-    apply_rot,
-    plog,
-    storage_x_5,
-    storage_z_5,
-    init5qubit,
-    ideal15to1,
+    postselection_errors,
+    magic_states,
+    Precision,
+    scoped_precision,
 )
+from ..schedule import Label, Rotation, Schedule, Storage, run_schedule
 from ..factory_simulation.onelevel15to1 import one_level_15to1_state
 
 
 @lru_cache
-def one_level_15to1_state_memoized(pphys, dx, dz, dm):
-    out = one_level_15to1_state(pphys, dx, dz, dm)
-    pfail = (1 - trace(kron(one, projx, projx, projx, projx) * out)).real
+def one_level_15to1_state_memoized(
+    pphys, dx, dz, dm, backend: BackendLike = "mpmath", prec: int = 0
+):
+    # `prec` is only part of the cache key, since the level-1 output depends on the working precision
+    out = one_level_15to1_state(pphys, dx, dz, dm, backend)
+    pfail, pl1 = postselection_errors(out, magic_states(1))
 
-    outpostsel = (
-        (1 / (1 - pfail))
-        * kron(one, projx, projx, projx, projx)
-        * out
-        * kron(one, projx, projx, projx, projx).transpose_conj()
-    )
+    return pfail, pl1
 
-    pl1 = (1 - trace(outpostsel * ideal15to1)).real
 
-    return pfail, pl1
+TWO_LEVEL_15TO1 = Schedule(
+    name="Level 2 of (15-to-1)x(15-to-1)",
+    qubits=5,
+    parameters=("pphys", "dx2", "dz2", "dm2", "pl1", "lmove", "l1time"),
+    derived=(
+        ("px2", "plog(pphys, dx2)"),
+        ("pz2", "plog(pphys, dz2)"),
+        ("pm2", "plog(pphys, dm2)"),
+    ),
+    steps=(
+        Label("Step 1 of (15-to-1)x(15-to-1) protocol applying rotations 1-2"),
+        Rotation(
+            "IZIII",
+            "pl1 + 0.5 * lmove * pm2",
+            "0.5 * lmove * pm2 + 0.5 * (dx2 + dz2 + dm2) * dx2 / dm2 * pm2",
+        ),
+        Rotation(
+            "IIZII",
+            "pl1 + 0.5 * lmove * pm2",
+            "0.5 * lmove * pm2 + 0.5 * (3 * dz2 + dm2) * dx2 / dm2 * pm2",
+        ),
+        # Apply storage errors for l1time code cycles
+        Storage(
+            x=(
+                0,
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                0,
+                0,
+            )
+        ),
+        Storage(
+            z=(
+                0,
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                0,
+                0,
+            )
+        ),
+        Label("Step 2: apply rotations 3-4"),
+        Rotation(
+            "IIIZI",
+            "pl1 + 0.5 * lmove * pm2",
+            "0.5 * lmove * pm2 + 0.5 * (dx2 + 3 * dz2 + dm2) * dx2 / dm2 * pm2",
+        ),
+        Rotation(
+            "IIIIZ",
+            "pl1 + 0.5 * lmove * pm2",
+            "0.5 * lmove * pm2 + 0.5 * (dz2 + dm2) * dx2 / dm2 * pm2",
+        ),
+        # Apply storage errors for l1time code cycles
+        Storage(
+            x=(
+                0,
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+            )
+        ),
+        Storage(
+            z=(
+                0,
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+            )
+        ),
+        Label("Step 3: apply rotations 5-6"),
+        # Last operation: apply additional storage errors due to multi-patch measurements
+        Rotation(
+            "ZZZII",
+            "pl1 + 0.5 * lmove * pm2",
+            "0.5 * lmove * pm2 + 0.5 * (dx2 + 2 * dz2 + dm2) * dx2 / dm2 * pm2",
+        ),
+        Rotation(
+            "IZZZI",
+            "pl1 + 0.5 * lmove * pm2",
+            "0.5 * lmove * pm2 + 0.5 * (4 * dz2 + dm2) * dx2 / dm2 * pm2",
+        ),
+        Storage(z=("0.5 * (dx2 + 2 * dz2 + dm2) * dm2 / dx2 * px2", 0, 0, 0, 0)),
+        # Apply storage errors for l1time code cycles
+        Storage(
+            x=(
+                "0.5 * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+            )
+        ),
+        Storage(
+            z=(
+                "0.5 * px2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+            )
+        ),
+        Label("Step 4: apply rotations 7-8"),
+        Rotation(
+            "ZIZZI",
+            "pl1 + 0.5 * lmove * pm2",
+            "0.5 * lmove * pm2 + 0.5 * (dx2 + 3 * dz2 + dm2) * dx2 / dm2 * pm2",
+        ),
+        Rotation(
+            "ZZIZI",
+            "pl1 + 0.5 * lmove * pm2",
+            "0.5 * lmove * pm2 + 0.5 * (dx2 + 4 * dz2 + dm2) * dx2 / dm2 * pm2",
+        ),
+        Storage(
+            z=(
+                "0.5 * ((dx2 + 3 * dz2 + dm2) + (dx2 + 4 * dz2 + dm2)) * dm2 / dx2 * px2",
+                0,
+                0,
+                0,
+                0,
+            )
+        ),
+        # Apply storage errors for l1time code cycles
+        Storage(
+            x=(
+                "0.5 * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+            )
+        ),
+        Storage(
+            z=(
+                "0.5 * px2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+            )
+        ),
+        Label("Step 5: apply rotations 9-10"),
+        Rotation(
+            "ZZIIZ",
+            "pl1 + 0.5 * lmove * pm2",
+            "0.5 * lmove * pm2 + 0.5 * (dx2 + 4 * dz2 + dm2) * dx2 / dm2 * pm2",
+        ),
+        Rotation(
+            "ZIIZZ",
+            "pl1 + 0.5 * lmove * pm2",
+            "0.5 * lmove * pm2 + 0.5 * (dx2 + 4 * dz2 + dm2) * dx2 / dm2 * pm2",
+        ),
+        Storage(
+            z=(
+                "0.5 * ((dx2 + 4 * dz2 + dm2) + (dx2 + 4 * dz2 + dm2)) * dm2 / dx2 * px2",
+                0,
+                0,
+                0,
+                0,
+            )
+        ),
+        # Apply storage errors for l1time code cycles
+        Storage(
+            x=(
+                "0.5 * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+            )
+        ),
+        Storage(
+            z=(
+                "0.5 * px2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+            )
+        ),
+        Label("Step 6: apply rotations 11-12"),
+        Rotation(
+            "ZIZIZ",
+            "pl1 + 0.5 * lmove * pm2",
+            "0.5 * lmove * pm2 + 0.5 * (dx2 + 4 * dz2 + dm2) * dx2 / dm2 * pm2",
+        ),
+        Rotation(
+            "ZZZZZ",
+            "pl1 + 0.5 * lmove * pm2",
+            "0.5 * lmove * pm2 + 0.5 * (dx2 + 4 * dz2 + dm2) * dx2 / dm2 * pm2",
+        ),
+        Storage(
+            z=(
+                "0.5 * ((dx2 + 4 * dz2 + dm2) + (dx2 + 4 * dz2 + dm2)) * dm2 / dx2 * px2",
+                0,
+                0,
+                0,
+                0,
+            )
+        ),
+        # Apply storage errors for l1time code cycles
+        Storage(
+            x=(
+                "0.5 * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+            )
+        ),
+        Storage(
+            z=(
+                "0.5 * px2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+            )
+        ),
+        Label("Step 7: apply rotations 13-14"),
+        Rotation(
+            "IZIZZ",
+            "pl1 + 0.5 * lmove * pm2",
+            "0.5 * lmove * pm2 + 0.5 * (dx2 + 4 * dz2 + dm2) * dx2 / dm2 * pm2",
+        ),
+        Rotation(
+            "IIZZZ",
+            "pl1 + 0.5 * lmove * pm2",
+            "0.5 * lmove * pm2 + 0.5 * (3 * dz2 + dm2) * dx2 / dm2 * pm2",
+        ),
+        Storage(z=("0.5 * (dx2 + 4 * dz2 + dm2) * dm2 / dx2 * px2", 0, 0, 0, 0)),
+        # Apply storage errors for l1time code cycles
+        # Qubit 1 is consumed as an output state: additional storage errors for dx2 code cycles
+        Storage(
+            x=(
+                "0.5 * px2 * (dm2 + 2 * dx2)",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+            )
+        ),
+        Storage(
+            z=(
+                "0.5 * px2 * (dm2 + 2 * dx2)",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+            )
+        ),
+        Label("Step 8: apply rotation 15"),
+        Rotation(
+            "IZZIZ",
+            "pl1 + 0.5 * lmove * pm2",
+            "0.5 * lmove * pm2 + 0.5 * (4 * dz2 + dm2) * dx2 / dm2 * pm2",
+        ),
+        # Apply storage errors for l1time code cycles
+        Storage(
+            x=(
+                0,
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+                0,
+                "0.5 * (dz2 / dx2) * px2 * l1time",
+            )
+        ),
+        Storage(
+            z=(
+                0,
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+                0,
+                "0.5 * (dx2 / dz2) * pz2 * l1time",
+            )
+        ),
+    ),
+)
 
 
+@scoped_precision(order=9)
 def cost_of_two_level_15to1(
     pphys: float | mpmath.mpf,
     dx: int,
@@ -45,6 +314,8 @@ def cost_of_two_level_15to1(
     dz2: int,
     dm2: int,
     nl1: int,
+    backend: BackendLike = "mpmath",
+    precision: Precision = None,
 ) -> MagicStateFactory:
     """
     Calculates the output error and cost of the (15-to-1)x(15-to-1) protocol with a physical error rate pphys, level-1 distances dx, dz and dm, level-2 distances dx2, dz2 and dm2, using nl1 level-1 factories
@@ -52,14 +323,11 @@ def cost_of_two_level_15to1(
 
     # Introduce shorthand notation for logical error rate with distances dx2/dz2/dm2
 
-    pphys = mp.mpf(pphys)
-
-    px2 = plog(pphys, dx2)
-    pz2 = plog(pphys, dz2)
-    pm2 = plog(pphys, dm2)
+    be = get_backend(backend)
+    pphys = be.scalar(pphys)
 
     # Compute pl1, the output error of level-1 states
-    pfail, pl1 = one_level_15to1_state_memoized(pphys, dx, dz, dm)
+    pfail, pl1 = one_level_15to1_state_memoized(pphys, dx, dz, dm, backend, mp.prec)
 
     # Compute l1time, the speed at which level-2 rotations can be performed (t_{L1} in the paper)
     l1time = max(6 * dm / (nl1 / 2) / (1 - pfail), dm2)
@@ -68,324 +336,21 @@ def cost_of_two_level_15to1(
     # before reaching the level-2 block, picking up additional storage errors
     lmove = 10 * dm2 + nl1 / 4 * (dx + 4 * dz)
 
-    # Step 1 of (15-to-1)x(15-to-1) protocol applying rotations 1-2
-    out2 = apply_rot(
-        init5qubit,
-        [one, z, one, one, one],
-        pl1 + 0.5 * lmove * pm2,
-        0.5 * lmove * pm2 + 0.5 * (dx2 + dz2 + dm2) * dx2 / dm2 * pm2,
-        mp.mpc(0),
-    )
-    out2 = apply_rot(
-        out2,
-        [one, one, z, one, one],
-        pl1 + 0.5 * lmove * pm2,
-        0.5 * lmove * pm2 + 0.5 * (3 * dz2 + dm2) * dx2 / dm2 * pm2,
-        mp.mpc(0),
-    )
-
-    # Apply storage errors for l1time code cycles
-    out2 = storage_x_5(
-        out2,
-        0,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0,
-        0,
-    )
-    out2 = storage_z_5(
-        out2,
-        0,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0,
-        0,
-    )
-
-    # Step 2: apply rotations 3-4
-    out2 = apply_rot(
-        out2,
-        [one, one, one, z, one],
-        pl1 + 0.5 * lmove * pm2,
-        0.5 * lmove * pm2 + 0.5 * (dx2 + 3 * dz2 + dm2) * dx2 / dm2 * pm2,
-        mp.mpc(0),
-    )
-    out2 = apply_rot(
-        out2,
-        [one, one, one, one, z],
-        pl1 + 0.5 * lmove * pm2,
-        0.5 * lmove * pm2 + 0.5 * (dz2 + dm2) * dx2 / dm2 * pm2,
-        mp.mpc(0),
-    )
-
-    # Apply storage errors for l1time code cycles
-    out2 = storage_x_5(
-        out2,
-        0,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-    )
-    out2 = storage_z_5(
-        out2,
-        0,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-    )
-
-    # Step 3: apply rotations 5-6
-    # Last operation: apply additional storage errors due to multi-patch measurements
-    out2 = apply_rot(
-        out2,
-        [z, z, z, one, one],
-        pl1 + 0.5 * lmove * pm2,
-        0.5 * lmove * pm2 + 0.5 * (dx2 + 2 * dz2 + dm2) * dx2 / dm2 * pm2,
-        mp.mpc(0),
-    )
-    out2 = apply_rot(
-        out2,
-        [one, z, z, z, one],
-        pl1 + 0.5 * lmove * pm2,
-        0.5 * lmove * pm2 + 0.5 * (4 * dz2 + dm2) * dx2 / dm2 * pm2,
-        mp.mpc(0),
-    )
-    out2 = storage_z_5(out2, 0.5 * (dx2 + 2 * dz2 + dm2) * dm2 / dx2 * px2, 0, 0, 0, 0)
-
-    # Apply storage errors for l1time code cycles
-    out2 = storage_x_5(
-        out2,
-        0.5 * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-    )
-    out2 = storage_z_5(
-        out2,
-        0.5 * px2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-    )
-
-    # Step 4: apply rotations 7-8
-    out2 = apply_rot(
-        out2,
-        [z, one, z, z, one],
-        pl1 + 0.5 * lmove * pm2,
-        0.5 * lmove * pm2 + 0.5 * (dx2 + 3 * dz2 + dm2) * dx2 / dm2 * pm2,
-        mp.mpc(0),
-    )
-    out2 = apply_rot(
-        out2,
-        [z, z, one, z, one],
-        pl1 + 0.5 * lmove * pm2,
-        0.5 * lmove * pm2 + 0.5 * (dx2 + 4 * dz2 + dm2) * dx2 / dm2 * pm2,
-        mp.mpc(0),
-    )
-    out2 = storage_z_5(
-        out2,
-        0.5 * ((dx2 + 3 * dz2 + dm2) + (dx2 + 4 * dz2 + dm2)) * dm2 / dx2 * px2,
-        0,
-        0,
-        0,
-        0,
-    )
-
-    # Apply storage errors for l1time code cycles
-    out2 = storage_x_5(
-        out2,
-        0.5 * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-    )
-    out2 = storage_z_5(
-        out2,
-        0.5 * px2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-    )
-
-    # Step 5: apply rotations 9-10
-    out2 = apply_rot(
-        out2,
-        [z, z, one, one, z],
-        pl1 + 0.5 * lmove * pm2,
-        0.5 * lmove * pm2 + 0.5 * (dx2 + 4 * dz2 + dm2) * dx2 / dm2 * pm2,
-        mp.mpc(0),
+    out2 = run_schedule(
+        TWO_LEVEL_15TO1,
+        be,
+        pphys=pphys,
+        dx2=dx2,
+        dz2=dz2,
+        dm2=dm2,
+        pl1=pl1,
+        lmove=lmove,
+        l1time=l1time,
     )
-    out2 = apply_rot(
-        out2,
-        [z, one, one, z, z],
-        pl1 + 0.5 * lmove * pm2,
-        0.5 * lmove * pm2 + 0.5 * (dx2 + 4 * dz2 + dm2) * dx2 / dm2 * pm2,
-        mp.mpc(0),
-    )
-    out2 = storage_z_5(
-        out2,
-        0.5 * ((dx2 + 4 * dz2 + dm2) + (dx2 + 4 * dz2 + dm2)) * dm2 / dx2 * px2,
-        0,
-        0,
-        0,
-        0,
-    )
-
-    # Apply storage errors for l1time code cycles
-    out2 = storage_x_5(
-        out2,
-        0.5 * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-    )
-    out2 = storage_z_5(
-        out2,
-        0.5 * px2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-    )
-
-    # Step 6: apply rotations 11-12
-    out2 = apply_rot(
-        out2,
-        [z, one, z, one, z],
-        pl1 + 0.5 * lmove * pm2,
-        0.5 * lmove * pm2 + 0.5 * (dx2 + 4 * dz2 + dm2) * dx2 / dm2 * pm2,
-        mp.mpc(0),
-    )
-    out2 = apply_rot(
-        out2,
-        [z, z, z, z, z],
-        pl1 + 0.5 * lmove * pm2,
-        0.5 * lmove * pm2 + 0.5 * (dx2 + 4 * dz2 + dm2) * dx2 / dm2 * pm2,
-        mp.mpc(0),
-    )
-    out2 = storage_z_5(
-        out2,
-        0.5 * ((dx2 + 4 * dz2 + dm2) + (dx2 + 4 * dz2 + dm2)) * dm2 / dx2 * px2,
-        0,
-        0,
-        0,
-        0,
-    )
-
-    # Apply storage errors for l1time code cycles
-    out2 = storage_x_5(
-        out2,
-        0.5 * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-    )
-    out2 = storage_z_5(
-        out2,
-        0.5 * px2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-    )
-
-    # Step 7: apply rotations 13-14
-    out2 = apply_rot(
-        out2,
-        [one, z, one, z, z],
-        pl1 + 0.5 * lmove * pm2,
-        0.5 * lmove * pm2 + 0.5 * (dx2 + 4 * dz2 + dm2) * dx2 / dm2 * pm2,
-        mp.mpc(0),
-    )
-    out2 = apply_rot(
-        out2,
-        [one, one, z, z, z],
-        pl1 + 0.5 * lmove * pm2,
-        0.5 * lmove * pm2 + 0.5 * (3 * dz2 + dm2) * dx2 / dm2 * pm2,
-        mp.mpc(0),
-    )
-    out2 = storage_z_5(out2, 0.5 * (dx2 + 4 * dz2 + dm2) * dm2 / dx2 * px2, 0, 0, 0, 0)
-
-    # Apply storage errors for l1time code cycles
-    # Qubit 1 is consumed as an output state: additional storage errors for dx2 code cycles
-    out2 = storage_x_5(
-        out2,
-        0.5 * px2 * (dm2 + 2 * dx2),
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-    )
-    out2 = storage_z_5(
-        out2,
-        0.5 * px2 * (dm2 + 2 * dx2),
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-    )
-
-    # Step 8: apply rotation 15
-    out2 = apply_rot(
-        out2,
-        [one, z, z, one, z],
-        pl1 + 0.5 * lmove * pm2,
-        0.5 * lmove * pm2 + 0.5 * (4 * dz2 + dm2) * dx2 / dm2 * pm2,
-        mp.mpc(0),
-    )
-
-    # Apply storage errors for l1time code cycles
-    out2 = storage_x_5(
-        out2,
-        0,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-        0,
-        0.5 * (dz2 / dx2) * px2 * l1time,
-    )
-    out2 = storage_z_5(
-        out2,
-        0,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-        0,
-        0.5 * (dx2 / dz2) * pz2 * l1time,
-    )
-
-    breakpoint()
 
     # Compute level-2 failure probability as the probability to measure qubits 2-5 in the |+> state
-    pfail2 = (1 - trace(kron(one, projx, projx, projx, projx) * out2)).real
-
-    # Compute the density matrix of the post-selected output state, i.e., after projecting qubits 2-5 into |+>
-    outpostsel2 = (
-        (1 / (1 - pfail2))
-        * kron(one, projx, projx, projx, projx)
-        * out2
-        * kron(one, projx, projx, projx, projx).transpose_conj()
-    )
-
-    # Compute level-2 output error from the infidelity between the post-selected state and the ideal output state
-    pout = (1 - trace(outpostsel2 * ideal15to1)).real
-
-    # Full-distance computation: determine full distance required for a 100-qubit / 10000-qubit computation
-    def logerr1(d):
-        return float(231 / pout * d * plog(pphys, d) - 0.01)
-
-    def logerr2(d):
-        return float(20284 / pout * d * plog(pphys, d) - 0.01)
-
-    reqdist1 = int(2 * round(optimize.root(logerr1, 3, method="hybr").x[0] / 2) + 1)
-    reqdist2 = int(2 * round(optimize.root(logerr2, 3, method="hybr").x[0] / 2) + 1)
+    # and level-2 output error from the infidelity between the post-selected state and the ideal output state
+    pfail2, pout = postselection_errors(out2, magic_states(1))
 
     # Print output error, failure probability, space cost, time cost and space-time cost
     nqubits = 2 * int(
@@ -0,0 +1,247 @@
+import math
+from dataclasses import dataclass
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+import mpmath
+import numpy as np
+
+from .definitions import pauli_of, pauli_product, pauli_rot
+from .schedule import (
+    Fused,
+    Label,
+    Rotation,
+    Schedule,
+    commute_storage,
+    evaluate,
+    schedule_namespace,
+)
+
+# Alternative engine summing the output of a protocol over its fault configurations instead of evolving the
+# density matrix. Every rotation branch other than the `pi/8` rotation and every storage Pauli is a fault, and
+# with independent faults, a configuration of faults at given locations evolves the |+> states as a pure
+# state. Configurations with more than `max_faults` faults are dropped, and their total probability bounds
+# the error of the truncation
+
+
+@dataclass(frozen=True)
+class FaultPathEstimate:
+    """
+    Failure probability and output error of a protocol summed over all fault configurations with up to
+    `max_faults` faults, with bounds covering the dropped configurations of total probability `tail` and the
+    float64 rounding of the sum over the `paths` read out
+    """
+
+    pfail: float
+    pout: float
+    pfail_bounds: Tuple[float, float]
+    pout_bounds: Tuple[float, float]
+    tail: float
+    max_faults: int
+    paths: int
+
+
+class FaultLocation(NamedTuple):
+    """
+    A location of independent faults: the operator of the fault-free branch, or None for the identity, and
+    the probabilities and operators of the faults, on state vectors. Diagonal operators are stored as their
+    diagonal, see `apply_operator`
+    """
+
+    nominal: Optional[np.ndarray]
+    faults: List[Tuple[float, np.ndarray]]
+
+    @property
+    def fault_probability(self) -> float:
+        return sum(p for p, _ in self.faults)
+
+
+def _operator(m: np.ndarray) -> np.ndarray:
+    m = np.asarray(m, dtype=complex)
+    return (
+        np.diagonal(m).copy()
+        if np.count_nonzero(m - np.diag(np.diagonal(m))) == 0
+        else m
+    )
+
+
+def apply_operator(op: Optional[np.ndarray], states: np.ndarray) -> np.ndarray:
+    """
+    Applies an operator of a `FaultLocation` to the columns of `states`
+    """
+    if op is None:
+        return states
+    if op.ndim == 1:
+        return op[:, None] * states
+    return op @ states
+
+
+def fault_locations(schedule: Schedule, **parameters: Any) -> List[FaultLocation]:
+    """
+    The fault locations of `schedule` in order, after `commute_storage`: one per rotation, with its three
+    error branches as faults, and one per storage error
+    """
+    namespace = schedule_namespace(schedule, "numpy", **parameters)
+    flat = [
+        inner
+        for step in commute_storage(schedule).steps
+        for inner in (step.steps if isinstance(step, Fused) else [step])
+        if not isinstance(inner, Label)
+    ]
+    locations = []
+    for step in flat:
+        if isinstance(step, Rotation):
+            p1, p2, p3 = (float(evaluate(p, namespace)) for p in step[1:])
+            angles = [(p1, 5 * math.pi / 8), (p2, -math.pi / 8), (p3, 3 * math.pi / 8)]
+            locations.append(
+                FaultLocation(
+                    _operator(pauli_rot(step.axis, math.pi / 8, "numpy")),
+                    [
+                        (p, _operator(pauli_rot(step.axis, phi, "numpy")))
+                        for p, phi in angles
+                        if p != 0
+                    ],
+                )
+            )
+            continue
+        for letter, probabilities in (("Z", step.z), ("X", step.x)):
+            for k, p in enumerate(probabilities):
+                p = float(evaluate(p, namespace))
+                if p == 0:
+                    continue
+                label = "I" * k + letter + "I" * (schedule.qubits - k - 1)
+                flip = _operator(pauli_product(pauli_of(label), "numpy"))
+                locations.append(FaultLocation(None, [(p, flip)]))
+    return locations
+
+
+def pure_output(ideal: mpmath.matrix) -> np.ndarray:
+    """
+    State vector of the pure density matrix `ideal`, raising ValueError if it is not pure
+    """
+    values, vectors = np.linalg.eigh(np.array(ideal.tolist(), dtype=complex))
+    if not (abs(values[-1] - 1) < 1e-12 and np.all(np.abs(values[:-1]) < 1e-12)):
+        raise ValueError(
+            "The ideal output of a pure-state simulation must be a pure state"
+        )
+    return vectors[:, -1]
+
+
+def postselection_readout(qubits: int, dimension: int) -> np.ndarray:
+    """
+    Maps state vectors of `qubits` qubits to the unnormalized amplitudes of the leading output qubits, of
+    dimension `dimension`, after post-selecting the others in |+>
+    """
+    measured = 2**qubits // dimension
+    return np.kron(np.eye(dimension), np.ones(measured)) / math.sqrt(measured)
+
+
+def output_errors(
+    amplitudes: np.ndarray, target: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Failure probabilities and infidelities with `target` of the unnormalized output amplitudes in the
+    columns of `amplitudes`, the post-selected amplitudes of normalized states
+
+    The failure probability is one minus the squared norm of the accepted amplitudes, which equals the
+    squared norm of the rejected part of the state only as far as the state is normalized, and so in float64
+    carries an absolute rounding error of around 1e-16. The infidelity is the squared norm of the amplitudes
+    orthogonal to `target`
+    """
+    norms = np.sum(np.abs(amplitudes) ** 2, axis=0)
+    errors = amplitudes - np.outer(target, target.conj() @ amplitudes)
+    return 1 - norms, np.sum(np.abs(errors) ** 2, axis=0)
+
+
+def tail_probability(probabilities: List[float], max_faults: int) -> float:
+    """
+    Probability that more than `max_faults` of independent faults with the given `probabilities` occur
+    """
+    # `exact[w]` is the probability of exactly `w` faults so far, `tail` of more than `max_faults`
+    exact = [1.0] + [0.0] * max_faults
+    tail = 0.0
+    for q in probabilities:
+        tail = tail + exact[max_faults] * q
+        for w in range(max_faults, 0, -1):
+            exact[w] = exact[w] * (1 - q) + exact[w - 1] * q
+        exact[0] *= 1 - q
+    return tail
+
+
+def fault_path_errors(
+    schedule: Schedule, ideal: mpmath.matrix, max_faults: int = 3, **parameters: Any
+) -> FaultPathEstimate:
+    """
+    Failure probability and output error of post-selecting all but the output qubits of `schedule` in |+>,
+    summed over its fault configurations with up to `max_faults` faults, see `FaultPathEstimate`
+
+    `ideal` is the pure density matrix of the output qubits, as in `definitions.postselection_errors`. The
+    configurations are swept location by location in float64: the states of all configurations with fewer
+    than `max_faults` faults before a location are evolved together, and every configuration is read out
+    once, at its last fault, through the fault-free remainder of the protocol. The fault-free configuration
+    passes post-selection with the ideal output and is not read out
+    """
+    locations = fault_locations(schedule, **parameters)
+    target = pure_output(ideal)
+    size = 2**schedule.qubits
+
+    # `readouts[j]` maps the state after location `j` to the amplitudes of the output qubits after
+    # post-selecting the measured ones in |+> at the end of the fault-free remainder
+    readouts = [np.empty(0)] * len(locations)
+    readout = postselection_readout(schedule.qubits, len(target))
+    for j in range(len(locations) - 1, -1, -1):
+        readouts[j] = readout
+        nominal = locations[j].nominal
+        if nominal is not None:
+            readout = readout * nominal if nominal.ndim == 1 else readout @ nominal
+
+    failure = infidelity = 0.0
+    paths = 1
+    # The states and relative weights of the configurations with `w` faults so far
+    states = [np.full((size, 1), 1 / math.sqrt(size), dtype=complex)] + [
+        np.empty((size, 0), dtype=complex) for _ in range(max_faults - 1)
+    ]
+    weights = [np.ones(1)] + [np.empty(0) for _ in range(max_faults - 1)]
+    for j, location in enumerate(locations):
+        new_states: List[List[np.ndarray]] = [[] for _ in range(max_faults)]
+        new_weights: List[List[np.ndarray]] = [[] for _ in range(max_faults)]
+        fault_free = 1 - location.fault_probability
+        for w in range(max_faults):
+            if not weights[w].size:
+                continue
+            for p, fault in location.faults:
+                faulted = apply_operator(fault, states[w])
+                weight = weights[w] * (p / fault_free)
+                failures, infidelities = output_errors(readouts[j] @ faulted, target)
+                failure += weight @ failures
+                infidelity += weight @ infidelities
+                paths += len(weight)
+                if w + 1 < max_faults:
+                    new_states[w + 1].append(faulted)
+                    new_weights[w + 1].append(weight)
+        for w in range(max_faults):
+            states[w] = apply_operator(location.nominal, states[w])
+            if new_states[w]:
+                states[w] = np.hstack([states[w]] + new_states[w])
+                weights[w] = np.concatenate([weights[w]] + new_weights[w])
+
+    # Relative weights are with respect to the fault-free configuration
+    probabilities = [location.fault_probability for location in locations]
+    fault_free = math.exp(sum(math.log1p(-q) for q in probabilities))
+    failure *= fault_free
+    infidelity *= fault_free
+    tail = tail_probability(probabilities, max_faults)
+    # Relative rounding error of the float64 sums over the paths and products over the locations
+    rounding = (paths + len(locations)) * 2.0**-52
+    low, high = 1 - rounding, 1 + rounding
+    return FaultPathEstimate(
+        pfail=failure,
+        pout=infidelity / (1 - failure),
+        pfail_bounds=(failure * low, (failure + tail) * high),
+        pout_bounds=(
+            infidelity / (1 - failure) * low,
+            (infidelity + tail) / (1 - failure - tail) * high,
+        ),
+        tail=tail,
+        max_faults=max_faults,
+        paths=paths,
+    )
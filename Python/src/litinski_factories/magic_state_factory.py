@@ -1,5 +1,7 @@
 from dataclasses import dataclass
-from typing import Tuple
+from typing import Optional, Tuple
+
+import numpy as np
 
 
 @dataclass(frozen=True)
@@ -8,8 +10,9 @@ class MagicStateFactory:
     distilled_magic_state_error_rate: float  # Output
     qubits: int  # qubits
     distillation_time_in_cycles: float  # code cycles
-    dimensions: Tuple[int, int]
+    dimensions: Optional[Tuple[int, int]] = None
     n_t_gates_produced_per_distillation: int = 1  # 1 for 15 to 1, 4 for 20 to 4
+    precision_in_bits: Optional[int] = None  # bits of the simulation, None if fixed
 
     def __repr__(self):
         return (
@@ -21,3 +24,17 @@ class MagicStateFactory:
             f"Footprint: {self.dimensions}\n"
             f"Qubitcycles: {int(self.qubits*self.distillation_time_in_cycles/self.n_t_gates_produced_per_distillation)}\n"
         )
+
+
+@dataclass(frozen=True)
+class MagicStateFactoryBatch:
+    name: str
+    # Output, one entry per parameter point
+    distilled_magic_state_error_rate: np.ndarray
+    failure_probability: np.ndarray
+    qubits: np.ndarray  # qubits
+    distillation_time_in_cycles: np.ndarray  # code cycles
+    n_t_gates_produced_per_distillation: int = 1
+
+    def __len__(self):
+        return len(self.distilled_magic_state_error_rate)
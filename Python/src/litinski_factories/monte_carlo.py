@@ -0,0 +1,205 @@
+import math
+from dataclasses import dataclass
+from multiprocessing import Pool
+from statistics import NormalDist
+from typing import Any, List, Optional, Sequence, Tuple
+
+import mpmath
+import numpy as np
+
+from .fault_paths import (
+    FaultLocation,
+    apply_operator,
+    fault_locations,
+    output_errors,
+    postselection_readout,
+    pure_output,
+    tail_probability,
+)
+from .schedule import Schedule
+
+# Alternative engine sampling fault trajectories of a protocol as pure states, for protocols whose density
+# matrices are too large to evolve. Faults are drawn from the channels of `apply_rot` and `apply_storage`,
+# importance-sampled in two ways: by stratifying on their number, weighting the trajectories with exactly `w`
+# faults by its exact probability, so that the rare fault combinations behind small output errors are
+# sampled as often as single faults, and by drawing the `w` locations half of the time uniformly instead of
+# by their probabilities, so that faults far rarer than others but with large effects, such as storage
+# errors of the output qubits, are sampled at all. Locations without faults are never drawn. The likelihood ratio of this mixture is at most 2
+
+
+@dataclass(frozen=True)
+class MonteCarloEstimate:
+    """
+    Importance-sampled failure probability and output error of a protocol, with confidence intervals at
+    `confidence` from the spread of the `samples` trajectories, widened by the probability `tail` of more than
+    `max_faults` faults
+    """
+
+    pfail: float
+    pout: float
+    pfail_interval: Tuple[float, float]
+    pout_interval: Tuple[float, float]
+    tail: float
+    max_faults: int
+    samples: int
+    confidence: float
+
+
+def _subset_table(weights: Sequence[float], max_faults: int) -> np.ndarray:
+    # Entry `[j, w]` is the sum over all sets of `w <= max_faults` of the locations from `j` on of the
+    # product of their `weights`
+    table = np.zeros((len(weights) + 1, max_faults + 1))
+    table[-1, 0] = 1
+    for j in range(len(weights) - 1, -1, -1):
+        table[j] = table[j + 1]
+        table[j, 1:] += weights[j] * table[j + 1, :-1]
+    return table
+
+
+def _sample(
+    locations: List[FaultLocation],
+    faults: int,
+    samples: int,
+    readout: np.ndarray,
+    target: np.ndarray,
+    batch_size: int,
+    seed: np.random.SeedSequence,
+) -> np.ndarray:
+    # Sums of the weighted failure probabilities and infidelities of `samples` trajectories with exactly
+    # `faults` faults, and of their squares, relative to the conditional distribution given `faults`
+    rng = np.random.default_rng(seed)
+    odds = [q / (1 - q) for q in (loc.fault_probability for loc in locations)]
+    # Sets of locations are drawn with probabilities proportional to the product of their odds, or uniformly
+    # among the locations that can fail at all
+    uniform_weights = [1.0 if o > 0 else 0.0 for o in odds]
+    tables = [_subset_table(odds, faults), _subset_table(uniform_weights, faults)]
+    log_uniform = -math.log(tables[1][0, faults])
+    log_total = math.log(tables[0][0, faults])
+    size = readout.shape[1]
+    sums = np.zeros(4)
+    for start in range(0, samples, batch_size):
+        batch = min(batch_size, samples - start)
+        states = np.full((size, batch), 1 / math.sqrt(size), dtype=complex)
+        uniform = rng.random(batch) < 0.5
+        remaining = np.full(batch, faults)
+        log_odds = np.zeros(batch)
+        for j, location in enumerate(locations):
+            # Probability of a fault here given the number of faults left for this and later locations
+            left = np.maximum(remaining - 1, 0)
+            conditional = [
+                np.where(remaining > 0, w * table[j + 1, left] / table[j, remaining], 0)
+                for w, table in zip((odds[j], uniform_weights[j]), tables)
+            ]
+            hit = rng.random(batch) < np.where(uniform, conditional[1], conditional[0])
+            if hit.any():
+                remaining -= hit
+                log_odds[hit] += math.log(odds[j])
+                # The kind of fault follows its conditional probabilities
+                cumulative = np.cumsum([p for p, _ in location.faults])
+                cumulative /= cumulative[-1]
+                kinds = np.searchsorted(cumulative, rng.random(hit.sum()), side="right")
+                kinds = np.minimum(kinds, len(location.faults) - 1)
+                columns = np.flatnonzero(hit)
+                for kind, (_, op) in enumerate(location.faults):
+                    selected = columns[kinds == kind]
+                    if selected.size:
+                        states[:, selected] = apply_operator(op, states[:, selected])
+            if location.nominal is not None and not hit.all():
+                idle = ~hit
+                states[:, idle] = apply_operator(location.nominal, states[:, idle])
+
+        # Likelihood ratio of the conditional distribution to the even mixture with the uniform one
+        ratios = 2 / (1 + np.exp(log_uniform - (log_odds - log_total)))
+        for k, values in enumerate(output_errors(readout @ states, target)):
+            sums[2 * k] += (ratios * values).sum()
+            sums[2 * k + 1] += ((ratios * values) ** 2).sum()
+    return sums
+
+
+def monte_carlo_errors(
+    schedule: Schedule,
+    ideal: mpmath.matrix,
+    samples: int = 100_000,
+    max_faults: int = 3,
+    processes: int = 1,
+    seed: Optional[int] = None,
+    batch_size: int = 4096,
+    confidence: float = 0.95,
+    **parameters: Any,
+) -> MonteCarloEstimate:
+    """
+    Estimates the failure probability and output error of post-selecting all but the output qubits of
+    `schedule` in |+> from `samples` fault trajectories, see `MonteCarloEstimate`
+
+    The samples are split evenly over the numbers of faults from 1 to `max_faults`; the fault-free trajectory
+    passes post-selection with the ideal output. Trajectories are pure states of `2^n` amplitudes evolved in
+    batches of `batch_size` in float64, so the engine reaches protocols of around 20 qubits. With
+    `processes > 1` the samples are split across a process pool, every job with its own stream spawned from
+    `seed`
+
+    `ideal` is the pure density matrix of the output qubits. The interval of `pout` is the one of the
+    infidelity divided by the estimated `1 - pfail`
+    """
+    locations = fault_locations(schedule, **parameters)
+    target = pure_output(ideal)
+    readout = postselection_readout(schedule.qubits, len(target))
+    probabilities = [location.fault_probability for location in locations]
+    max_faults = min(max_faults, len(locations))
+    # Probability of exactly `w` faults, the fault-free one times the sum over the sets of `w` locations
+    fault_free = math.exp(sum(math.log1p(-q) for q in probabilities))
+    exact = (
+        fault_free * _subset_table([q / (1 - q) for q in probabilities], max_faults)[0]
+    )
+
+    # One job per number of faults and process
+    per_count = [
+        samples // max_faults + (w < samples % max_faults) for w in range(max_faults)
+    ]
+    counts = [
+        (w + 1, n // processes + (k < n % processes))
+        for w, n in enumerate(per_count)
+        for k in range(processes)
+    ]
+    streams = np.random.SeedSequence(seed).spawn(len(counts))
+    jobs = [
+        (locations, w, n, readout, target, batch_size, stream)
+        for (w, n), stream in zip(counts, streams)
+        if n and exact[w] > 0
+    ]
+    if processes == 1:
+        results = [_sample(*job) for job in jobs]
+    else:
+        with Pool(processes=processes) as pool:
+            results = pool.starmap(_sample, jobs)
+
+    sums = np.zeros((max_faults + 1, 4))
+    for job, result in zip(jobs, results):
+        sums[job[1]] += result
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    tail = tail_probability(probabilities, max_faults)
+
+    def estimate(index: int) -> Tuple[float, float, float]:
+        # Sum of the means per number of faults weighted by its probability, with the variance of the sum
+        mean = variance = 0.0
+        for w, n in enumerate(per_count, 1):
+            if not n or exact[w] == 0:
+                continue
+            m = sums[w, index] / n
+            v = max(sums[w, index + 1] / n - m**2, 0) * n / max(n - 1, 1)
+            mean += exact[w] * m
+            variance += exact[w] ** 2 * v / n
+        half = z * math.sqrt(variance)
+        return mean, max(mean - half, 0), mean + half + tail
+
+    pfail, pfail_low, pfail_high = estimate(0)
+    infidelity, low, high = estimate(2)
+    return MonteCarloEstimate(
+        pfail=pfail,
+        pout=infidelity / (1 - pfail),
+        pfail_interval=(pfail_low, pfail_high),
+        pout_interval=(low / (1 - pfail_low), high / (1 - pfail_high)),
+        tail=tail,
+        max_faults=max_faults,
+        samples=samples,
+        confidence=confidence,
+    )
@@ -0,0 +1,265 @@
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import mpmath
+
+from .backends import Backend, BackendLike, get_backend
+from .definitions import (
+    PHASES,
+    Matrix,
+    PauliLike,
+    PauliString,
+    is_zero,
+    pauli_of,
+    pauli_product,
+    rotation_branches,
+)
+from .schedule import (
+    Fused,
+    Label,
+    Rotation,
+    Schedule,
+    commute_storage,
+    evaluate,
+    schedule_namespace,
+)
+
+# Alternative engine evolving the density matrix in the Pauli basis instead of as a dense matrix. Writing
+# `rho = sum_(a, b) c_(a, b) X^a Z^b / 2^n` with x- and z-masks `a` and `b`, a Pauli rotation mixes the
+# component of each Pauli string that anticommutes with its axis with one other component, and Pauli errors
+# only scale components. Post-selecting the measured qubits in |+> keeps the components without Z on them,
+# so every component that no remaining rotation can bring back to that form is dropped along the way
+
+
+class PauliState(NamedTuple):
+    """
+    Density matrix of `n` qubits as a sparse map from the masks `(a, b)` of the Pauli strings `X^a Z^b` to
+    their coefficients `c_(a, b)`, with `rho = sum c_(a, b) X^a Z^b / 2^n`, see `pauli_of` for the bit order
+
+    The coefficients are scalars of `backend`
+    """
+
+    n: int
+    coefficients: Dict[Tuple[int, int], Any]
+    backend: Backend
+
+
+def plus_pauli_state(n: int, backend: BackendLike = "mpmath") -> PauliState:
+    """
+    The state |+>^n, whose Pauli strings are all products of I and X
+    """
+    be = get_backend(backend)
+    one = be.scalar(1)
+    return PauliState(n, {(a, 0): one for a in range(2**n)}, be)
+
+
+def density_matrix(state: PauliState) -> Matrix:
+    """
+    Dense density matrix of a `PauliState` on its backend, for checks on few qubits
+    """
+    be = state.backend
+    res = be.eye(2**state.n) * 0
+    for (a, b), c in state.coefficients.items():
+        # `X^a Z^b` is `i^(-#Y)` times the Pauli product with Y on the qubits with both bits set
+        ys = bin(a & b).count("1")
+        pauli = PauliString(state.n, a, b, (3 * ys) % 4)
+        res = res + pauli_product(pauli, be) * c
+    return res * be.scalar(mpmath.mpf(2) ** -state.n)
+
+
+def transfer_rot(
+    state: PauliState, axis: PauliLike, p1: Any, p2: Any, p3: Any
+) -> PauliState:
+    """
+    Applies the noisy `pi/8` rotation of `definitions.apply_rot` about `axis` to a `PauliState`
+
+    Conjugating a Pauli string `P` that anticommutes with the axis `A` by the rotation `e^(iA*phi)` gives
+    `cos(2phi) P - i sin(2phi) P A`, averaged over the branches of the rotation
+    """
+    be = state.backend
+    p1, p2, p3 = be.scalar(p1), be.scalar(p2), be.scalar(p3)
+    pauli = pauli_of(axis)
+    branches = rotation_branches(be, p1, p2, p3)
+    cos = sum((p * be.cos(2 * phi) for p, phi in branches), be.scalar(0))
+    sin = sum((p * be.sin(2 * phi) for p, phi in branches), be.scalar(0))
+    # `A = i^(phase + #Y) X^ax Z^az`, as `Y = iXZ`, so `-i P A = i^(phase + #Y + 3) (-1)^|b & ax| X^(a^ax) Z^(b^az)`
+    ys = bin(pauli.xmask & pauli.zmask).count("1")
+    mixed = sin * PHASES[(pauli.phase + ys + 3) % 4]
+
+    coefficients: Dict[Tuple[int, int], Any] = {}
+    for (a, b), c in state.coefficients.items():
+        if (_parity(a & pauli.zmask) + _parity(b & pauli.xmask)) % 2 == 0:
+            coefficients[a, b] = coefficients.get((a, b), 0) + c
+            continue
+        coefficients[a, b] = coefficients.get((a, b), 0) + cos * c
+        term = mixed * c if _parity(b & pauli.xmask) == 0 else -mixed * c
+        key = (a ^ pauli.xmask, b ^ pauli.zmask)
+        coefficients[key] = coefficients.get(key, 0) + term
+    return state._replace(coefficients=coefficients)
+
+
+def transfer_storage(
+    state: PauliState, x: Sequence[Any] = (), z: Sequence[Any] = ()
+) -> PauliState:
+    """
+    Applies the independent X and Z storage errors of `definitions.apply_storage` to a `PauliState`, scaling
+    every component that anticommutes with an error of probability `p` by `1 - 2p`
+    """
+    be = state.backend
+    # Z errors act on the x-mask of a component, X errors on its z-mask
+    scalings: List[Tuple[int, int, Any]] = [
+        (index, 1 << (state.n - 1 - k), 1 - 2 * be.scalar(p))
+        for index, probabilities in ((0, z), (1, x))
+        for k, p in enumerate(probabilities)
+        if not is_zero(p)
+    ]
+    if not scalings:
+        return state
+    coefficients = {}
+    for key, c in state.coefficients.items():
+        for index, bit, factor in scalings:
+            if key[index] & bit:
+                c = c * factor
+        coefficients[key] = c
+    return state._replace(coefficients=coefficients)
+
+
+def _parity(mask: int) -> int:
+    return bin(mask).count("1") % 2
+
+
+def _reduce(vector: int, basis: Dict[int, int]) -> int:
+    # Reduces `vector` by a GF(2) basis keyed by the leading bit of its vectors
+    while vector and vector.bit_length() - 1 in basis:
+        vector ^= basis[vector.bit_length() - 1]
+    return vector
+
+
+def _spans(vectors: Sequence[int]) -> List[Dict[int, int]]:
+    # The spans of all suffixes `vectors[t:]`, last one empty
+    spans: List[Dict[int, int]] = [{}]
+    for vector in reversed(vectors):
+        basis = dict(spans[-1])
+        vector = _reduce(vector, basis)
+        if vector:
+            basis[vector.bit_length() - 1] = vector
+        spans.append(basis)
+    return spans[::-1]
+
+
+def _flat_steps(schedule: Schedule) -> Iterable[Any]:
+    for step in schedule.steps:
+        yield from step.steps if isinstance(step, Fused) else [step]
+
+
+def run_pauli_transfer(
+    schedule: Schedule,
+    outputs: int,
+    backend: BackendLike = "mpmath",
+    progress: Optional[Callable[[str], Any]] = None,
+    **parameters: Any,
+) -> PauliState:
+    """
+    Evolves the initial |+> states of `schedule` in the Pauli basis, keeping only the components that can
+    contribute after post-selecting all but the first `outputs` qubits in |+>
+
+    The result equals the dense state of `schedule.run_schedule` on these components. Arithmetic runs on
+    scalars of `backend`; on double-precision backends the infidelity of the output suffers from the
+    cancellation that the `SplitState` of the dense path avoids
+    """
+    be = get_backend(backend)
+    schedule = commute_storage(schedule)
+    namespace = schedule_namespace(schedule, be, **parameters)
+    steps = list(_flat_steps(schedule))
+    measured = (1 << (schedule.qubits - outputs)) - 1
+    # The z-masks that the remaining rotations can still add on the measured qubits
+    spans = _spans([axis.zmask & measured for axis in _axes(steps)])
+    rotations = 0
+
+    state = plus_pauli_state(schedule.qubits, be)
+    for step in steps:
+        if isinstance(step, Label):
+            if progress is not None:
+                progress(step.text)
+        elif isinstance(step, Rotation):
+            p1, p2, p3 = (evaluate(p, namespace) for p in step[1:])
+            state = transfer_rot(state, step.axis, p1, p2, p3)
+            rotations += 1
+            state = _prune(state, measured, spans[rotations])
+        else:
+            state = transfer_storage(
+                state,
+                x=[evaluate(p, namespace) for p in step.x],
+                z=[evaluate(p, namespace) for p in step.z],
+            )
+    return state
+
+
+def _axes(steps: Sequence[Any]) -> List[Any]:
+    return [pauli_of(step.axis) for step in steps if isinstance(step, Rotation)]
+
+
+def _prune(state: PauliState, measured: int, basis: Dict[int, int]) -> PauliState:
+    return state._replace(
+        coefficients={
+            (a, b): c
+            for (a, b), c in state.coefficients.items()
+            if _reduce(b & measured, basis) == 0
+        }
+    )
+
+
+def pauli_postselection_weights(
+    state: PauliState, ideal: mpmath.matrix
+) -> Tuple[Any, Any]:
+    """
+    Same as `definitions.postselection_weights` for a `PauliState`: the failure probability of post-selecting
+    the measured qubits in |+> and the infidelity of the unnormalized output block with `ideal`
+    """
+    be = state.backend
+    outputs = ideal.rows.bit_length() - 1
+    measured_qubits = state.n - outputs
+    measured = (1 << measured_qubits) - 1
+    zero = be.scalar(0)
+
+    # `<+|X^a Z^b|+>` is 1 on a measured qubit without Z and 0 with it, so the output block is
+    # `sum c_(a, b) X^a_out Z^b_out / 2^n` over the components without Z on the measured qubits
+    block = [[zero] * ideal.rows for _ in range(ideal.rows)]
+    for (a, b), c in state.coefficients.items():
+        if b & measured:
+            continue
+        a_out, b_out = a >> measured_qubits, b >> measured_qubits
+        for j in range(ideal.rows):
+            # `X^a Z^b |j> = (-1)^|j & b| |j ^ a>`
+            sign = -1 if _parity(j & b_out) else 1
+            block[j ^ a_out][j] = block[j ^ a_out][j] + sign * c
+    scale = be.scalar(mpmath.mpf(2) ** -state.n)
+
+    trace = state.coefficients.get((0, 0), zero)
+    block_trace = sum((block[i][i] for i in range(ideal.rows)), zero) * scale
+    infidelity = zero
+    for i in range(ideal.rows):
+        for j in range(ideal.rows):
+            complement = (1 if i == j else 0) - be.scalar(ideal[j, i])
+            infidelity = infidelity + complement * block[i][j]
+    return (trace - block_trace).real, (infidelity * scale).real
+
+
+def pauli_postselection_errors(
+    state: PauliState, ideal: mpmath.matrix
+) -> Tuple[Any, Any]:
+    """
+    Same as `definitions.postselection_errors` for a `PauliState`: the failure probability and the output
+    error `pout` of the post-selected output qubits
+    """
+    pfail, infidelity = pauli_postselection_weights(state, ideal)
+    return pfail, infidelity / (1 - pfail)
@@ -0,0 +1,321 @@
+from functools import lru_cache
+from types import CodeType
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from .backends import Backend, BackendLike, get_backend
+from .definitions import (
+    DiagonalChannel,
+    SplitState,
+    State,
+    apply_diagonal,
+    apply_rot,
+    apply_storage,
+    diagonal_of,
+    diagonal_rotation,
+    fuse_diagonal,
+    initial_state,
+    pauli_of,
+    plog,
+    plus_states,
+    z_storage,
+)
+
+# An error probability: a Python expression in the parameters of a schedule, such as
+# "0.5 * (dz / dx) * px * dm", or a constant
+Expr = Union[str, int, float]
+
+
+def either(p: Any, q: Any) -> Any:
+    """
+    Probability that exactly one of two independent errors with probabilities `p` and `q` occurs, i.e. that
+    two successive flips of the same qubit leave it flipped
+    """
+    return p * (1 - q) + q * (1 - p)
+
+
+# Functions the expressions of a schedule may call
+FUNCTIONS: Dict[str, Any] = {"plog": plog, "max": max, "either": either}
+
+
+class Rotation(NamedTuple):
+    """
+    A `pi/8` rotation about the Pauli string `axis`, with the error probabilities `p1`, `p2` and `p3` of
+    `definitions.apply_rot`
+    """
+
+    axis: str
+    p1: Expr
+    p2: Expr
+    p3: Expr = 0
+
+
+class Storage(NamedTuple):
+    """
+    A storage window with independent X and Z errors, where `x[k]` / `z[k]` is the probability of an error
+    on qubit `k+1`, see `definitions.apply_storage`
+    """
+
+    x: Tuple[Expr, ...] = ()
+    z: Tuple[Expr, ...] = ()
+
+
+class Label(NamedTuple):
+    """
+    Marks the start of a step of the protocol, such as "Step 2: apply rotations 6-7"
+    """
+
+    text: str
+
+
+class Fused(NamedTuple):
+    """
+    A run of diagonal `Rotation` and `Storage` steps, applied as one elementwise multiplication, see
+    `fuse_diagonal_runs`
+    """
+
+    steps: Tuple[Union[Rotation, Storage], ...]
+
+
+Step = Union[Rotation, Storage, Label, Fused]
+
+
+class Schedule(NamedTuple):
+    """
+    A distillation protocol as data: the steps applied in order to `qubits` |+> states
+
+    The expressions of the steps are written in terms of `parameters`, passed to `run_schedule`, and of the
+    shorthands `derived` from them, e.g. `("px", "plog(pphys, dx)")`, evaluated in order
+    """
+
+    name: str
+    qubits: int
+    parameters: Tuple[str, ...]
+    derived: Tuple[Tuple[str, Expr], ...]
+    steps: Tuple[Step, ...]
+
+
+def is_diagonal(step: Step) -> bool:
+    """
+    Whether a step acts on the density matrix as an elementwise multiplication: a rotation about a
+    Pauli string of Z and I, or storage without X errors
+    """
+    if isinstance(step, Rotation):
+        return diagonal_of(step.axis) is not None
+    if isinstance(step, Storage):
+        return all(p == 0 for p in step.x)
+    return isinstance(step, Fused)
+
+
+def fuse_diagonal_runs(schedule: Schedule) -> Schedule:
+    """
+    Optimizer pass replacing every maximal run of diagonal steps, which only X storage errors and rotations
+    with X or Y break, by one `Fused` step
+
+    Labels within a run are moved in front of it
+    """
+    steps: List[Step] = []
+    # The current run of diagonal steps, with the labels within it in their original order
+    pending: List[Step] = []
+
+    def flush() -> None:
+        run = [step for step in pending if not isinstance(step, Label)]
+        if len(run) > 1:
+            steps.extend(step for step in pending if isinstance(step, Label))
+            steps.append(Fused(tuple(run)))  # type: ignore[arg-type]
+        else:
+            steps.extend(pending)
+        pending.clear()
+
+    for step in schedule.steps:
+        if isinstance(step, Label) or is_diagonal(step):
+            pending.append(step)
+        else:
+            flush()
+            steps.append(step)
+    flush()
+    return schedule._replace(steps=tuple(steps))
+
+
+def commute_storage(schedule: Schedule) -> Schedule:
+    """
+    Optimizer pass moving the storage errors of `schedule` to as few points as possible
+
+    A Z error on a qubit commutes with every rotation without X or Y on it, an X error with every rotation
+    without Z or Y on it, and storage errors commute with each other. Each error may therefore be applied
+    anywhere between its storage window and the first later rotation it does not commute with. The points
+    are chosen greedily as the latest position of the error that must be applied first, which minimizes
+    their number and postpones them as far as the first of them allows. At each point, the Z errors are
+    applied as one storage window in front of the X errors, so they join the diagonal run before them, and
+    errors on the same qubit are combined with `either`
+
+    The output state is mathematically unchanged and differs from the one of the original order by a few
+    units in the last place of the working precision, e.g. `1e-37` relative to its entries at 128 bits.
+    Of a `SplitState`, two combined flips that cancel count towards the ideal branch instead of the errors
+    """
+    steps = [step for step in schedule.steps if not isinstance(step, Storage)]
+    # Storage errors `(kind, qubit, probability, first gap)`, where gap `g` lies in front of `steps[g]`
+    errors: List[Tuple[str, int, Expr, int]] = []
+    position = 0
+    for step in schedule.steps:
+        if isinstance(step, Storage):
+            for kind, probabilities in (("z", step.z), ("x", step.x)):
+                errors.extend(
+                    (kind, k, p, position)
+                    for k, p in enumerate(probabilities)
+                    if not (isinstance(p, (int, float)) and p == 0)
+                )
+        else:
+            position += 1
+
+    def last_gap(kind: str, qubit: int, first: int) -> int:
+        bit = 1 << (schedule.qubits - 1 - qubit)
+        for g in range(first, len(steps)):
+            step = steps[g]
+            if isinstance(step, Label):
+                continue
+            if not isinstance(step, Rotation):
+                return g
+            axis = pauli_of(step.axis)
+            if (axis.xmask if kind == "z" else axis.zmask) & bit:
+                return g
+        return len(steps)
+
+    # Greedy interval stabbing: every error goes to the first point at or after its first gap
+    last = [last_gap(kind, k, first) for kind, k, _, first in errors]
+    point = -1
+    points: Dict[int, List[int]] = {}
+    for i in sorted(range(len(errors)), key=lambda i: last[i]):
+        if errors[i][3] > point:
+            point = last[i]
+        points.setdefault(point, []).append(i)
+
+    optimized: List[Step] = []
+    for g in range(len(steps) + 1):
+        for kind in ("z", "x"):
+            combined: List[Expr] = [0] * schedule.qubits
+            for i in sorted(points.get(g, [])):
+                if errors[i][0] == kind:
+                    _, k, p, _ = errors[i]
+                    combined[k] = (
+                        p if combined[k] == 0 else f"either({combined[k]}, {p})"
+                    )
+            if any(p != 0 for p in combined):
+                optimized.append(Storage(**{kind: tuple(combined)}))
+        if g < len(steps):
+            optimized.append(steps[g])
+    return schedule._replace(steps=tuple(optimized))
+
+
+@lru_cache(maxsize=None)
+def _optimized(schedule: Schedule, fuse: bool) -> Schedule:
+    schedule = commute_storage(schedule)
+    return fuse_diagonal_runs(schedule) if fuse else schedule
+
+
+def state_passes(schedule: Schedule) -> int:
+    """
+    Number of operations on the full density matrix of one run of `schedule`: one per diagonal rotation,
+    fused run, Z storage window and X storage error, and one conjugation per branch of other rotations
+    """
+    passes = 0
+    for step in schedule.steps:
+        if isinstance(step, Fused):
+            passes += 1
+        elif isinstance(step, Rotation):
+            passes += 1 if is_diagonal(step) else 4
+        elif isinstance(step, Storage):
+            passes += any(p != 0 for p in step.z) + sum(p != 0 for p in step.x)
+    return passes
+
+
+@lru_cache(maxsize=None)
+def _compiled(expr: str) -> CodeType:
+    return compile(expr, "<schedule>", "eval")
+
+
+def evaluate(expr: Expr, namespace: Dict[str, Any]) -> Any:
+    """
+    Value of the expression `expr` with the variables in `namespace`
+    """
+    if not isinstance(expr, str):
+        return expr
+    return eval(_compiled(expr), {"__builtins__": {}}, namespace)
+
+
+def schedule_namespace(
+    schedule: Schedule, backend: BackendLike = "mpmath", **parameters: Any
+) -> Dict[str, Any]:
+    """
+    Values of the parameters of `schedule`, with `pphys` converted to a scalar of `backend`, and of its
+    derived shorthands
+    """
+    missing = set(schedule.parameters) - set(parameters)
+    if missing:
+        raise TypeError(f"{schedule.name} is missing parameters {sorted(missing)}")
+    namespace = dict(FUNCTIONS, **parameters)
+    if "pphys" in namespace:
+        namespace["pphys"] = get_backend(backend).scalar(namespace["pphys"])
+    for name, expr in schedule.derived:
+        namespace[name] = evaluate(expr, namespace)
+    return namespace
+
+
+def run_schedule(
+    schedule: Schedule,
+    backend: BackendLike = "mpmath",
+    progress: Optional[Callable[[str], Any]] = None,
+    **parameters: Any,
+) -> State:
+    """
+    Evolves the initial |+> states of `schedule` through its steps on `backend` and returns the output state
+
+    `progress` is called with the text of every `Label` reached, e.g. `progress=print`. The schedule first
+    goes through `commute_storage` and, on backends with `fuse_diagonal` set, `fuse_diagonal_runs`
+    """
+    be = get_backend(backend)
+    schedule = _optimized(schedule, be.fuse_diagonal)
+    namespace = schedule_namespace(schedule, be, **parameters)
+    state = initial_state(plus_states(schedule.qubits), be)
+    for step in schedule.steps:
+        if isinstance(step, Label):
+            if progress is not None:
+                progress(step.text)
+        elif isinstance(step, Fused):
+            channels = [
+                channel
+                for inner in step.steps
+                if (channel := _diagonal_channel(be, inner, namespace)) is not None
+            ]
+            if channels:
+                split = isinstance(state, SplitState)
+                state = apply_diagonal(state, fuse_diagonal(channels, split))
+        elif isinstance(step, Rotation):
+            state = apply_rot(
+                state,
+                step.axis,
+                evaluate(step.p1, namespace),
+                evaluate(step.p2, namespace),
+                evaluate(step.p3, namespace),
+            )
+        else:
+            state = apply_storage(
+                state,
+                x=[evaluate(p, namespace) for p in step.x],
+                z=[evaluate(p, namespace) for p in step.z],
+            )
+    return state
+
+
+def _diagonal_channel(
+    be: Backend, step: Union[Rotation, Storage], namespace: Dict[str, Any]
+) -> Optional[DiagonalChannel]:
+    if isinstance(step, Rotation):
+        return diagonal_rotation(
+            be,
+            step.axis,
+            be.scalar(evaluate(step.p1, namespace)),
+            be.scalar(evaluate(step.p2, namespace)),
+            be.scalar(evaluate(step.p3, namespace)),
+        )
+    n = max(len(step.x), len(step.z))
+    return z_storage(be, [evaluate(p, namespace) for p in step.z], n)
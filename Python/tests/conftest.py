@@ -0,0 +1,10 @@
+import pytest
+
+from litinski_factories.definitions import DEFAULT_PRECISION, working_precision
+
+
+@pytest.fixture(autouse=True)
+def default_precision():
+    # The tests compare against mpmath results at the precision of the cost functions
+    with working_precision(DEFAULT_PRECISION):
+        yield
@@ -0,0 +1,174 @@
+import numpy as np
+import pytest
+from mpmath import mp
+
+from litinski_factories.backends import Backend, get_backend
+from litinski_factories.definitions import (
+    apply_pauli,
+    apply_rot,
+    fidelity,
+    init4qubit,
+    kron,
+    one,
+    plusstate,
+    trace,
+    trace_product,
+    working_precision,
+    x,
+    y,
+    z,
+)
+from litinski_factories.doubledouble import DDArray
+from litinski_factories.factory_simulation.onelevel15to1 import (
+    cost_of_one_level_15to1,
+    one_level_15to1_state,
+    cost_of_one_level_15to1_batch,
+)
+from litinski_factories.factory_simulation.twolevel15to1 import cost_of_two_level_15to1
+
+mpmath_backend = get_backend("mpmath")
+numpy_backend = get_backend("numpy")
+
+
+def as_array(m) -> np.ndarray:
+    return numpy_backend.matrix(m)
+
+
+def test_kron_matches_mpmath():
+    factors = [x, y, z, one]
+    expected = as_array(kron(*factors))
+    result = kron(*[numpy_backend.matrix(m) for m in factors])
+    assert np.allclose(result, expected, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize(
+    "axis", [[z, one, one, z], [one, z, z, z], [x, one, z, one], [y, y, one, x]]
+)
+def test_apply_rot_matches_mpmath(axis):
+    state = apply_rot(init4qubit, [one, z, one, one], 1e-2, 2e-3, 3e-4)
+    expected = as_array(apply_rot(state, axis, 1e-3, 2e-3, 3e-3))
+    result = apply_rot(as_array(state), axis, 1e-3, 2e-3, 3e-3)
+    assert np.allclose(result, expected, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize("pauli", [[x, one, one, one], [one, y, z, one]])
+def test_apply_pauli_matches_mpmath(pauli):
+    state = apply_rot(init4qubit, [z, z, one, z], 1e-2, 2e-3, 3e-4)
+    expected = as_array(apply_pauli(state, pauli, 0.01))
+    result = apply_pauli(as_array(state), pauli, 0.01)
+    assert np.allclose(result, expected, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize("pphys, rel", [(1e-4, 1e-10), (1e-6, 1e-4)])
+def test_one_level_15to1_numpy_agrees_with_mpmath(pphys, rel):
+    # The numpy backend reads the output error out of the error branches of a split state, so it stays
+    # accurate at output errors of ~4e-16 (pphys = 1e-6), far below the double-precision epsilon of a trace
+    expected = cost_of_one_level_15to1(pphys, 7, 3, 3)
+    result = cost_of_one_level_15to1(pphys, 7, 3, 3, backend="numpy")
+    assert result.distilled_magic_state_error_rate == pytest.approx(
+        float(expected.distilled_magic_state_error_rate), rel=rel
+    )
+    assert result.distillation_time_in_cycles == pytest.approx(
+        expected.distillation_time_in_cycles, rel=1e-12
+    )
+
+
+def test_one_level_15to1_batch_matches_single_evaluations():
+    points = [(1e-4, 7, 3, 3), (1e-3, 11, 5, 5), (5e-4, 9, 3, 5)]
+    pphys, dx, dz, dm = (np.array(column) for column in zip(*points))
+    batch = cost_of_one_level_15to1_batch(pphys, dx, dz, dm, batch_size=2)
+    assert len(batch) == len(points)
+    for k, point in enumerate(points):
+        single = cost_of_one_level_15to1(*point, backend="numpy")
+        assert batch.distilled_magic_state_error_rate[k] == pytest.approx(
+            single.distilled_magic_state_error_rate, rel=1e-12
+        )
+        assert batch.qubits[k] == single.qubits
+        assert batch.distillation_time_in_cycles[k] == pytest.approx(
+            single.distillation_time_in_cycles, rel=1e-12
+        )
+
+
+def test_gmpy2_matches_mpmath():
+    pytest.importorskip("gmpy2")
+    expected = get_backend("gmpy2").matrix(one_level_15to1_state(1e-4, 7, 3, 3))
+    result = one_level_15to1_state(1e-4, 7, 3, 3, backend="gmpy2")
+    assert max(abs(d) for d in (result - expected).flat) < 1e-35
+    assert cost_of_one_level_15to1(
+        1e-4, 7, 3, 3, backend="gmpy2"
+    ).distilled_magic_state_error_rate == pytest.approx(
+        float(cost_of_one_level_15to1(1e-4, 7, 3, 3).distilled_magic_state_error_rate),
+        rel=1e-15,
+    )
+
+
+def test_gmpy2_follows_the_working_precision():
+    gmpy2 = pytest.importorskip("gmpy2")
+    with working_precision(200):
+        assert gmpy2.get_context().precision == 200
+    assert gmpy2.get_context().precision == 128
+    # An output error of 1.8e-38 that 128 bits cannot resolve
+    mpmath_result, gmpy2_result = (
+        cost_of_two_level_15to1(
+            1e-5, 9, 3, 3, 25, 9, 9, 4, backend=backend, precision=320
+        )
+        for backend in ("mpmath", "gmpy2")
+    )
+    assert gmpy2_result.precision_in_bits == 320
+    assert gmpy2_result.distilled_magic_state_error_rate == pytest.approx(
+        mpmath_result.distilled_magic_state_error_rate, rel=1e-12
+    )
+
+
+def test_doubledouble_arithmetic():
+    third = DDArray.from_values([mp.mpf(1) / 3])
+    product = (third * 3 - 1).sum()
+    assert abs(product) < 1e-31
+
+
+def test_doubledouble_matches_mpmath():
+    expected = one_level_15to1_state(1e-4, 7, 3, 3)
+    result = one_level_15to1_state(1e-4, 7, 3, 3, backend="doubledouble")
+    assert mp.mnorm(result.to_mpmath() - expected, 1) < 1e-30
+    assert cost_of_one_level_15to1(
+        1e-6, 7, 3, 3, backend="doubledouble"
+    ).distilled_magic_state_error_rate == pytest.approx(
+        float(cost_of_one_level_15to1(1e-6, 7, 3, 3).distilled_magic_state_error_rate),
+        rel=1e-12,
+    )
+
+
+@pytest.mark.parametrize(
+    "name", ["mpmath", "numpy", "numpy-batched", "gmpy2", "doubledouble"]
+)
+def test_trace_product_matches_trace_of_product(name):
+    be = get_backend(name)
+    a = apply_rot(init4qubit, [x, z, one, y], 1e-2, 2e-3, 3e-4)
+    b = kron(one, x, y, z)
+    expected = complex(trace(a * b))
+    result = be.trace_product(be.matrix(a), be.matrix(b))
+    assert complex(np.asarray(result).ravel()[0]) == pytest.approx(expected, abs=1e-14)
+
+
+def test_fidelity_with_pure_state():
+    psi = mp.matrix([[1], [1]]) / mp.sqrt(2)
+    rho = apply_rot(plusstate, [z], 1e-2, 2e-2, 3e-2)
+    expected = trace(rho * plusstate).real
+    assert fidelity(rho, psi) == pytest.approx(expected, abs=1e-30)
+    assert fidelity(as_array(rho), psi) == pytest.approx(float(expected), abs=1e-15)
+    assert trace_product(rho, plusstate) == pytest.approx(
+        trace(rho * plusstate), abs=1e-30
+    )
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        get_backend("bogus")
+
+
+def test_incomplete_backend_cannot_be_created():
+    class Incomplete(Backend):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,65 @@
+import pytest
+
+from litinski_factories.definitions import magic_states
+
+from litinski_factories.factory_simulation.builder import (
+    FIFTEEN_TO_ONE,
+    TWENTY_TO_FOUR,
+    build_schedule,
+    cost_of_protocol,
+    distillation_code,
+    protocol_errors,
+)
+from litinski_factories.factory_simulation.onelevel15to1 import (
+    ONE_LEVEL_15TO1,
+    cost_of_one_level_15to1,
+)
+from litinski_factories.factory_simulation.twolevel20to4 import TWO_LEVEL_20TO4
+from litinski_factories.schedule import Label, Rotation
+
+
+def _unlabelled(schedule):
+    return [step for step in schedule.steps if not isinstance(step, Label)]
+
+
+def test_builder_reproduces_the_unrolled_15to1_protocol():
+    assert _unlabelled(build_schedule(FIFTEEN_TO_ONE)) == _unlabelled(ONE_LEVEL_15TO1)
+
+
+def test_20to4_code_matches_the_rotations_of_its_two_level_protocol():
+    axes = [step.axis for step in TWO_LEVEL_20TO4.steps if isinstance(step, Rotation)]
+    assert [axis for step in TWENTY_TO_FOUR.steps for axis in step] == axes
+
+
+def test_distillation_code_groups_multi_qubit_rotations():
+    code = distillation_code("test", 1, ["IZI", "ZZI", "IZZ", "IIZ", "ZIZ"])
+    assert code.steps == (("IZI", "ZZI", "IZZ", "IIZ"), ("ZIZ",))
+    with pytest.raises(ValueError, match="allows 2"):
+        build_schedule(distillation_code("test", 1, ["ZZI", "IZZ", "ZIZ"], 3))
+
+
+@pytest.mark.parametrize("backend", ["mpmath", "numpy"])
+def test_cost_of_protocol_matches_the_unrolled_15to1_cost(backend):
+    built = cost_of_protocol(FIFTEEN_TO_ONE, 1e-3, dx=7, dz=3, dm=3, backend=backend)
+    expected = cost_of_one_level_15to1(1e-3, 7, 3, 3, backend=backend)
+    assert built.distilled_magic_state_error_rate == pytest.approx(
+        expected.distilled_magic_state_error_rate, rel=1e-12
+    )
+    assert built.distillation_time_in_cycles == pytest.approx(
+        expected.distillation_time_in_cycles, rel=1e-12
+    )
+    assert (built.qubits, built.dimensions) == (expected.qubits, expected.dimensions)
+    assert built.name == expected.name
+
+
+def test_cost_of_protocol_is_per_output_state():
+    assert (FIFTEEN_TO_ONE.order, TWENTY_TO_FOUR.order) == (3, 2)
+    parameters = dict(dx=7, dz=3, dm=3)
+    built = cost_of_protocol(TWENTY_TO_FOUR, 1e-4, precision="auto", **parameters)
+    _, pout = protocol_errors(
+        build_schedule(TWENTY_TO_FOUR), magic_states(4), pphys=1e-4, **parameters
+    )
+    assert built.distilled_magic_state_error_rate == pytest.approx(
+        float(pout) / 4, rel=1e-9
+    )
+    assert all(isinstance(d, int) for d in built.dimensions)
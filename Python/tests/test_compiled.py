@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from litinski_factories.compiled import Series, compile_protocol
+from litinski_factories.definitions import magic_states
+from litinski_factories.factory_simulation.onelevel15to1 import (
+    cost_of_one_level_15to1,
+    one_level_15to1_state,
+)
+from litinski_factories.factory_simulation.smallfootprint import (
+    compile_one_level_15to1_small_footprint,
+    cost_of_one_level_15to1_small_footprint,
+    cost_of_one_level_15to1_small_footprint_compiled,
+)
+
+
+def test_series_arithmetic():
+    pphys = Series.pphys(8)
+    logical = 0.1 * (100 * pphys) ** 1.5
+    assert np.allclose(logical.coefficients, [0, 0, 0, 100, 0, 0, 0, 0, 0])
+    inverse = 1 / (1 - pphys)
+    assert np.allclose(inverse.coefficients, [1, 0, 1, 0, 1, 0, 1, 0, 1])
+    assert (pphys - pphys) == 0
+
+
+def test_compiled_15to1_matches_simulation(tmp_path):
+    compiled = compile_protocol(
+        one_level_15to1_state,
+        magic_states(1),
+        (7, 3, 3),
+        cache_dir=tmp_path,
+    )
+    assert len(list(tmp_path.iterdir())) == 1
+    cached = compile_protocol(
+        one_level_15to1_state,
+        magic_states(1),
+        (7, 3, 3),
+        cache_dir=tmp_path,
+    )
+    assert np.array_equal(cached.infidelity, compiled.infidelity)
+
+    for pphys in [1e-4, 1e-3]:
+        expected = cost_of_one_level_15to1(pphys, 7, 3, 3)
+        pfail, pout = compiled(pphys)
+        assert compiled.is_converged(pphys)
+        assert pout == pytest.approx(
+            float(expected.distilled_magic_state_error_rate), rel=1e-8
+        )
+        assert 6 * 3 / (1 - pfail) == pytest.approx(
+            expected.distillation_time_in_cycles, rel=1e-12
+        )
+
+
+def test_compiled_small_footprint_15to1_matches_simulation():
+    assert compile_one_level_15to1_small_footprint(7, 3, 3).is_converged(1e-3)
+    compiled = cost_of_one_level_15to1_small_footprint_compiled(1e-3, 7, 3, 3)
+    expected = cost_of_one_level_15to1_small_footprint(1e-3, 7, 3, 3)
+    assert compiled.distilled_magic_state_error_rate == pytest.approx(
+        expected.distilled_magic_state_error_rate, rel=1e-8
+    )
+    assert (compiled.name, compiled.qubits, compiled.dimensions) == (
+        expected.name,
+        expected.qubits,
+        expected.dimensions,
+    )
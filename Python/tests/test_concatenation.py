@@ -0,0 +1,87 @@
+import pytest
+
+from litinski_factories.factory_simulation.concatenation import (
+    LEVEL_8TOCCZ,
+    LEVEL_15TO1,
+    LEVEL_20TO4,
+    FactoryLevel,
+    clear_level_cache,
+    cost_of_concatenated_factory,
+    first_level,
+    upper_level,
+)
+from litinski_factories.factory_simulation.twolevel8toCCZ import (
+    cost_of_two_level_8toccz,
+)
+from litinski_factories.factory_simulation.twolevel15to1 import (
+    cost_of_two_level_15to1,
+)
+from litinski_factories.factory_simulation.twolevel20to4 import (
+    cost_of_two_level_20to4,
+)
+
+
+@pytest.mark.parametrize(
+    "level, two_level, distances, backend",
+    [
+        (LEVEL_15TO1, cost_of_two_level_15to1, (25, 9, 9, 4), "mpmath"),
+        (LEVEL_15TO1, cost_of_two_level_15to1, (25, 9, 9, 4), "numpy"),
+        (LEVEL_20TO4, cost_of_two_level_20to4, (27, 13, 15, 6), "numpy"),
+        (LEVEL_8TOCCZ, cost_of_two_level_8toccz, (25, 9, 9, 4), "numpy"),
+    ],
+    ids=["15-to-1-mpmath", "15-to-1", "20-to-4", "8-to-CCZ"],
+)
+def test_two_levels_match_the_two_level_factories(level, two_level, distances, backend):
+    concatenated = cost_of_concatenated_factory(
+        1e-4, 7, 3, 3, [FactoryLevel(level, *distances)], backend=backend
+    )
+    expected = two_level(1e-4, 7, 3, 3, *distances, backend=backend)
+    assert concatenated.distilled_magic_state_error_rate == pytest.approx(
+        expected.distilled_magic_state_error_rate, rel=1e-12
+    )
+    assert concatenated.distillation_time_in_cycles == pytest.approx(
+        expected.distillation_time_in_cycles, rel=1e-12
+    )
+    assert concatenated.qubits == expected.qubits
+    assert concatenated.dimensions == expected.dimensions
+    assert concatenated.name == expected.name
+    assert (
+        concatenated.n_t_gates_produced_per_distillation
+        == expected.n_t_gates_produced_per_distillation
+    )
+
+
+def test_three_level_sweep_reuses_the_lower_levels():
+    clear_level_cache()
+    middle = FactoryLevel(LEVEL_15TO1, 25, 11, 11, 6)
+    factories = [
+        cost_of_concatenated_factory(
+            1e-3, 13, 5, 5, [middle, FactoryLevel(LEVEL_15TO1, d, d // 2, d // 2, 8)]
+        )
+        for d in (37, 41)
+    ]
+    assert first_level.cache_info().misses == 1
+    assert upper_level.cache_info().misses == 3
+    # The third level suppresses the output error of the second one further
+    two_level = cost_of_concatenated_factory(1e-3, 13, 5, 5, [middle])
+    assert all(
+        f.distilled_magic_state_error_rate
+        < 1e-5 * two_level.distilled_magic_state_error_rate
+        for f in factories
+    )
+    assert factories[0].name.startswith("(15-to-1)x(15-to-1)x(15-to-1) with")
+
+
+def test_levels_above_20to4_need_a_footprint():
+    with pytest.raises(ValueError, match="footprint"):
+        cost_of_concatenated_factory(
+            1e-4,
+            7,
+            3,
+            3,
+            [
+                FactoryLevel(LEVEL_20TO4, 27, 13, 15, 6),
+                FactoryLevel(LEVEL_15TO1, 25, 9, 9, 4),
+            ],
+            backend="numpy",
+        )
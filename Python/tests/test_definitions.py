@@ -0,0 +1,296 @@
+import numpy as np
+import pytest
+from mpmath import mp
+
+from litinski_factories.backends import get_backend
+from litinski_factories.definitions import (
+    PauliString,
+    SplitState,
+    apply_pauli,
+    apply_storage,
+    apply_rot,
+    clear_operator_cache,
+    diagonal_of,
+    init5qubit,
+    initial_state,
+    kron,
+    magic_states,
+    one,
+    operator_key,
+    operators_of,
+    pauli_of,
+    pauli_product,
+    pauli_rot,
+    permutation_of,
+    postselected_block,
+    postselection_errors,
+    projx,
+    x,
+    y,
+    z,
+)
+
+numpy_backend = get_backend("numpy")
+
+
+def dense_rot(state, axis, p1, p2, p3):
+    """
+    Reference implementation of `apply_rot` conjugating with dense rotation matrices
+    """
+    res = 0 * state
+    for p, angle in [
+        (1 - p1 - p2 - p3, mp.pi / 8),
+        (p1, 5 * mp.pi / 8),
+        (p2, -mp.pi / 8),
+        (p3, 3 * mp.pi / 8),
+    ]:
+        rot = pauli_rot(axis, angle)
+        res += p * rot * state * rot.transpose_conj()
+    return res
+
+
+def max_abs_difference(a, b) -> float:
+    return float(np.max(np.abs(numpy_backend.matrix(a) - numpy_backend.matrix(b))))
+
+
+def test_diagonal_of():
+    assert diagonal_of([z, one]) == [1, 1, -1, -1]
+    assert diagonal_of([-1 * z, z]) == [-1, 1, 1, -1]
+    assert diagonal_of([x, z]) is None
+
+
+@pytest.mark.parametrize(
+    "axis", [[one, z, z, z, one], [z, one, one, z, z], [-1 * z, one, z, one, z]]
+)
+def test_diagonal_rotation_matches_dense(axis):
+    state = dense_rot(init5qubit, [x, one, one, one, x], 1e-2, 2e-2, 3e-2)
+    expected = dense_rot(state, axis, mp.mpf("1e-3"), mp.mpf("2e-3"), mp.mpf("3e-3"))
+    result = apply_rot(state, axis, mp.mpf("1e-3"), mp.mpf("2e-3"), mp.mpf("3e-3"))
+    assert max_abs_difference(result, expected) < 1e-30
+    result = apply_rot(numpy_backend.matrix(state), axis, 1e-3, 2e-3, 3e-3)
+    assert max_abs_difference(result, expected) < 1e-14
+
+
+def test_permutation_of():
+    assert permutation_of([x, one]) == (2, [1, 1, 1, 1])
+    assert permutation_of([z, y]) == (1, [-1j, 1j, 1j, -1j])
+    assert permutation_of([projx, one]) is None
+
+
+@pytest.mark.parametrize(
+    "pauli", [[one, one, x, one, one], [x, z, one, y, -1 * z], [z, one, one, one, z]]
+)
+def test_permuted_pauli_matches_dense(pauli):
+    state = dense_rot(init5qubit, [x, one, z, one, y], 1e-2, 2e-2, 3e-2)
+    op = kron(*pauli)
+    p = mp.mpf("1e-3")
+    expected = (1 - p) * state + p * op * state * op
+    assert max_abs_difference(apply_pauli(state, pauli, p), expected) < 1e-30
+    result = apply_pauli(numpy_backend.matrix(state), pauli, 1e-3)
+    assert max_abs_difference(result, expected) < 1e-14
+
+
+def test_fused_storage_matches_sequential_channels():
+    state = dense_rot(init5qubit, [x, one, z, one, y], 1e-2, 2e-2, 3e-2)
+    px = [mp.mpf("1e-3"), 0, mp.mpf("2e-3"), 0, mp.mpf("5e-4")]
+    pz = [0, mp.mpf("3e-3"), mp.mpf("1e-3"), 0, mp.mpf("4e-3")]
+    expected = state
+    for k in range(5):
+        for pauli, p in [(x, px[k]), (z, pz[k])]:
+            op = kron(*[pauli if i == k else one for i in range(5)])
+            expected = (1 - p) * expected + p * op * expected * op
+    assert max_abs_difference(apply_storage(state, x=px, z=pz), expected) < 1e-30
+    result = apply_storage(numpy_backend.matrix(state), x=px, z=pz)
+    assert max_abs_difference(result, expected) < 1e-14
+
+
+def test_split_state_matches_plain_state():
+    def evolve(state):
+        state = apply_rot(state, [one, z, z, one, z], 1e-3, 2e-3, 3e-3)
+        state = apply_rot(state, [x, one, z, one, one], 1e-3, 2e-3, 3e-3)
+        state = apply_pauli(state, [one, y, one, one, x], 1e-2)
+        return apply_storage(state, x=[1e-3, 0, 2e-3, 0, 0], z=[0, 1e-2, 2e-2, 0, 3e-3])
+
+    plain = evolve(init5qubit)
+    split = evolve(initial_state(init5qubit, "numpy"))
+    assert isinstance(split, SplitState)
+    assert max_abs_difference(split.ideal + split.error, plain) < 1e-14
+
+    for a, b in zip(
+        postselection_errors(split, magic_states(1)),
+        postselection_errors(plain, magic_states(1)),
+    ):
+        assert float(a) == pytest.approx(float(b), rel=1e-12)
+
+
+def test_small_readouts_of_the_noiseless_branch_are_kept():
+    # A noiseless branch off the ideal output by an infidelity far above rounding errors, but below 1e-10
+    ideal = magic_states(1)
+    off = ideal * (1 - 1e-12) + (one - ideal) * 1e-12
+    numpy_backend = get_backend("numpy")
+    split = SplitState(numpy_backend.matrix(off), numpy_backend.matrix(0 * one))
+    pfail, pout = postselection_errors(split, ideal)
+    assert float(pout) == pytest.approx(1e-12, rel=1e-3)
+
+
+def test_operator_cache():
+    assert operators_of(operator_key(x, projx)) == [x, projx]
+
+    clear_operator_cache()
+    rot = pauli_rot([z, x, one], mp.pi / 8, "numpy")
+    assert pauli_rot([z, x, one], mp.pi / 8, "numpy") is rot
+    assert pauli_rot([z, x, one], mp.pi / 8) is not rot
+    assert kron(one, projx, projx) is kron(one, projx, projx)
+    assert max_abs_difference(pauli_product([z, x, one], "numpy"), kron(z, x, one)) == 0
+
+    clear_operator_cache()
+    assert pauli_rot([z, x, one], mp.pi / 8, "numpy") is not rot
+
+
+def test_pauli_string_labels():
+    assert PauliString.from_label("-ZZIZ") == pauli_of([-1 * z, z, one, z])
+    assert pauli_of("XIY") == pauli_of([x, one, y])
+    for label in ["IZZZI", "-XIY", "ZZ"]:
+        assert PauliString.from_label(label).label == label
+    assert (
+        max_abs_difference(
+            kron(*PauliString.from_label("-ZXI").factors()), kron(-1 * z, x, one)
+        )
+        == 0
+    )
+
+
+def test_labelled_rotation_matches_list_form():
+    state = dense_rot(init5qubit, "XIIIX", 1e-2, 2e-2, 3e-2)
+    for label, axis in [
+        ("IZZZI", [one, z, z, z, one]),
+        ("-XZIYI", [-1 * x, z, one, y, one]),
+    ]:
+        p = mp.mpf("1e-3")
+        assert (
+            max_abs_difference(
+                apply_rot(state, label, p, p, p), apply_rot(state, axis, p, p, p)
+            )
+            == 0
+        )
+
+
+def test_postselected_block_contracts_with_plus_states():
+    state = dense_rot(init5qubit, "XIZIY", 1e-2, 2e-2, 3e-2)
+    plus = mp.matrix([[1], [1]]) / mp.sqrt(2)
+    contraction = kron(one, plus, plus, plus, plus)
+    expected = contraction.transpose_conj() * state * contraction
+    assert (
+        max_abs_difference(postselected_block(state, magic_states(1)), expected) < 1e-30
+    )
+    result = get_backend("gmpy2").block_contraction(
+        get_backend("gmpy2").matrix(state), 2
+    )
+    assert max_abs_difference(np.asarray(result, dtype=complex), expected) < 1e-15
+    result = get_backend("doubledouble").block_contraction(
+        get_backend("doubledouble").matrix(state), 2
+    )
+    assert max_abs_difference(result.to_mpmath(), expected) < 1e-30
+    result = numpy_backend.block_contraction(numpy_backend.matrix(state), 2)
+    assert max_abs_difference(result, expected) < 1e-15
+
+
+def test_lazy_states_are_snapshotted_exactly(tmp_path, monkeypatch):
+    from litinski_factories import definitions
+
+    monkeypatch.setattr(definitions, "SNAPSHOT_DIR", tmp_path)
+    monkeypatch.setattr(definitions, "_states", {})
+    computed = definitions.ideal8toCCZ
+    assert computed == kron(definitions.CCZstate, definitions.plusstate)
+    assert [p.name for p in tmp_path.iterdir()] == [f"ideal8toCCZ-p{mp.prec}.npz"]
+
+    definitions._states.clear()
+    loaded = definitions.ideal8toCCZ
+    assert loaded is not computed and loaded == computed
+    assert definitions.plus_states(4) is definitions.init4qubit
+    with pytest.raises(AttributeError):
+        definitions.init6qubit
+
+
+def test_precision_is_scoped_to_the_call():
+    from litinski_factories.definitions import working_precision
+    from litinski_factories.factory_simulation.onelevel15to1 import (
+        cost_of_one_level_15to1,
+    )
+
+    prec = mp.prec
+    low = cost_of_one_level_15to1(1e-3, 7, 3, 3, precision=64)
+    assert mp.prec == prec
+    with working_precision(256) as bits:
+        assert bits == mp.prec == 256
+        high = cost_of_one_level_15to1(1e-3, 7, 3, 3)
+        assert (
+            abs(magic_states(1)[0, 1] - mp.exp(-1j * mp.pi / 4) / 2) < mp.mpf(2) ** -250
+        )
+    assert mp.prec == prec
+    assert low.distilled_magic_state_error_rate == pytest.approx(
+        high.distilled_magic_state_error_rate, rel=1e-9
+    )
+
+
+def test_required_precision_grows_with_the_resolved_error():
+    from litinski_factories.definitions import required_precision
+
+    assert required_precision(1e-3) % 32 == 0
+    assert required_precision(1e-3) >= 53 + 10
+    assert required_precision(1e-38) >= 53 + 126
+    assert required_precision(1e-38) > required_precision(1e-9)
+
+
+def test_auto_precision_is_recorded_and_resolves_deep_factories():
+    from litinski_factories.factory_simulation.onelevel15to1 import (
+        cost_of_one_level_15to1,
+    )
+    from litinski_factories.factory_simulation.twolevel15to1 import (
+        cost_of_two_level_15to1,
+    )
+
+    fixed = cost_of_one_level_15to1(1e-3, 7, 3, 3, precision=96)
+    assert fixed.precision_in_bits == 96
+    assert (
+        cost_of_one_level_15to1(1e-3, 7, 3, 3, backend="numpy").precision_in_bits
+        is None
+    )
+
+    prec = mp.prec
+    deep = cost_of_two_level_15to1(1e-5, 9, 3, 3, 25, 9, 9, 4, precision="auto")
+    assert mp.prec == prec
+    # 128 bits are not enough to resolve this output error to double precision
+    assert deep.precision_in_bits >= 192
+    reference = cost_of_two_level_15to1(1e-5, 9, 3, 3, 25, 9, 9, 4, precision=320)
+    assert deep.distilled_magic_state_error_rate == pytest.approx(
+        reference.distilled_magic_state_error_rate, rel=1e-9
+    )
+
+
+def test_auto_precision_on_the_other_backends():
+    from litinski_factories.factory_simulation.onelevel15to1 import (
+        cost_of_one_level_15to1,
+    )
+    from litinski_factories.factory_simulation.twolevel15to1 import (
+        cost_of_two_level_15to1,
+    )
+
+    pytest.importorskip("gmpy2")
+    deep = cost_of_two_level_15to1(
+        1e-5, 9, 3, 3, 25, 9, 9, 4, backend="gmpy2", precision="auto"
+    )
+    assert deep.precision_in_bits >= 192
+    assert deep.distilled_magic_state_error_rate == pytest.approx(1.8366e-38, rel=1e-4)
+
+    # Double-double resolves an output error of 4.5e-16, but not one of 1.8e-38
+    shallow = cost_of_one_level_15to1(
+        1e-6, 7, 3, 3, backend="doubledouble", precision="auto"
+    )
+    assert shallow.distilled_magic_state_error_rate == pytest.approx(
+        4.47497e-16, rel=1e-5
+    )
+    with pytest.raises(ArithmeticError):
+        cost_of_two_level_15to1(
+            1e-5, 9, 3, 3, 25, 9, 9, 4, backend="doubledouble", precision="auto"
+        )
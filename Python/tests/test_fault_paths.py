@@ -0,0 +1,68 @@
+import itertools
+import math
+
+import pytest
+from mpmath import mp
+
+from litinski_factories.definitions import (
+    magic_states,
+    postselection_errors,
+    working_precision,
+)
+from litinski_factories.factory_simulation.onelevel15to1 import ONE_LEVEL_15TO1
+from litinski_factories.factory_simulation.twolevel8toCCZ import (
+    CCZstate,
+    TWO_LEVEL_8TOCCZ,
+)
+from litinski_factories.fault_paths import fault_path_errors, tail_probability
+from litinski_factories.schedule import run_schedule
+
+
+def test_tail_probability_counts_the_configurations_with_more_faults():
+    probabilities = [0.1, 0.2, 0.05, 0.3]
+    for max_faults in range(4):
+        expected = sum(
+            math.prod(q if fault else 1 - q for q, fault in zip(probabilities, faults))
+            for faults in itertools.product([0, 1], repeat=len(probabilities))
+            if sum(faults) > max_faults
+        )
+        assert tail_probability(probabilities, max_faults) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize(
+    "schedule, ideal, parameters, max_faults",
+    [
+        (
+            ONE_LEVEL_15TO1,
+            lambda: magic_states(1),
+            dict(pphys=1e-4, dx=7, dz=3, dm=3),
+            2,
+        ),
+        (
+            TWO_LEVEL_8TOCCZ,
+            lambda: CCZstate,
+            dict(pphys=1e-4, dx2=25, dz2=9, dm2=9, pl1=4e-11, lmove=200, l1time=9),
+            3,
+        ),
+    ],
+    ids=["15-to-1", "8-to-CCZ"],
+)
+def test_fault_paths_bound_the_dense_protocol(schedule, ideal, parameters, max_faults):
+    with working_precision(128):
+        ideal = ideal()
+        pfail, pout = postselection_errors(run_schedule(schedule, **parameters), ideal)
+    estimate = fault_path_errors(schedule, ideal, max_faults, **parameters)
+    lower, upper = estimate.pout_bounds
+    assert lower <= pout <= upper
+    assert estimate.pfail_bounds[0] <= pfail <= estimate.pfail_bounds[1]
+    if max_faults == 3:
+        # The third order fully resolves the output error of the level-2 protocol
+        assert estimate.pout == pytest.approx(float(pout), rel=1e-9)
+        assert upper - lower < 1e-9 * estimate.pout
+
+
+def test_fault_paths_require_a_pure_ideal_output():
+    with pytest.raises(ValueError, match="pure state"):
+        fault_path_errors(
+            ONE_LEVEL_15TO1, mp.eye(2) / 2, 1, pphys=1e-4, dx=7, dz=3, dm=3
+        )
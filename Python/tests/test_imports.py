@@ -0,0 +1,20 @@
+import subprocess
+import sys
+
+import pytest
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "litinski_factories.factory_simulation.twolevel20to4",
+        "litinski_factories.factory_searching.two_level_factory_search",
+    ],
+)
+def test_no_heavy_imports_on_the_hot_path(module):
+    heavy = ["scipy", "pandas", "plotly", "matplotlib", "sklearn"]
+    code = f"import sys, {module}; print([m for m in {heavy!r} if m in sys.modules])"
+    res = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    )
+    assert res.stdout.strip() == "[]"
@@ -1,4 +1,4 @@
-from definitions import kron, x, y, z, one, plusstate
+from litinski_factories.definitions import kron, x, y, z, one, plusstate
 from mpmath import mp
 
 n_repetitions: int
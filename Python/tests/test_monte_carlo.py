@@ -0,0 +1,63 @@
+import pytest
+
+from litinski_factories.definitions import magic_states
+from litinski_factories.factory_simulation.onelevel15to1 import ONE_LEVEL_15TO1
+from litinski_factories.factory_simulation.twolevel15to1 import TWO_LEVEL_15TO1
+from litinski_factories.factory_simulation.twolevel8toCCZ import (
+    CCZstate,
+    TWO_LEVEL_8TOCCZ,
+)
+from litinski_factories.fault_paths import fault_path_errors
+from litinski_factories.monte_carlo import monte_carlo_errors
+from litinski_factories.schedule import Rotation
+
+LEVEL_2 = dict(pphys=1e-4, dx2=25, dz2=9, dm2=9, pl1=4e-11, lmove=200, l1time=9)
+
+
+@pytest.mark.parametrize(
+    "schedule, ideal",
+    [(TWO_LEVEL_15TO1, lambda: magic_states(1)), (TWO_LEVEL_8TOCCZ, lambda: CCZstate)],
+    ids=["15-to-1", "8-to-CCZ"],
+)
+def test_monte_carlo_resolves_rare_output_errors(schedule, ideal):
+    # Output errors of 1e-25 and 1e-16, from faults of probabilities down to 1e-27
+    ideal = ideal()
+    reference = fault_path_errors(schedule, ideal, 3, **LEVEL_2)
+    estimate = monte_carlo_errors(schedule, ideal, 30_000, seed=7, **LEVEL_2)
+    assert estimate.pout_interval[0] <= reference.pout <= estimate.pout_interval[1]
+    assert estimate.pfail_interval[0] <= reference.pfail <= estimate.pfail_interval[1]
+    assert estimate.pout == pytest.approx(reference.pout, rel=0.1)
+
+
+def test_monte_carlo_streams_are_reproducible():
+    parameters = dict(pphys=1e-3, dx=7, dz=3, dm=3)
+
+    def run(seed, processes):
+        return monte_carlo_errors(
+            ONE_LEVEL_15TO1,
+            magic_states(1),
+            6000,
+            processes=processes,
+            seed=seed,
+            **parameters,
+        )
+
+    assert run(3, 1) == run(3, 1)
+    assert run(3, 1) != run(4, 1)
+    parallel = run(3, 2)
+    assert parallel == run(3, 2)
+    # The exact values of the dense protocol
+    assert parallel.pfail_interval[0] <= 0.194191 <= parallel.pfail_interval[1]
+    assert parallel.pout_interval[0] <= 5.411e-4 <= parallel.pout_interval[1]
+
+
+def test_monte_carlo_skips_locations_without_faults():
+    # A noiseless first rotation, which the uniform proposal must not draw
+    steps = list(ONE_LEVEL_15TO1.steps)
+    first = next(k for k, step in enumerate(steps) if isinstance(step, Rotation))
+    steps[first] = Rotation(steps[first].axis, 0, 0, 0)
+    schedule = ONE_LEVEL_15TO1._replace(steps=tuple(steps))
+    parameters = dict(pphys=1e-3, dx=7, dz=3, dm=3)
+    reference = fault_path_errors(schedule, magic_states(1), 3, **parameters)
+    estimate = monte_carlo_errors(schedule, magic_states(1), 6000, seed=3, **parameters)
+    assert estimate.pout_interval[0] <= reference.pout <= estimate.pout_interval[1]
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from litinski_factories.definitions import (
+    apply_rot,
+    apply_storage,
+    initial_state,
+    magic_states,
+    plus_states,
+    postselection_errors,
+    working_precision,
+)
+from litinski_factories.factory_simulation.onelevel15to1 import ONE_LEVEL_15TO1
+from litinski_factories.factory_simulation.twolevel8toCCZ import (
+    CCZstate,
+    TWO_LEVEL_8TOCCZ,
+)
+from litinski_factories.pauli_transfer import (
+    density_matrix,
+    pauli_postselection_errors,
+    plus_pauli_state,
+    run_pauli_transfer,
+    transfer_rot,
+    transfer_storage,
+)
+from litinski_factories.schedule import run_schedule
+
+
+def test_transfer_matches_the_dense_channels():
+    state = plus_pauli_state(4, "numpy")
+    dense = initial_state(plus_states(4), "numpy")
+    for axis, p in [("ZIZI", 0.01), ("-XYIZ", 0.02), ("IZYX", 0.03), ("YYXI", 0.04)]:
+        state = transfer_rot(state, axis, p, p / 2, p / 3)
+        dense = apply_rot(dense, axis, p, p / 2, p / 3)
+        state = transfer_storage(state, x=[p, 0, 2 * p, 0], z=[0, 3 * p, p, p])
+        dense = apply_storage(dense, x=[p, 0, 2 * p, 0], z=[0, 3 * p, p, p])
+    np.testing.assert_allclose(
+        density_matrix(state), dense.ideal + dense.error, atol=1e-15
+    )
+
+
+@pytest.mark.parametrize(
+    "schedule, ideal, parameters",
+    [
+        (ONE_LEVEL_15TO1, lambda: magic_states(1), dict(pphys=1e-3, dx=7, dz=3, dm=3)),
+        (
+            TWO_LEVEL_8TOCCZ,
+            lambda: CCZstate,
+            dict(pphys=1e-3, dx2=25, dz2=9, dm2=9, pl1=2e-8, lmove=200, l1time=9),
+        ),
+    ],
+    ids=lambda p: getattr(p, "name", ""),
+)
+def test_pauli_transfer_matches_the_dense_protocol(schedule, ideal, parameters):
+    pytest.importorskip("gmpy2")
+    with working_precision(128):
+        ideal = ideal()
+        outputs = ideal.rows.bit_length() - 1
+        state = run_pauli_transfer(schedule, outputs, "gmpy2", **parameters)
+        dense = run_schedule(schedule, "gmpy2", **parameters)
+        # Post-selection only reads the components without Z on the measured qubits
+        assert len(state.coefficients) <= 2**schedule.qubits * 2**outputs
+        for value, expected in zip(
+            pauli_postselection_errors(state, ideal),
+            postselection_errors(dense, ideal),
+        ):
+            assert abs(complex(value - expected)) < 1e-30 * abs(complex(expected))
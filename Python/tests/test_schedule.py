@@ -0,0 +1,194 @@
+import ast
+
+import numpy as np
+import pytest
+from mpmath import mp
+
+from litinski_factories.definitions import (
+    apply_rot,
+    apply_storage,
+    initial_state,
+    pauli_of,
+    plus_states,
+)
+from litinski_factories.factory_simulation.onelevel15to1 import ONE_LEVEL_15TO1
+from litinski_factories.factory_simulation.smallfootprint import (
+    ONE_LEVEL_15TO1_SMALL_FOOTPRINT,
+    TWO_LEVEL_15TO1_SMALL_FOOTPRINT,
+)
+from litinski_factories.factory_simulation.twolevel15to1 import TWO_LEVEL_15TO1
+from litinski_factories.factory_simulation.twolevel20to4 import TWO_LEVEL_20TO4
+from litinski_factories.factory_simulation.twolevel8toCCZ import TWO_LEVEL_8TOCCZ
+from litinski_factories.schedule import (
+    FUNCTIONS,
+    Fused,
+    Label,
+    Rotation,
+    Schedule,
+    Storage,
+    commute_storage,
+    evaluate,
+    fuse_diagonal_runs,
+    run_schedule,
+    schedule_namespace,
+    state_passes,
+)
+
+SCHEDULES = [
+    ONE_LEVEL_15TO1,
+    ONE_LEVEL_15TO1_SMALL_FOOTPRINT,
+    TWO_LEVEL_15TO1,
+    TWO_LEVEL_15TO1_SMALL_FOOTPRINT,
+    TWO_LEVEL_20TO4,
+    TWO_LEVEL_8TOCCZ,
+]
+
+
+@pytest.mark.parametrize("schedule", SCHEDULES, ids=lambda s: s.name)
+def test_schedules_are_well_formed(schedule):
+    known = set(schedule.parameters) | set(FUNCTIONS)
+    for name, expr in schedule.derived:
+        assert _names(expr) <= known
+        known.add(name)
+    for step in schedule.steps:
+        if isinstance(step, Rotation):
+            assert pauli_of(step.axis).n == schedule.qubits
+            exprs = [step.p1, step.p2, step.p3]
+        elif isinstance(step, Storage):
+            assert len(step.x or step.z) == schedule.qubits
+            exprs = list(step.x + step.z)
+        else:
+            continue
+        for expr in exprs:
+            assert _names(expr) <= known
+
+
+def _names(expr):
+    if not isinstance(expr, str):
+        return set()
+    return {
+        node.id
+        for node in ast.walk(ast.parse(expr, mode="eval"))
+        if isinstance(node, ast.Name)
+    }
+
+
+def test_run_schedule_matches_the_primitives():
+    schedule = Schedule(
+        name="test",
+        qubits=5,
+        parameters=("pphys", "d"),
+        derived=(("pl", "plog(pphys, d)"),),
+        steps=(
+            Label("Step 1"),
+            Rotation("ZZIZI", "pphys / 3 + pl", "pphys / 3", "pphys / 3"),
+            Storage(x=(0, "pl * d", 0, 0, "pl")),
+            Rotation("-IXIIZ", "pl", "pphys / 3"),
+            Label("Step 2"),
+            Storage(z=("pl * d", 0, "pphys", 0, 0)),
+        ),
+    )
+    labels = []
+    state = run_schedule(schedule, "numpy", progress=labels.append, pphys=1e-3, d=3)
+
+    pl = 0.1 * (100 * 1e-3) ** 2
+    expected = initial_state(plus_states(5), "numpy")
+    expected = apply_rot(expected, "ZZIZI", 1e-3 / 3 + pl, 1e-3 / 3, 1e-3 / 3)
+    expected = apply_storage(expected, x=[0, pl * 3, 0, 0, pl])
+    expected = apply_rot(expected, "-IXIIZ", pl, 1e-3 / 3, 0)
+    expected = apply_storage(expected, z=[pl * 3, 0, 1e-3, 0, 0])
+    for part, expected_part in zip(state, expected):
+        assert abs(part - expected_part).max() < 1e-15
+    assert labels == ["Step 1", "Step 2"]
+
+    with pytest.raises(TypeError, match="missing parameters"):
+        run_schedule(schedule, "numpy", pphys=1e-3)
+
+
+def test_fusion_keeps_the_order_of_non_diagonal_steps():
+    fused = fuse_diagonal_runs(TWO_LEVEL_20TO4)
+    assert state_passes(fused) < state_passes(TWO_LEVEL_20TO4)
+    assert [s for s in fused.steps if isinstance(s, Label)] == [
+        s for s in TWO_LEVEL_20TO4.steps if isinstance(s, Label)
+    ]
+    unfused = [
+        inner
+        for s in fused.steps
+        if not isinstance(s, Label)
+        for inner in (s.steps if isinstance(s, Fused) else [s])
+    ]
+    assert unfused == [s for s in TWO_LEVEL_20TO4.steps if not isinstance(s, Label)]
+
+
+@pytest.mark.parametrize("backend", ["numpy", "gmpy2"])
+def test_fused_schedule_matches_step_by_step(backend):
+    pytest.importorskip("gmpy2")
+    parameters = dict(pphys=1e-3, dx=7, dz=3, dm=3)
+    commuted = commute_storage(ONE_LEVEL_15TO1)
+    fused = run_schedule(fuse_diagonal_runs(commuted), backend, **parameters)
+    plain = run_schedule(commuted, backend, **parameters)
+    if backend == "numpy":
+        # The error branch holds the output errors, and must not lose relative precision
+        np.testing.assert_allclose(fused.ideal, plain.ideal, rtol=1e-12)
+        np.testing.assert_allclose(fused.error, plain.error, rtol=1e-10, atol=1e-22)
+    else:
+        difference = np.abs((fused - plain).astype(complex)).max()
+        assert difference < mp.mpf(2) ** -100
+
+
+def test_commuted_storage_waits_for_the_first_blocking_rotation():
+    schedule = Schedule(
+        name="test",
+        qubits=3,
+        parameters=("p",),
+        derived=(),
+        steps=(
+            Storage(x=("p", "p", 0), z=(0, 0, "p")),
+            Rotation("ZIZ", "p", 0),
+            Label("Step 2"),
+            Storage(x=(0, "2 * p", 0), z=(0, 0, "2 * p")),
+            Rotation("IZI", "p", 0),
+        ),
+    )
+    commuted = commute_storage(schedule)
+    # The X error on qubit 2 could wait for the last rotation, but joins the one on qubit 1 instead
+    assert commuted.steps == (
+        Storage(x=("p", "p", 0)),
+        Rotation("ZIZ", "p", 0),
+        Label("Step 2"),
+        Storage(z=(0, 0, "either(p, 2 * p)")),
+        Storage(x=(0, "2 * p", 0)),
+        Rotation("IZI", "p", 0),
+    )
+    assert FUNCTIONS["either"](0.25, 0.5) == 0.5
+
+
+@pytest.mark.parametrize("schedule", SCHEDULES, ids=lambda s: s.name)
+def test_commuted_storage_saves_passes(schedule):
+    commuted = commute_storage(schedule)
+    assert state_passes(commuted) < state_passes(schedule)
+    assert state_passes(fuse_diagonal_runs(commuted)) <= state_passes(
+        fuse_diagonal_runs(schedule)
+    )
+    assert [s for s in commuted.steps if not isinstance(s, Storage)] == [
+        s for s in schedule.steps if not isinstance(s, Storage)
+    ]
+
+
+def test_run_schedule_matches_the_original_order():
+    pytest.importorskip("gmpy2")
+    parameters = dict(pphys=1e-3, dx=7, dz=3, dm=3)
+    namespace = schedule_namespace(ONE_LEVEL_15TO1, "gmpy2", **parameters)
+    expected = initial_state(plus_states(ONE_LEVEL_15TO1.qubits), "gmpy2")
+    for step in ONE_LEVEL_15TO1.steps:
+        if isinstance(step, Rotation):
+            p1, p2, p3 = (evaluate(p, namespace) for p in step[1:])
+            expected = apply_rot(expected, step.axis, p1, p2, p3)
+        elif isinstance(step, Storage):
+            x = [evaluate(p, namespace) for p in step.x]
+            z = [evaluate(p, namespace) for p in step.z]
+            expected = apply_storage(expected, x=x, z=z)
+    state = run_schedule(ONE_LEVEL_15TO1, "gmpy2", **parameters)
+    for part, expected_part in zip(state, expected):
+        difference = np.abs((part - expected_part).astype(complex)).max()
+        assert difference < mp.mpf(2) ** -100